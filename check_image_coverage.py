@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 from supabase import create_client
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+from keyset_reader import iter_rows
+
 load_dotenv(override=True)
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
 
@@ -12,12 +16,13 @@ ecoregions = supabase.table('ecoregions').select('id, name').execute()
 coverage_data = []
 
 for eco in ecoregions.data:
-    # Total species
-    total = supabase.table('species_ecoregions').select('species_id', count='exact').eq('ecoregion_id', eco['id']).execute()
+    # Species in this ecoregion (keyset-paged, so large ecoregions are not cut at the API row cap)
+    species_ids_list = [s['species_id'] for s in iter_rows(
+        supabase, 'species_ecoregions', 'species_id', key='species_id',
+        filters=lambda q, e=eco['id']: q.eq('ecoregion_id', e))]
+    total = len(species_ids_list)
 
     # Species with images in this ecoregion
-    species_ids = supabase.table('species_ecoregions').select('species_id').eq('ecoregion_id', eco['id']).execute()
-    species_ids_list = [s['species_id'] for s in species_ids.data]
 
     with_images = 0
     if species_ids_list:
@@ -28,10 +33,10 @@ for eco in ecoregions.data:
             result = supabase.table('species').select('id', count='exact').in_('id', batch).not_.is_('image_url', 'null').execute()
             with_images += result.count
 
-    percentage = (with_images / total.count * 100) if total.count > 0 else 0
+    percentage = (with_images / total * 100) if total > 0 else 0
     coverage_data.append({
         'name': eco['name'],
-        'total': total.count,
+        'total': total,
         'with_images': with_images,
         'percentage': percentage
     })
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Species Sample Points Backfill
+
+Refreshes species_sample_points (one indexed geography row per element of
+species.sample_points) from the species table, then optionally runs the
+set-based linker link_all_species_ecoregions() over it, which replaces every
+species_ecoregions link with its own.
+
+Points are upserted on (species_id, ord) in place rather than after clearing
+the table, so readers never see it empty and an interrupted run leaves every
+species with either its old or its new points. Each page of species is then
+pruned with prune_species_sample_points(): rows past a species' current point
+count (including every row of a species that no longer has points) go.
+
+Re-run after any import that rewrites sample_points (processIUCNShapefiles.py,
+the curated importers), before relinking.
+
+Requirements:
+    pip install "shapely>=2" numpy supabase python-dotenv
+
+Usage:
+    python3 scripts/backfill_sample_points.py                  # refresh species_sample_points
+    python3 scripts/backfill_sample_points.py --link           # ...then link species to ecoregions in SQL
+    python3 scripts/backfill_sample_points.py --writer copy    # bulk-load over a direct Postgres connection
+    python3 scripts/backfill_sample_points.py --dry-run        # count points only
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from typing import Dict, List
+import numpy as np
+import shapely
+from supabase import Client
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from species_linker import init_supabase, point_coordinates
+from keyset_reader import iter_species_pages
+
+# Load environment variables
+load_dotenv(override=True)
+
+
+def sample_point_rows(species: List[Dict]) -> List[Dict]:
+    """species_sample_points rows (hex EWKB points) for a page of species"""
+    keys, coords = [], []
+    for row in species:
+        for index, point in enumerate(point_coordinates(row['sample_points'])):
+            keys.append((row['id'], index))
+            coords.append(point)
+    if not coords:
+        return []
+
+    points = shapely.set_srid(shapely.points(np.array(coords, dtype=float)), 4326)
+    geoms = shapely.to_wkb(points, hex=True, include_srid=True)
+    return [{'species_id': species_id, 'ord': index, 'geom': geom}
+            for (species_id, index), geom in zip(keys, geoms)]
+
+
+def prune_stale_points(supabase: Client, species_ids: List[str], point_counts: List[int]) -> int:
+    """Delete points at or past each species' current count (see prune_species_sample_points())"""
+    return supabase.rpc('prune_species_sample_points', {
+        'species_ids': species_ids,
+        'point_counts': point_counts,
+    }).execute().data or 0
+
+
+def backfill(supabase: Client, writer, dry_run: bool = False) -> Dict[str, int]:
+    """Stream species, upsert their sample points in writer-sized batches and prune stale ones"""
+    stats = {'species': 0, 'points': 0, 'pruned': 0}
+    pending = []
+    # Every species, including those without points, so their old rows get pruned
+    for page in iter_species_pages(supabase, 'id, sample_points'):
+        rows = sample_point_rows(page)
+        counts = Counter(row['species_id'] for row in rows)
+        stats['species'] += len(counts)
+        stats['points'] += len(rows)
+        if not dry_run:
+            pending.extend(rows)
+            while len(pending) >= writer.batch_size:
+                writer.write(pending[:writer.batch_size])
+                del pending[:writer.batch_size]
+            stats['pruned'] += prune_stale_points(supabase, [row['id'] for row in page],
+                                                  [counts[row['id']] for row in page])
+        print(f"  ↳ {stats['species']:,} species, {stats['points']:,} points...", end='\r')
+
+    if pending:
+        writer.write(pending)
+    print()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh species_sample_points from species.sample_points")
+    parser.add_argument("--link", action="store_true",
+                        help="Run link_all_species_ecoregions() after the backfill")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Count species and points, but write nothing")
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    print('📍 Backfilling Species Sample Points\n')
+    print('=' * 60)
+
+    supabase = init_supabase()
+    start_time = time.time()
+
+    writer = None
+    if not args.dry_run:
+        writer = create_writer(args.writer, 'species_sample_points', supabase=supabase, dsn=args.db_url,
+                               on_conflict='species_id,ord')
+
+    print('\n🔄 Writing points')
+    try:
+        stats = backfill(supabase, writer, args.dry_run)
+    finally:
+        if writer:
+            writer.close()
+    print(f"   ✓ {stats['points']:,} points for {stats['species']:,} species in {time.time() - start_time:.1f}s")
+    if not args.dry_run:
+        print(f"   ✓ Pruned {stats['pruned']:,} stale points")
+
+    if args.link and not args.dry_run:
+        print('\n🔗 Linking species to ecoregions (link_all_species_ecoregions)')
+        link_start = time.time()
+        result = supabase.rpc('link_all_species_ecoregions').execute()
+        for row in sorted(result.data, key=lambda r: -r['species_matched']):
+            print(f"   {row['ecoregion_name']}: {row['species_matched']:,} species")
+        print(f"   ✓ Linked in {time.time() - link_start:.1f}s")
+
+    print('\n' + '=' * 60)
+    print('🎉 Backfill complete')
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
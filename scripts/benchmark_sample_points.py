@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Sample Point Extraction Micro-Benchmark
+
+Times the vectorized extract_sample_points() from processIUCNShapefiles.py
+against the original per-coordinate Python loop on real IUCN range polygons,
+and checks that both produce identical sample points.
+
+Requirements:
+    pip install fiona "shapely>=2" numpy
+
+Usage:
+    python3 scripts/benchmark_sample_points.py
+    python3 scripts/benchmark_sample_points.py --archive data/iucn-spatial/mammals.zip --limit 500
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from shapely.geometry import shape
+
+sys.path.append(os.path.dirname(__file__))
+from processIUCNShapefiles import SHAPEFILE_DIR, extract_sample_points, range_coordinates
+from shapefile_reader import open_zipped_shapefile
+
+
+def extract_sample_points_loop(geometry: dict, max_points: int = 8) -> Tuple[List[Dict], Optional[float]]:
+    """Original pure-Python implementation, kept here as the benchmark baseline"""
+    if not geometry:
+        return [], None
+
+    geom = shape(geometry)
+
+    coords = []
+    if geom.geom_type == 'Point':
+        coords = [geom.coords[0]]
+    elif geom.geom_type in ('LineString', 'MultiPoint'):
+        coords = list(geom.coords)
+    elif geom.geom_type == 'Polygon':
+        coords = list(geom.exterior.coords)
+    elif geom.geom_type == 'MultiPolygon':
+        for poly in geom.geoms:
+            coords.extend(list(poly.exterior.coords))
+    elif geom.geom_type == 'MultiLineString':
+        for line in geom.geoms:
+            coords.extend(list(line.coords))
+
+    if not coords:
+        return [], None
+
+    bounds = geom.bounds
+    lat_diff = bounds[3] - bounds[1]
+    lng_diff = bounds[2] - bounds[0]
+    approx_area = lat_diff * lng_diff * 111 * 111
+
+    grid_size = int(max_points ** 0.5) + 1
+    lat_step = lat_diff / grid_size if lat_diff > 0 else 1
+    lng_step = lng_diff / grid_size if lng_diff > 0 else 1
+
+    grid_map = {}
+    for lng, lat in coords:
+        grid_lat = int((lat - bounds[1]) / lat_step) if lat_step > 0 else 0
+        grid_lng = int((lng - bounds[0]) / lng_step) if lng_step > 0 else 0
+        key = f"{grid_lat},{grid_lng}"
+
+        if key not in grid_map:
+            grid_map[key] = []
+        grid_map[key].append((lng, lat))
+
+    sample_points = []
+    for cell_coords in grid_map.values():
+        if len(sample_points) >= max_points:
+            break
+        mid_idx = len(cell_coords) // 2
+        lng, lat = cell_coords[mid_idx]
+        sample_points.append({'lat': lat, 'lng': lng})
+
+    if len(sample_points) < 4 and len(coords) >= 4:
+        extremes = [
+            coords[0],
+            coords[len(coords) // 3],
+            coords[(2 * len(coords)) // 3],
+            coords[-1]
+        ]
+        for lng, lat in extremes:
+            if len(sample_points) >= max_points:
+                break
+            too_close = any(
+                abs(p['lat'] - lat) < 0.5 and abs(p['lng'] - lng) < 0.5
+                for p in sample_points
+            )
+            if not too_close:
+                sample_points.append({'lat': lat, 'lng': lng})
+
+    return sample_points, approx_area
+
+
+def load_geometries(zip_path: Path, limit: int) -> List[dict]:
+    """Read up to `limit` range geometries straight from an IUCN archive"""
+    geometries = []
+    with open_zipped_shapefile(zip_path) as src:
+        for feature in src:
+            if feature['geometry']:
+                geometries.append(feature['geometry'])
+            if len(geometries) >= limit:
+                break
+    return geometries
+
+
+def time_function(func, geometries: List[dict], repeat: int) -> Tuple[float, list]:
+    """Best-of-`repeat` wall time for running func over every geometry"""
+    best = float('inf')
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(geometry, 8) for geometry in geometries]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized vs loop sample point extraction")
+    parser.add_argument("--archive", type=Path, default=None,
+                        help="IUCN zip archive to sample (default: first archive in data/iucn-spatial)")
+    parser.add_argument("--limit", type=int, default=200, help="Range polygons to benchmark (default: 200)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions, best is reported (default: 3)")
+    args = parser.parse_args()
+
+    zip_path = args.archive or next(iter(sorted(SHAPEFILE_DIR.glob('*.zip'))), None)
+    if not zip_path or not zip_path.exists():
+        print(f"❌ No IUCN archive found (looked in {SHAPEFILE_DIR})")
+        sys.exit(1)
+
+    print('⏱️  Sample Point Extraction Benchmark\n')
+    print('=' * 60)
+    print(f"\n📦 Loading {args.limit} range polygons from {zip_path.name}...")
+    geometries = load_geometries(zip_path, args.limit)
+    vertices = sum(len(range_coordinates(shape(geometry))) for geometry in geometries)
+    print(f"  ↳ {len(geometries)} polygons, {vertices:,} exterior vertices")
+
+    loop_time, loop_results = time_function(extract_sample_points_loop, geometries, args.repeat)
+    vector_time, vector_results = time_function(extract_sample_points, geometries, args.repeat)
+
+    mismatches = sum(1 for a, b in zip(loop_results, vector_results) if a != b)
+
+    print('\n' + '=' * 60)
+    print(f"   Loop:       {loop_time:.3f}s ({vertices / loop_time:,.0f} vertices/sec)")
+    print(f"   Vectorized: {vector_time:.3f}s ({vertices / vector_time:,.0f} vertices/sec)")
+    print(f"   Speedup:    {loop_time / vector_time:.1f}x")
+    print(f"   Mismatched results: {mismatches}")
+    print('=' * 60)
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,684 @@
+#!/usr/bin/env python3
+"""
+Offline Vector Tile Builder
+
+Writes a Mapbox Vector Tile (MVT 2.1) pyramid of ecoregions, parks and IUCN
+species ranges, so the globe can load static tiles from a CDN instead of
+running spatial RPCs on every pan and zoom.
+
+Layers:
+    ecoregions      full-resolution ecoregions.geometry (or a WWF shapefile)
+    parks           parks.bounds, or a point at the park center when bounds are
+                    missing (or a WDPA shapefile); from zoom 4
+    species_ranges  IUCN range polygons from the archives in data/iucn-spatial
+                    (GeoParquet cache used when built) - ranges are not stored
+                    as polygons in the database, and are too large to hold in
+                    every worker, so each task reads only the ranges whose bbox
+                    meets its tile (bbox pushdown on the cache, a spatial filter
+                    on shapefiles)
+
+Features are projected to Web Mercator once. Each tile clips its parent's
+clipped, full-resolution features, then simplifies in tile coordinates and
+snaps to the 4096-unit grid, so every zoom is simplified for its own pixel
+size and deep zooms never touch the whole world's geometry. Every tile below
+zoom 6 is one task; each zoom-6 tile is a task for its whole subtree, and
+tasks run across a process pool with --workers.
+
+Ecoregions and parks are loaded once and sent to every worker. Species ranges
+are read per task instead: a worker holds one task's slice at a time,
+projected and pre-simplified to a tile unit at the task's deepest zoom, read
+one archive at a time. The tasks above zoom 6 cover larger areas (the z0 task
+reads every range) but keep only that coarse, simplified copy; the price is
+reading the sources about once per zoom above 6 plus once more below it.
+
+Output is an MBTiles file (gzipped tiles, TMS rows) when the path ends in
+.mbtiles, otherwise a z/x/y.pbf directory with a TileJSON metadata.json.
+
+Requirements:
+    pip install fiona "shapely>=2.1" pyproj numpy supabase python-dotenv
+    pip install pyarrow   # optional, reads the GeoParquet cache built by source_cache.py
+
+Usage:
+    python3 scripts/build_vector_tiles.py                                 # data/tiles/globe.mbtiles, z0-10
+    python3 scripts/build_vector_tiles.py --workers 8 --output data/tiles/globe   # directory of .pbf files
+    python3 scripts/build_vector_tiles.py --layers ecoregions parks --max-zoom 8
+    python3 scripts/build_vector_tiles.py --ecoregions-shapefile ~/Downloads/protected-regions/WWF_Priority_Ecoregions.shp \\
+        --parks-shapefile ~/Downloads/protected-regions/WDPA_Oct2025_Public_shp-polygons.shp   # no database needed
+"""
+
+import os
+import sys
+import gzip
+import json
+import struct
+import sqlite3
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pyproj
+import shapely
+from shapely.geometry import Point
+from shapely.geometry.base import BaseGeometry
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(__file__))
+from source_cache import cached_source, count_features, shapefile_path, source_crs, source_fields, iter_features
+from geometry_derivation import parse_geography, parse_geometry, to_wgs84, wgs84_transformer
+from ecoregion_lod import fetch_full_geometry
+from keyset_reader import iter_row_pages, iter_rows
+
+# Load environment variables
+load_dotenv(override=True)
+
+# Configuration
+OUTPUT_PATH = Path(__file__).parent.parent / 'data' / 'tiles' / 'globe.mbtiles'
+IUCN_DIR = Path(__file__).parent.parent / 'data' / 'iucn-spatial'
+MIN_ZOOM = 0
+MAX_ZOOM = 10
+SPLIT_ZOOM = 6  # Each tile at this zoom is one task covering its subtree
+EXTENT = 4096  # Tile coordinate units per tile edge
+BUFFER = 64  # Overlap past the tile edge in tile units (hides seams between tiles)
+SIMPLIFY = 8  # Simplification tolerance in tile units (half a pixel on a 256 px tile)
+WORLD = 20037508.342789244  # Half the Web Mercator world width in meters
+MAX_LAT = 85.0511287798  # Web Mercator latitude limit
+
+LAYER_MINZOOM = {'ecoregions': 0, 'parks': 4, 'species_ranges': 0}
+
+# Tile layer property -> source shapefile fields (first non-empty wins)
+ECOREGION_FIELDS = {
+    'ecoregion_id': ('ECO_ID', 'PRIORIT_ID', 'G200_NUM'),
+    'name': ('ECO_NAME', 'FLAG_NAME', 'simple', 'G200_REGIO'),
+    'biome': ('BIOME', 'G200_BIOME'),
+    'realm': ('REALM', 'G200_REALM'),
+}
+PARK_FIELDS = {
+    'wdpa_id': ('WDPAID',),
+    'name': ('NAME',),
+    'iucn_category': ('IUCN_CAT',),
+}
+SPECIES_FIELDS = {
+    'iucn_id': ('id_no',),
+    'scientific_name': ('sci_name',),
+    'conservation_status': ('category',),
+    'presence': ('presence',),
+    'seasonal': ('seasonal',),
+}
+
+# (mercator geometries, their bounds, properties) per layer
+Layer = Tuple[np.ndarray, np.ndarray, List[Dict]]
+
+# (fiona path or cache file, its CRS, columns to read, field mapping) of a file layer
+FileSource = Tuple[str, Optional[str], List[str], Dict[str, tuple]]
+
+MERCATOR = pyproj.Transformer.from_crs('EPSG:4326', 'EPSG:3857', always_xy=True)
+
+
+def init_supabase() -> Client:
+    """Initialize Supabase client"""
+    url = os.getenv('VITE_SUPABASE_URL')
+    key = os.getenv('VITE_SUPABASE_SERVICE_KEY')
+    if not url or not key:
+        print('❌ Missing Supabase credentials')
+        sys.exit(1)
+    return create_client(url, key)
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+def make_layer(geoms: List[BaseGeometry], props: List[Dict], verbose: bool = True) -> Layer:
+    """Project lon/lat geometries to Web Mercator (clipped to its latitude limit), repairing invalid ones once"""
+    geoms = np.array(geoms, dtype=object)
+    invalid = ~shapely.is_valid(geoms)
+    if invalid.any():
+        if verbose:
+            print(f"  ↳ Repairing {invalid.sum():,} invalid geometries...")
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+    geoms = shapely.clip_by_rect(geoms, -180, -MAX_LAT, 180, MAX_LAT)
+    geoms = shapely.transform(geoms, lambda xy: np.column_stack(MERCATOR.transform(xy[:, 0], xy[:, 1])))
+    keep = ~shapely.is_empty(geoms)
+    return geoms[keep], shapely.bounds(geoms[keep]), [p for p, k in zip(props, keep) if k]
+
+
+def open_file_source(path: Path, fields: Dict[str, tuple], use_cache: bool = True) -> FileSource:
+    """Where and how to read a shapefile, zip archive or its GeoParquet cache"""
+    source = cached_source(path) if use_cache else None
+    if source:
+        print(f"  ↳ Using cached {Path(source).name}")
+    else:
+        source = shapefile_path(path)
+
+    available = set(source_fields(source))
+    columns = sorted({name for candidates in fields.values() for name in candidates} & available)
+    return source, source_crs(source), columns, fields
+
+
+def read_file_source(file_source: FileSource, bbox: Optional[Tuple[float, float, float, float]] = None,
+                     with_geometry: bool = True) -> Tuple[List[BaseGeometry], List[Dict]]:
+    """Lon/lat geometries and mapped properties of a file source, optionally only those meeting a lon/lat bbox"""
+    source, crs, columns, fields = file_source
+    transformer = wgs84_transformer(crs) if crs else None
+    if bbox is not None and transformer is not None:
+        bbox = transformer.transform_bounds(*bbox, direction='INVERSE')
+
+    geoms, props = [], []
+    for _, attrs, geometry in iter_features(source, columns=columns, with_geometry=with_geometry, bbox=bbox):
+        if with_geometry:
+            if not geometry:
+                continue
+            geoms.append(to_wgs84(parse_geometry(geometry), crs))
+        props.append({
+            key: next((attrs[name] for name in candidates if attrs.get(name) not in (None, '')), None)
+            for key, candidates in fields.items()
+        })
+    return geoms, props
+
+
+def read_file_layer(path: Path, fields: Dict[str, tuple], use_cache: bool = True
+                    ) -> Tuple[List[BaseGeometry], List[Dict]]:
+    """Lon/lat geometries and mapped properties of a shapefile, zip archive or its GeoParquet cache"""
+    return read_file_source(open_file_source(path, fields, use_cache))
+
+
+def fetch_db_ecoregions(supabase: Client, page_size: int = 1000) -> Tuple[List[BaseGeometry], List[Dict]]:
+    """Full-resolution ecoregion geometry, fetched one ecoregion at a time"""
+    rows = list(iter_rows(supabase, 'ecoregions', 'id, ecoregion_id, name, biome, realm',
+                          filters=lambda q: q.not_.is_('geometry', 'null'), page_size=page_size))
+
+    geoms, props = [], []
+    for i, row in enumerate(rows, 1):
+        print(f"  ↳ Loaded {i}/{len(rows)} ecoregion geometries...", end='\r')
+        geom = fetch_full_geometry(supabase, row['id'])
+        if geom is not None and not geom.is_empty:
+            geoms.append(geom)
+            props.append(row)
+    print()
+    return geoms, props
+
+
+def fetch_db_parks(supabase: Client, page_size: int = 1000) -> Tuple[List[BaseGeometry], List[Dict]]:
+    """Current parks: simplified bounds, or the center point when bounds are missing"""
+    geoms, props = [], []
+    pages = iter_row_pages(supabase, 'parks', 'id, wdpa_id, name, iucn_category, bounds, center_lat, center_lng',
+                           filters=lambda q: q.is_('retired_at', 'null'), page_size=page_size)
+    for page in pages:
+        for row in page:
+            geom = parse_geography(row.pop('bounds'))
+            center = (row.pop('center_lng'), row.pop('center_lat'))
+            if geom is None and None not in center:
+                geom = Point(float(center[0]), float(center[1]))
+            if geom is not None:
+                geoms.append(geom)
+                props.append(row)
+        print(f"  ↳ Loaded {len(geoms):,} parks...", end='\r')
+    print()
+    return geoms, props
+
+
+# ---------------------------------------------------------------------------
+# Tiling
+# ---------------------------------------------------------------------------
+
+def tile_bounds(z: int, x: int, y: int, buffer: float = 0) -> Tuple[float, float, float, float]:
+    """Web Mercator bounds of a tile, grown by `buffer` tile units"""
+    size = 2 * WORLD / (1 << z)
+    pad = size * buffer / EXTENT
+    minx = -WORLD + x * size
+    maxy = WORLD - y * size
+    return minx - pad, maxy - size - pad, minx + size + pad, maxy + pad
+
+
+def clip_layers(layers: Dict[str, Layer], bounds: Tuple[float, float, float, float]) -> Dict[str, Layer]:
+    """Features clipped to `bounds`; layers with nothing left are dropped"""
+    minx, miny, maxx, maxy = bounds
+    clipped = {}
+    for name, (geoms, geom_bounds, props) in layers.items():
+        idx = np.flatnonzero((geom_bounds[:, 2] >= minx) & (geom_bounds[:, 0] <= maxx)
+                             & (geom_bounds[:, 3] >= miny) & (geom_bounds[:, 1] <= maxy))
+        if not idx.size:
+            continue
+        parts = shapely.clip_by_rect(geoms[idx], minx, miny, maxx, maxy)
+        keep = ~shapely.is_empty(parts)
+        if keep.any():
+            clipped[name] = (parts[keep], shapely.bounds(parts[keep]), [props[i] for i in idx[keep]])
+    return clipped
+
+
+def zigzag(values: np.ndarray) -> np.ndarray:
+    return (values << 1) ^ (values >> 63)
+
+
+def command(cmd_id: int, count: int) -> int:
+    return (cmd_id & 0x7) | (count << 3)
+
+
+def encode_geometry(geom: BaseGeometry) -> Optional[Tuple[int, List[int]]]:
+    """(MVT geometry type, command stream) of a geometry already in integer tile coordinates"""
+    cursor = np.zeros(2, dtype=np.int64)
+
+    if geom.geom_type in ('Point', 'MultiPoint'):
+        points = np.rint(shapely.get_coordinates(geom)).astype(np.int64)
+        deltas = np.diff(np.vstack([cursor, points]), axis=0)
+        return 1, [command(1, len(points))] + zigzag(deltas).ravel().tolist()
+
+    commands = []
+    for polygon in shapely.get_parts(geom):
+        if polygon.geom_type != 'Polygon':
+            continue  # Lines and points left over from snapping a collapsed polygon
+        for ring_index, ring in enumerate([polygon.exterior, *polygon.interiors]):
+            points = np.rint(np.asarray(ring.coords)[:-1]).astype(np.int64)
+            if len(points) < 3:
+                if ring_index == 0:
+                    break
+                continue
+            deltas = np.diff(np.vstack([cursor, points]), axis=0)
+            cursor = points[-1]
+            encoded = zigzag(deltas)
+            commands.append(command(1, 1))
+            commands.extend(encoded[0].tolist())
+            commands.append(command(2, len(points) - 1))
+            commands.extend(encoded[1:].ravel().tolist())
+            commands.append(command(7, 1))
+    return (3, commands) if commands else None
+
+
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def packed(values: List[int]) -> bytes:
+    return b''.join(varint(v) for v in values)
+
+
+def field(number: int, payload: bytes) -> bytes:
+    """Length-delimited protobuf field"""
+    return varint((number << 3) | 2) + varint(len(payload)) + payload
+
+
+def encode_value(value) -> bytes:
+    """MVT Value message"""
+    if isinstance(value, bool):
+        return varint((7 << 3) | 0) + varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return varint((5 << 3) | 0) + varint(value)
+        return varint((6 << 3) | 0) + varint((value << 1) ^ (value >> 63))
+    if isinstance(value, float):
+        return varint((3 << 3) | 1) + struct.pack('<d', value)
+    return field(1, str(value).encode())
+
+
+def encode_layer(name: str, geoms: np.ndarray, props: List[Dict]) -> Optional[bytes]:
+    """MVT Layer message (None if no feature survives encoding)"""
+    keys, values = {}, {}
+    features = []
+    for geom, attrs in zip(geoms, props):
+        if geom is None or geom.is_empty:
+            continue
+        encoded = encode_geometry(geom)
+        if encoded is None:
+            continue
+        geom_type, commands = encoded
+
+        tags = []
+        for key, value in attrs.items():
+            if value is None:
+                continue
+            if not isinstance(value, (bool, int, float, str)):
+                value = float(value) if hasattr(value, 'is_finite') else str(value)  # Decimal / uuid
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+
+        features.append(field(2, field(2, packed(tags)) + varint((3 << 3) | 0) + varint(geom_type)
+                              + field(4, packed(commands))))
+
+    if not features:
+        return None
+    return (varint((15 << 3) | 0) + varint(2) + field(1, name.encode()) + b''.join(features)
+            + b''.join(field(3, key.encode()) for key in keys)
+            + b''.join(field(4, encode_value(value)) for _, value in values)
+            + varint((5 << 3) | 0) + varint(EXTENT))
+
+
+def snap_to_grid(geoms: np.ndarray) -> np.ndarray:
+    """Snap to integer tile coordinates; set_precision also repairs what snapping breaks"""
+    try:
+        return shapely.set_precision(geoms, 1.0)
+    except shapely.errors.GEOSException:
+        # One geometry the simplifier left invalid fails the whole array; repair just that one
+        snapped = np.empty(len(geoms), dtype=object)
+        for i, geom in enumerate(geoms):
+            try:
+                snapped[i] = shapely.set_precision(geom, 1.0)
+            except shapely.errors.GEOSException:
+                snapped[i] = shapely.set_precision(shapely.make_valid(geom), 1.0)
+        return snapped
+
+
+def render_tile(layers: Dict[str, Layer], z: int, x: int, y: int) -> Optional[bytes]:
+    """MVT Tile message for already clipped layers (None if empty)"""
+    minx, _, maxx, maxy = tile_bounds(z, x, y)
+    scale = EXTENT / (maxx - minx)
+
+    def to_tile(xy: np.ndarray) -> np.ndarray:
+        return np.column_stack(((xy[:, 0] - minx) * scale, (maxy - xy[:, 1]) * scale))
+
+    encoded = []
+    for name, (geoms, _, props) in layers.items():
+        if z < LAYER_MINZOOM[name]:
+            continue
+        tile_geoms = shapely.transform(geoms, to_tile)
+        tile_geoms = shapely.simplify(tile_geoms, SIMPLIFY, preserve_topology=True)
+        tile_geoms = snap_to_grid(tile_geoms)
+        # MVT exterior rings have positive surveyor's-formula area in tile coordinates (y down)
+        tile_geoms = shapely.orient_polygons(tile_geoms, exterior_cw=False)
+        layer = encode_layer(name, tile_geoms, props)
+        if layer:
+            encoded.append(field(3, layer))
+    return b''.join(encoded) if encoded else None
+
+
+def build_subtree(layers: Dict[str, Layer], z: int, x: int, y: int, max_zoom: int
+                  ) -> Iterator[Tuple[int, int, int, bytes]]:
+    """Tiles of (z, x, y) and its descendants down to max_zoom; children clip the parent's features"""
+    layers = clip_layers(layers, tile_bounds(z, x, y, BUFFER))
+    if not layers:
+        return
+
+    data = render_tile(layers, z, x, y)
+    if data:
+        yield z, x, y, data
+
+    if z < max_zoom:
+        for child_x in (2 * x, 2 * x + 1):
+            for child_y in (2 * y, 2 * y + 1):
+                yield from build_subtree(layers, z + 1, child_x, child_y, max_zoom)
+
+
+def lonlat_bounds(bounds: Tuple[float, float, float, float]) -> Tuple[float, float, float, float]:
+    """Lon/lat bbox of Web Mercator bounds"""
+    minx, miny, maxx, maxy = (max(-WORLD, min(WORLD, v)) for v in bounds)
+    (west, east), (south, north) = MERCATOR.transform([minx, maxx], [miny, maxy], direction='INVERSE')
+    return west, south, east, north
+
+
+def read_slice(file_sources: List[FileSource], z: int, x: int, y: int, max_zoom: int) -> Optional[Layer]:
+    """
+    Projected features of the file sources meeting tile (z, x, y), simplified
+    to one tile unit at max_zoom (well under SIMPLIFY, so tiles look the same)
+    """
+    bounds = tile_bounds(z, x, y, BUFFER)
+    bbox = lonlat_bounds(bounds)
+    tolerance = 2 * WORLD / (1 << max_zoom) / EXTENT
+    parts = []
+    for file_source in file_sources:
+        geoms, props = read_file_source(file_source, bbox)
+        if not geoms:
+            continue
+        geoms, _, props = make_layer(geoms, props, verbose=False)
+        geoms = shapely.simplify(shapely.clip_by_rect(geoms, *bounds), tolerance, preserve_topology=True)
+        keep = ~shapely.is_empty(geoms)
+        parts.append((geoms[keep], [p for p, k in zip(props, keep) if k]))
+    if not parts:
+        return None
+    geoms = np.concatenate([g for g, _ in parts])
+    return geoms, shapely.bounds(geoms), [p for _, props in parts for p in props]
+
+
+_layers: Dict[str, Layer] = {}
+_file_layers: Dict[str, List[FileSource]] = {}
+
+
+def init_worker(layers: Dict[str, Layer], file_layers: Dict[str, List[FileSource]]):
+    """Worker initializer: the projected layers are sent once per process, file layers only as paths"""
+    global _layers, _file_layers
+    _layers = layers
+    _file_layers = file_layers
+
+
+def build_tiles(task: Tuple[int, int, int, int]) -> List[Tuple[int, int, int, bytes]]:
+    """Worker entry point: all tiles of one task (a single tile, or a subtree)"""
+    z, x, y, max_zoom = task
+    layers = dict(_layers)
+    for name, file_sources in _file_layers.items():
+        layer = read_slice(file_sources, z, x, y, max_zoom)
+        if layer is not None:
+            layers[name] = layer
+    return list(build_subtree(layers, z, x, y, max_zoom))
+
+
+def tile_tasks(min_zoom: int, max_zoom: int) -> List[Tuple[int, int, int, int]]:
+    """Single-tile tasks above the split zoom, one subtree task per tile at it"""
+    split = min(max(SPLIT_ZOOM, min_zoom), max_zoom)
+    tasks = [(z, x, y, z) for z in range(min_zoom, split) for x in range(1 << z) for y in range(1 << z)]
+    tasks.extend((split, x, y, max_zoom) for x in range(1 << split) for y in range(1 << split))
+    return tasks
+
+
+def run_tasks(tasks: List[tuple], pool: Optional[ProcessPoolExecutor], max_pending: int
+              ) -> Iterator[List[Tuple[int, int, int, bytes]]]:
+    """Task results, at most max_pending tasks in flight when parallel"""
+    if pool is None:
+        yield from map(build_tiles, tasks)
+        return
+
+    remaining = iter(tasks)
+    pending = deque()
+    for task in remaining:
+        pending.append(pool.submit(build_tiles, task))
+        if len(pending) >= max_pending:
+            break
+    while pending:
+        result = pending.popleft().result()
+        task = next(remaining, None)
+        if task is not None:
+            pending.append(pool.submit(build_tiles, task))
+        yield result
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def tile_metadata(name: str, layer_props: Dict[str, List[Dict]], min_zoom: int, max_zoom: int) -> Dict:
+    """TileJSON-style metadata with the vector_layers description"""
+    vector_layers = []
+    for layer_name, props in layer_props.items():
+        fields = {}
+        for attrs in props:
+            for key, value in attrs.items():
+                if value is not None and key not in fields:
+                    fields[key] = 'Number' if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                        else 'Boolean' if isinstance(value, bool) else 'String'
+        vector_layers.append({'id': layer_name, 'fields': fields,
+                              'minzoom': max(min_zoom, LAYER_MINZOOM[layer_name]), 'maxzoom': max_zoom})
+    return {
+        'name': name,
+        'format': 'pbf',
+        'minzoom': min_zoom,
+        'maxzoom': max_zoom,
+        'bounds': [-180, -MAX_LAT, 180, MAX_LAT],
+        'vector_layers': vector_layers,
+    }
+
+
+class MBTilesWriter:
+    """MBTiles 1.3 file, written to a temporary path and moved into place on close"""
+
+    def __init__(self, path: Path, metadata: Dict):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_suffix('.mbtiles.tmp')
+        self.metadata = metadata
+        self.tmp_path.unlink(missing_ok=True)
+        self.db = sqlite3.connect(self.tmp_path)
+        self.db.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+        self.db.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, '
+                        'tile_data BLOB)')
+        self.count = 0
+
+    def write(self, z: int, x: int, y: int, data: bytes):
+        # MBTiles rows count from the bottom (TMS)
+        self.db.execute('INSERT INTO tiles VALUES (?, ?, ?, ?)', (z, x, (1 << z) - 1 - y, gzip.compress(data)))
+        self.count += 1
+
+    def close(self):
+        metadata = dict(self.metadata)
+        metadata['json'] = json.dumps({'vector_layers': metadata.pop('vector_layers')})
+        metadata['bounds'] = ','.join(str(v) for v in metadata['bounds'])
+        self.db.executemany('INSERT INTO metadata VALUES (?, ?)', [(k, str(v)) for k, v in metadata.items()])
+        self.db.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+        self.db.commit()
+        self.db.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class DirectoryWriter:
+    """z/x/y.pbf files (uncompressed) plus metadata.json"""
+
+    def __init__(self, path: Path, metadata: Dict):
+        self.path = Path(path)
+        self.metadata = metadata
+        self.count = 0
+
+    def write(self, z: int, x: int, y: int, data: bytes):
+        tile_dir = self.path / str(z) / str(x)
+        tile_dir.mkdir(parents=True, exist_ok=True)
+        (tile_dir / f"{y}.pbf").write_bytes(data)
+        self.count += 1
+
+    def close(self):
+        metadata = {'tilejson': '3.0.0', 'tiles': ['{z}/{x}/{y}.pbf'], **self.metadata}
+        (self.path / 'metadata.json').write_text(json.dumps(metadata, indent=2))
+
+
+def create_tile_writer(path: Path, metadata: Dict):
+    """MBTiles writer for *.mbtiles paths, directory writer otherwise"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.mbtiles':
+        return MBTilesWriter(path, metadata)
+    path.mkdir(exist_ok=True)
+    return DirectoryWriter(path, metadata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline vector tile pyramid of ecoregions, parks and species ranges")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH,
+                        help=f"MBTiles file (*.mbtiles) or directory for z/x/y.pbf tiles (default: {OUTPUT_PATH})")
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM, help=f"Lowest zoom (default: {MIN_ZOOM})")
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM, help=f"Highest zoom (default: {MAX_ZOOM})")
+    parser.add_argument("--layers", nargs='+', choices=list(LAYER_MINZOOM), default=list(LAYER_MINZOOM),
+                        help="Layers to include (default: all)")
+    parser.add_argument("--ecoregions-shapefile", type=Path,
+                        help="Read ecoregions from this WWF shapefile instead of the database")
+    parser.add_argument("--parks-shapefile", type=Path,
+                        help="Read parks from this WDPA shapefile instead of the database")
+    parser.add_argument("--species-dir", type=Path, default=IUCN_DIR,
+                        help=f"Directory of IUCN range archives (default: {IUCN_DIR})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Read the shapefiles even if a GeoParquet cache exists")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to build tiles (default: 1, serial)")
+    args = parser.parse_args()
+    if not 0 <= args.min_zoom <= args.max_zoom <= 16:
+        parser.error("zooms must satisfy 0 <= --min-zoom <= --max-zoom <= 16")
+
+    print('🗺️  Offline Vector Tile Builder\n')
+    print('=' * 60)
+
+    start_time = time.time()
+    needs_db = ('ecoregions' in args.layers and not args.ecoregions_shapefile) or \
+               ('parks' in args.layers and not args.parks_shapefile)
+    supabase = init_supabase() if needs_db else None
+    use_cache = not args.no_cache
+
+    sources = {}
+    if 'ecoregions' in args.layers:
+        print('\n📍 Ecoregions')
+        sources['ecoregions'] = read_file_layer(args.ecoregions_shapefile, ECOREGION_FIELDS, use_cache) \
+            if args.ecoregions_shapefile else fetch_db_ecoregions(supabase)
+    if 'parks' in args.layers:
+        print('\n🏞️  Parks')
+        sources['parks'] = read_file_layer(args.parks_shapefile, PARK_FIELDS, use_cache) \
+            if args.parks_shapefile else fetch_db_parks(supabase)
+
+    # Species ranges stay on disk: tasks read their own slice (see read_slice)
+    file_layers = {}
+    if 'species_ranges' in args.layers:
+        print('\n🦎 Species ranges')
+        file_sources = []
+        for archive in sorted(args.species_dir.glob('*.zip')):
+            print(f"  📦 {archive.name}")
+            try:
+                file_source = open_file_source(archive, SPECIES_FIELDS, use_cache)
+                print(f"  ↳ {count_features(file_source[0]):,} ranges")
+            except Exception as e:
+                print(f"  ✗ Error reading {archive.name}: {e}")
+                continue
+            file_sources.append(file_source)
+        if file_sources:
+            file_layers['species_ranges'] = file_sources
+
+    layers = {}
+    layer_props = {}
+    for name, (geoms, props) in sources.items():
+        if geoms:
+            layers[name] = make_layer(geoms, props)
+            layer_props[name] = layers[name][2]
+        print(f"   ✓ {name}: {len(layers[name][0]) if name in layers else 0:,} features")
+    for name, file_sources in file_layers.items():
+        # Attributes only, for the vector_layers field types
+        layer_props[name] = [p for file_source in file_sources
+                             for p in read_file_source(file_source, with_geometry=False)[1]]
+        print(f"   ✓ {name}: {len(layer_props[name]):,} features (read per task)")
+
+    if not layer_props:
+        print('\n❌ No features to tile')
+        sys.exit(1)
+
+    tasks = tile_tasks(args.min_zoom, args.max_zoom)
+    metadata = tile_metadata(args.output.stem, layer_props, args.min_zoom, args.max_zoom)
+    del layer_props
+    writer = create_tile_writer(args.output, metadata)
+    print(f"\n⚙️  Building z{args.min_zoom}-{args.max_zoom} ({len(tasks):,} tasks) → {args.output}")
+
+    init_worker(layers, file_layers)
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                               initargs=(layers, file_layers)) if args.workers > 1 else None
+    if pool:
+        print(f"⚙️  Using {args.workers} worker processes")
+
+    tiles_per_zoom = {}
+    tile_bytes = 0
+    try:
+        for done, tiles in enumerate(run_tasks(tasks, pool, args.workers * 2), 1):
+            for z, x, y, data in tiles:
+                writer.write(z, x, y, data)
+                tiles_per_zoom[z] = tiles_per_zoom.get(z, 0) + 1
+                tile_bytes += len(data)
+            print(f"  ↳ {done:,}/{len(tasks):,} tasks, {writer.count:,} tiles...", end='\r')
+    finally:
+        if pool:
+            pool.shutdown()
+    writer.close()
+
+    print('\n\n' + '=' * 60)
+    print(f"🎉 Wrote {writer.count:,} tiles ({tile_bytes / 1e6:,.1f} MB uncompressed) "
+          f"in {(time.time() - start_time) / 60:.1f} minutes\n")
+    for z in sorted(tiles_per_zoom):
+        print(f"   z{z}: {tiles_per_zoom[z]:,} tiles")
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
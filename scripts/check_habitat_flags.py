@@ -4,9 +4,13 @@ Check if habitat flags (is_marine, is_terrestrial, is_freshwater) are populated
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_rows
+
 load_dotenv(override=True)
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -53,44 +57,36 @@ for sp in terrestrial_sample.data:
     print(f'  • {sp["scientific_name"]} ({sp.get("class")}) - M:{sp["is_marine"]}, T:{sp["is_terrestrial"]}, F:{sp["is_freshwater"]}')
 
 # Check species linked to Coral Triangle and Borneo
+def print_habitat_breakdown(ecoregion_id):
+    """Habitat flag counts over every species linked to an ecoregion"""
+    linked = [row['species'] for row in iter_rows(
+        supabase, 'species_ecoregions', 'species(scientific_name, is_marine, is_terrestrial, is_freshwater, class)',
+        key='species_id', filters=lambda q: q.eq('ecoregion_id', ecoregion_id))]
+    if not linked:
+        print('  No linked species')
+        return
+
+    marine_count = sum(1 for s in linked if s['is_marine'])
+    terrestrial_count = sum(1 for s in linked if s['is_terrestrial'])
+    freshwater_count = sum(1 for s in linked if s['is_freshwater'])
+
+    print(f'  All {len(linked):,} linked species:')
+    print(f'    Marine:      {marine_count:4} ({marine_count/len(linked)*100:.1f}%)')
+    print(f'    Terrestrial: {terrestrial_count:4} ({terrestrial_count/len(linked)*100:.1f}%)')
+    print(f'    Freshwater:  {freshwater_count:4} ({freshwater_count/len(linked)*100:.1f}%)')
+
 print('\n' + '=' * 70)
 print('🌊 Coral Triangle - Habitat Breakdown:\n')
 
 coral = supabase.table('ecoregions').select('id').eq('name', 'Coral Triangle').single().execute()
 if coral.data:
-    coral_species = supabase.table('species_ecoregions')\
-        .select('species(scientific_name, is_marine, is_terrestrial, is_freshwater, class)')\
-        .eq('ecoregion_id', coral.data['id'])\
-        .limit(1000)\
-        .execute()
-
-    marine_count = sum(1 for s in coral_species.data if s['species']['is_marine'])
-    terrestrial_count = sum(1 for s in coral_species.data if s['species']['is_terrestrial'])
-    freshwater_count = sum(1 for s in coral_species.data if s['species']['is_freshwater'])
-
-    print(f'  Sample of 1,000 species:')
-    print(f'    Marine:      {marine_count:4} ({marine_count/len(coral_species.data)*100:.1f}%)')
-    print(f'    Terrestrial: {terrestrial_count:4} ({terrestrial_count/len(coral_species.data)*100:.1f}%)')
-    print(f'    Freshwater:  {freshwater_count:4} ({freshwater_count/len(coral_species.data)*100:.1f}%)')
+    print_habitat_breakdown(coral.data['id'])
 
 print('\n🦧 Borneo - Habitat Breakdown:\n')
 
 borneo = supabase.table('ecoregions').select('id').eq('name', 'Borneo').single().execute()
 if borneo.data:
-    borneo_species = supabase.table('species_ecoregions')\
-        .select('species(scientific_name, is_marine, is_terrestrial, is_freshwater, class)')\
-        .eq('ecoregion_id', borneo.data['id'])\
-        .limit(1000)\
-        .execute()
-
-    marine_count = sum(1 for s in borneo_species.data if s['species']['is_marine'])
-    terrestrial_count = sum(1 for s in borneo_species.data if s['species']['is_terrestrial'])
-    freshwater_count = sum(1 for s in borneo_species.data if s['species']['is_freshwater'])
-
-    print(f'  Sample of 1,000 species:')
-    print(f'    Marine:      {marine_count:4} ({marine_count/len(borneo_species.data)*100:.1f}%)')
-    print(f'    Terrestrial: {terrestrial_count:4} ({terrestrial_count/len(borneo_species.data)*100:.1f}%)')
-    print(f'    Freshwater:  {freshwater_count:4} ({freshwater_count/len(borneo_species.data)*100:.1f}%)')
+    print_habitat_breakdown(borneo.data['id'])
 
 print('\n' + '=' * 70)
 print('\n✅ YES! The habitat flags are available and can be used for filtering!')
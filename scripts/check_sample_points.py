@@ -2,9 +2,14 @@
 """Check if sample_points are properly stored as JSONB"""
 
 import os
+import sys
+from collections import Counter
 from dotenv import load_dotenv
 from supabase import create_client
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_species_pages
+
 load_dotenv(override=True)
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -53,4 +58,14 @@ null_result = supabase.table('species')\
 print(f'   With NULL sample_points: {null_result.count}')
 print(f'   With valid sample_points: {count_result.count - null_result.count}')
 
+# Storage type of every non-NULL sample_points value, not just the sample above
+types = Counter()
+for page in iter_species_pages(supabase, 'id, sample_points',
+                               filters=lambda q: q.not_.is_('sample_points', 'null')):
+    types.update(type(species['sample_points']).__name__ for species in page)
+print(f'   Stored as JSONB array: {types.pop("list", 0)}')
+print(f'   Stored as STRING: {types.pop("str", 0)}')
+for type_name, count in types.items():
+    print(f'   Stored as {type_name}: {count}')
+
 print('\n' + '=' * 60)
@@ -2,9 +2,13 @@
 """Check species statistics in database"""
 
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_species
+
 load_dotenv()
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -15,48 +19,56 @@ print("📊 Species Database Statistics\n")
 print("=" * 60)
 
 # Total count
-total = supabase.table('species').select('*', count='exact').execute()
+total = supabase.table('species').select('*', count='exact', head=True).execute()
 print(f"\n🌍 Total species records (with variants): {total.count}")
 
+# One streamed pass over every row (a plain select stops at the API row cap)
+unique_ids = set()
+class_counts = {}
+status_counts = {}
+unique_mammals = set()
+mammal_records = 0
+with_subspecies = 0
+with_subpop = 0
+
+for record in iter_species(supabase, 'iucn_id, class, conservation_status, subspecies, subpopulation'):
+    unique_ids.add(record['iucn_id'])
+
+    cls = record['class'] or 'Unknown'
+    class_counts[cls] = class_counts.get(cls, 0) + 1
+
+    status = record['conservation_status'] or 'Unknown'
+    status_counts[status] = status_counts.get(status, 0) + 1
+
+    if record['class'] == 'MAMMALIA':
+        mammal_records += 1
+        unique_mammals.add(record['iucn_id'])
+        if record.get('subspecies') and record['subspecies'] != '':
+            with_subspecies += 1
+        if record.get('subpopulation') and record['subpopulation'] != '':
+            with_subpop += 1
+
 # Unique species count (distinct iucn_id)
-unique = supabase.table('species').select('iucn_id').execute()
-unique_ids = set(record['iucn_id'] for record in unique.data)
 print(f"🔢 Unique species (distinct iucn_id): {len(unique_ids)}")
 
 # Count by class
 print("\n📚 Breakdown by Class:")
-classes = supabase.table('species').select('class').execute()
-class_counts = {}
-for record in classes.data:
-    cls = record['class'] or 'Unknown'
-    class_counts[cls] = class_counts.get(cls, 0) + 1
-
 for cls, count in sorted(class_counts.items(), key=lambda x: x[1], reverse=True):
     print(f"   {cls}: {count:,}")
 
 # Mammals breakdown
 print("\n🦁 Mammals Details:")
-mammals = supabase.table('species').select('*').eq('class', 'MAMMALIA').execute()
-print(f"   Total mammal records (with variants): {len(mammals.data)}")
+print(f"   Total mammal records (with variants): {mammal_records}")
 
 # Unique mammals
-unique_mammals = set(record['iucn_id'] for record in mammals.data)
 print(f"   Unique mammal species: {len(unique_mammals)}")
 
 # Count with subspecies
-with_subspecies = [r for r in mammals.data if r.get('subspecies') and r['subspecies'] != '']
-with_subpop = [r for r in mammals.data if r.get('subpopulation') and r['subpopulation'] != '']
-print(f"   Mammals with subspecies data: {len(with_subspecies)}")
-print(f"   Mammals with subpopulation data: {len(with_subpop)}")
+print(f"   Mammals with subspecies data: {with_subspecies}")
+print(f"   Mammals with subpopulation data: {with_subpop}")
 
 # Conservation status breakdown
 print("\n⚠️  Conservation Status (all species):")
-statuses = supabase.table('species').select('conservation_status').execute()
-status_counts = {}
-for record in statuses.data:
-    status = record['conservation_status'] or 'Unknown'
-    status_counts[status] = status_counts.get(status, 0) + 1
-
 status_order = ['CR', 'EN', 'VU', 'NT', 'LC', 'DD', 'EX', 'EW']
 for status in status_order:
     if status in status_counts:
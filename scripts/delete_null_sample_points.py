@@ -2,9 +2,13 @@
 """Delete species with NULL sample_points (old records before the fix)"""
 
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_species_pages
+
 load_dotenv(override=True)
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -33,20 +37,24 @@ if null_count.count == 0:
 print(f'\n⚠️  Deleting {null_count.count} species with NULL sample_points')
 print('   These are old records from before the JSONB fix')
 
-# Delete all NULL records in one operation
-# (Service role bypasses RLS and should handle large deletes)
+# Delete one keyset page of ids at a time, so no single statement can time out
 print('\n🔄 Deleting records (this may take a minute)...')
 
+deleted = 0
 try:
-    result = supabase.table('species')\
-        .delete()\
-        .is_('sample_points', 'null')\
-        .execute()
+    pages = iter_species_pages(supabase, 'id', filters=lambda q: q.is_('sample_points', 'null'))
+    for page in pages:
+        supabase.table('species')\
+            .delete()\
+            .in_('id', [species['id'] for species in page])\
+            .execute()
+        deleted += len(page)
+        print(f'   ↳ Deleted {deleted}/{null_count.count}...', end='\r')
 
-    print(f'✅ Deletion complete!')
+    print(f'\n✅ Deletion complete!')
 except Exception as e:
-    print(f'❌ Error during deletion: {e}')
-    print('   The delete may have timed out. Checking remaining records...')
+    print(f'\n❌ Error during deletion: {e}')
+    print('   Checking remaining records...')
 
 # Get count after
 after = supabase.table('species').select('*', count='exact', head=True).execute()
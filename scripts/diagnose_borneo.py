@@ -5,10 +5,14 @@ Check if IUCN species exist in Borneo region
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client
 import math
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_species_pages
+
 load_dotenv(override=True)
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -52,20 +56,12 @@ print('   Fetching species with sample points...')
 
 species_in_region = []
 checked = 0
-batch_size = 1000
-offset = 0
-
-while True:
-    batch = supabase.table('species')\
-        .select('id, scientific_name, common_name, sample_points')\
-        .not_.is_('sample_points', 'null')\
-        .range(offset, offset + batch_size - 1)\
-        .execute()
 
-    if not batch.data:
-        break
+species_pages = iter_species_pages(supabase, 'id, scientific_name, common_name, sample_points',
+                                   filters=lambda q: q.not_.is_('sample_points', 'null'))
 
-    for species in batch.data:
+for batch in species_pages:
+    for species in batch:
         sample_points = species.get('sample_points', [])
         if not sample_points or not isinstance(sample_points, list):
             continue
@@ -85,8 +81,7 @@ while True:
                     })
                     break  # Found one point in region, that's enough
 
-    checked += len(batch.data)
-    offset += batch_size
+    checked += len(batch)
 
     if checked % 10000 == 0:
         print(f'   Checked {checked:,} species, found {len(species_in_region):,} in region...')
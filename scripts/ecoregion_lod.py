@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Ecoregion Level-of-Detail Builder
+
+Writes simplified tiers of every ecoregion geometry next to the full-resolution
+ecoregions.geometry, plus its bounding box and vertex count:
+
+    geometry_1km    ~1 km tolerance    regional rendering, close-up display
+    geometry_10km   ~10 km tolerance   candidate filtering (LodMatcher below)
+    geometry_50km   ~50 km tolerance   globe rendering
+
+Tiers are topology-preserving simplifications, so every tier stays within its
+tolerance of the true boundary. LodMatcher uses that bound for point-in-polygon
+tests: a point inside the tier shrunk by the tolerance is inside, a point
+outside the tier grown by the tolerance is outside, and only points in the
+band between need the full-resolution geometry, which is loaded on first use.
+Loading and matching cost then follow the coarse tier's vertex count.
+
+Ecoregions are read and updated one at a time, so memory stays at one
+full-resolution geometry however large the ecoregions are.
+
+Requirements:
+    pip install "shapely>=2" pyproj numpy supabase python-dotenv
+
+Usage:
+    python3 scripts/ecoregion_lod.py                 # build tiers for every ecoregion with geometry
+    python3 scripts/ecoregion_lod.py --writer copy   # update over a direct Postgres connection
+
+    from ecoregion_lod import LodMatcher
+    matcher = LodMatcher(coarse_geom, LOD_TIERS['geometry_10km'], load_full=lambda: full_geom)
+    inside = matcher.contains_xy(lngs, lats)
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Callable, Dict, Iterator, Optional
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from geometry_derivation import KM_PER_DEGREE, parse_geography, to_ewkb
+from keyset_reader import iter_rows
+
+# Load environment variables
+load_dotenv(override=True)
+
+# Tier column -> simplification tolerance in degrees
+LOD_TIERS = {
+    'geometry_1km': 1 / KM_PER_DEGREE,
+    'geometry_10km': 10 / KM_PER_DEGREE,
+    'geometry_50km': 50 / KM_PER_DEGREE,
+}
+MATCH_TIER = 'geometry_10km'  # Tier LodMatcher filters with
+# Slack on the tolerance bound for the grown/shrunk tiers. With quad_segs=2 a
+# round join is approximated by chords every 45 degrees, whose midpoints sit
+# only cos(22.5 deg) ~= 0.924 of the buffer distance from the tier, so the
+# buffer is guaranteed to reach tolerance only when MARGIN >= 1 / cos(pi / 8)
+# ~= 1.083. 1.1 covers that plus float noise.
+MARGIN = 1.1
+
+
+def init_supabase() -> Client:
+    """Initialize Supabase client"""
+    url = os.getenv('VITE_SUPABASE_URL')
+    key = os.getenv('VITE_SUPABASE_SERVICE_KEY')
+    if not url or not key:
+        print('❌ Missing Supabase credentials')
+        sys.exit(1)
+    return create_client(url, key)
+
+
+def vertex_count(geom: Optional[BaseGeometry]) -> int:
+    return int(shapely.get_num_coordinates(geom)) if geom is not None else 0
+
+
+def lod_record(geom: BaseGeometry) -> Dict:
+    """Tier EWKBs, bbox and vertex count for one full-resolution geometry"""
+    min_lng, min_lat, max_lng, max_lat = geom.bounds
+    record = {
+        'bbox_min_lat': min_lat,
+        'bbox_min_lng': min_lng,
+        'bbox_max_lat': max_lat,
+        'bbox_max_lng': max_lng,
+        'geometry_vertices': vertex_count(geom),
+    }
+    for column, tolerance in LOD_TIERS.items():
+        tier = shapely.simplify(geom, tolerance, preserve_topology=True)
+        record[column] = to_ewkb(tier, multi=True) if not tier.is_empty else None
+    return record
+
+
+class LodMatcher:
+    """
+    Point-in-polygon for one ecoregion: bbox, then the coarse tier grown and
+    shrunk by its tolerance, then the full geometry only for points in the band
+    """
+
+    def __init__(self, coarse: BaseGeometry, tolerance: float, load_full: Callable[[], BaseGeometry]):
+        margin = tolerance * MARGIN
+        if not coarse.is_valid:
+            coarse = shapely.make_valid(coarse)  # Buffering drops self-overlapping parts of invalid rings
+        self.outer = shapely.buffer(coarse, margin, quad_segs=2)
+        self.inner = shapely.buffer(coarse, -margin, quad_segs=2)
+        shapely.prepare(self.outer)
+        shapely.prepare(self.inner)
+        self.bbox = self.outer.bounds
+        self._load_full = load_full
+        self._full = None
+        self.exact_tests = 0
+
+    @classmethod
+    def from_full(cls, geom: BaseGeometry, tolerance: float = LOD_TIERS[MATCH_TIER]) -> 'LodMatcher':
+        """Matcher for a geometry already in memory (tier computed locally)"""
+        return cls(shapely.simplify(geom, tolerance, preserve_topology=True), tolerance, lambda: geom)
+
+    @property
+    def full(self) -> BaseGeometry:
+        if self._full is None:
+            full = self._load_full()
+            self._full = full if full.is_valid else shapely.make_valid(full)
+            shapely.prepare(self._full)
+        return self._full
+
+    def contains_xy(self, x, y) -> np.ndarray:
+        """Boolean mask of the points (lng, lat arrays) inside the ecoregion"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        result = np.zeros(x.shape, dtype=bool)
+
+        min_x, min_y, max_x, max_y = self.bbox
+        idx = np.flatnonzero((x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y))
+        if idx.size:
+            idx = idx[shapely.contains_xy(self.outer, x[idx], y[idx])]
+        if idx.size:
+            inside = shapely.contains_xy(self.inner, x[idx], y[idx]) if not self.inner.is_empty \
+                else np.zeros(idx.size, dtype=bool)
+            result[idx[inside]] = True
+            band = idx[~inside]
+            if band.size:
+                self.exact_tests += band.size
+                result[band] = shapely.contains_xy(self.full, x[band], y[band])
+        return result
+
+    def contains(self, lng: float, lat: float) -> bool:
+        return bool(self.contains_xy([lng], [lat])[0])
+
+
+def fetch_ecoregion_ids(supabase: Client, page_size: int = 1000) -> Iterator[Dict]:
+    """id and name of every ecoregion with geometry (no geometry transferred)"""
+    yield from iter_rows(supabase, 'ecoregions', 'id, name', filters=lambda q: q.not_.is_('geometry', 'null'),
+                         page_size=page_size)
+
+
+def fetch_full_geometry(supabase: Client, ecoregion_id: str) -> Optional[BaseGeometry]:
+    """Full-resolution geometry of one ecoregion"""
+    response = supabase.table('ecoregions').select('geometry').eq('id', ecoregion_id).execute()
+    return parse_geography(response.data[0]['geometry']) if response.data else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build simplified LOD tiers and bboxes for ecoregion geometry")
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    print('🗺️  Ecoregion LOD Builder\n')
+    print('=' * 60)
+
+    supabase = init_supabase()
+    writer = create_writer(args.writer, 'ecoregions', supabase=supabase, dsn=args.db_url)
+    print(f"✓ Writer: {args.writer}")
+
+    ecoregions = list(fetch_ecoregion_ids(supabase))
+    print(f"\n📍 Found {len(ecoregions)} ecoregions with geometry\n")
+
+    start_time = time.time()
+    totals = {'full': 0, **{column: 0 for column in LOD_TIERS}}
+    built = 0
+
+    try:
+        for eco in ecoregions:
+            try:
+                geom = fetch_full_geometry(supabase, eco['id'])
+                if geom is None or geom.is_empty:
+                    continue
+                record = lod_record(geom)
+                writer.update(record, 'id', [eco['id']])
+            except Exception as e:
+                print(f"   ✗ {eco['name']}: {e}")
+                continue
+
+            tier_vertices = [vertex_count(parse_geography(record[column])) for column in LOD_TIERS]
+            totals['full'] += record['geometry_vertices']
+            for column, count in zip(LOD_TIERS, tier_vertices):
+                totals[column] += count
+            built += 1
+            print(f"   ✓ {eco['name']}: {record['geometry_vertices']:,} → "
+                  f"{' / '.join(f'{count:,}' for count in tier_vertices)} vertices")
+    finally:
+        writer.close()
+
+    print('\n' + '=' * 60)
+    print(f"🎉 Built LOD tiers for {built}/{len(ecoregions)} ecoregions in {time.time() - start_time:.1f}s\n")
+    print(f"   Full resolution: {totals['full']:,} vertices")
+    for column in LOD_TIERS:
+        share = totals[column] / totals['full'] if totals['full'] else 0
+        print(f"   {column}: {totals[column]:,} vertices ({share:.1%})")
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Ecoregion Overlap / Adjacency Graph
+
+Computes, once, how every pair of ecoregions relates and stores it in the
+ecoregion_overlaps table plus a local JSON file:
+
+    center_distance_km       haversine distance between centers
+    circle_overlap_km2       overlap of the center + radius circles
+    circle_overlap_fraction  share of this ecoregion's circle inside the other's
+    contains_other_center    this radius reaches the other ecoregion's center
+    intersection_area_km2    geodesic area of the polygon intersection
+    intersection_fraction    share of this ecoregion's area inside the other
+    shared_border_km         boundary length the two polygons share
+
+Rows are directed (both (A, B) and (B, A) are written) and only pairs whose
+circles overlap or whose polygons touch are kept. Candidate polygon pairs come
+from an STRtree, so only neighbouring geometries are intersected.
+
+This replaces the per-script haversine checks in check_coral_triangle_overlap.py,
+check_arctic_radius.py and diagnose_borneo.py: e.g. whether Coral Triangle's
+radius swallows Borneo's center is the contains_other_center flag of one row.
+
+Requirements:
+    pip install "shapely>=2" pyproj numpy supabase python-dotenv
+
+Usage:
+    python3 scripts/ecoregion_overlaps.py                       # full-resolution geometry
+    python3 scripts/ecoregion_overlaps.py --tier geometry_1km   # faster, ~1 km boundary accuracy
+    python3 scripts/ecoregion_overlaps.py --local-only          # only write the local file
+
+    from ecoregion_overlaps import load_overlaps
+    overlaps = load_overlaps()
+    row = overlaps.get(coral_triangle_id, {}).get(borneo_id)
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from geometry_derivation import GEOD, geodesic_area_km2, haversine_km, parse_geography
+from source_cache import CACHE_DIR
+from keyset_reader import iter_rows
+
+# Load environment variables
+load_dotenv(override=True)
+
+# Configuration
+OVERLAPS_FILE = CACHE_DIR / 'ecoregion-overlaps.json'
+BORDER_TOLERANCE = 0.001  # Degrees (~110 m): boundaries closer than this count as shared
+TIERS = ['geometry', 'geometry_1km', 'geometry_10km']
+
+
+def init_supabase() -> Client:
+    """Initialize Supabase client"""
+    url = os.getenv('VITE_SUPABASE_URL')
+    key = os.getenv('VITE_SUPABASE_SERVICE_KEY')
+    if not url or not key:
+        print('❌ Missing Supabase credentials')
+        sys.exit(1)
+    return create_client(url, key)
+
+
+def circle_overlap_km2(r1: float, r2: float, d: float) -> float:
+    """Area of the lens where two circles overlap (planar, using the great-circle center distance)"""
+    if d >= r1 + r2:
+        return 0.0
+    if d <= abs(r1 - r2):
+        return math.pi * min(r1, r2) ** 2
+    a1 = r1 ** 2 * math.acos((d ** 2 + r1 ** 2 - r2 ** 2) / (2 * d * r1))
+    a2 = r2 ** 2 * math.acos((d ** 2 + r2 ** 2 - r1 ** 2) / (2 * d * r2))
+    a3 = 0.5 * math.sqrt((-d + r1 + r2) * (d + r1 - r2) * (d - r1 + r2) * (d + r1 + r2))
+    return a1 + a2 - a3
+
+
+def polygon_metrics(a: BaseGeometry, b: BaseGeometry) -> Tuple[float, float]:
+    """(intersection area km², shared border km) of two lon/lat polygons"""
+    intersection = shapely.intersection(a, b)
+    polygons = [p for p in shapely.get_parts(intersection) if p.geom_type == 'Polygon']
+    area = geodesic_area_km2(shapely.union_all(polygons)) if polygons else 0.0
+
+    # Only boundary inside the common bbox can be shared; clipping first keeps the buffer small
+    a_minx, a_miny, a_maxx, a_maxy = a.bounds
+    b_minx, b_miny, b_maxx, b_maxy = b.bounds
+    window = (max(a_minx, b_minx) - BORDER_TOLERANCE, max(a_miny, b_miny) - BORDER_TOLERANCE,
+              min(a_maxx, b_maxx) + BORDER_TOLERANCE, min(a_maxy, b_maxy) + BORDER_TOLERANCE)
+    near_b = shapely.buffer(shapely.clip_by_rect(b.boundary, *window), BORDER_TOLERANCE, quad_segs=2)
+    border = shapely.intersection(shapely.clip_by_rect(a.boundary, *window), near_b)
+    border_km = GEOD.geometry_length(border) / 1000 if not border.is_empty else 0.0
+    return area, border_km
+
+
+def fetch_ecoregions(supabase: Client, tier: str, page_size: int = 1000) -> List[Dict]:
+    """Ecoregion centers/radii, with the chosen geometry tier fetched one ecoregion at a time"""
+    ecoregions = list(iter_rows(supabase, 'ecoregions', 'id, name, center_lat, center_lng, radius_km',
+                                page_size=page_size))
+
+    for i, eco in enumerate(ecoregions, 1):
+        print(f"  ↳ Loaded {i}/{len(ecoregions)} ecoregion geometries...", end='\r')
+        response = supabase.table('ecoregions').select(tier).eq('id', eco['id']).execute()
+        geom = parse_geography(response.data[0][tier]) if response.data else None
+        if geom is not None and not geom.is_valid:
+            geom = shapely.make_valid(geom)
+        eco['geometry'] = geom if geom is not None and not geom.is_empty else None
+    print()
+    return ecoregions
+
+
+def compute_overlaps(ecoregions: List[Dict]) -> List[Dict]:
+    """Directed overlap rows for every pair whose circles overlap or whose polygons touch"""
+    n = len(ecoregions)
+    has_circle = np.array([e['center_lat'] is not None and e['center_lng'] is not None and bool(e['radius_km'])
+                           for e in ecoregions])
+    lat = np.array([float(e['center_lat']) if has else 0.0 for e, has in zip(ecoregions, has_circle)])
+    lng = np.array([float(e['center_lng']) if has else 0.0 for e, has in zip(ecoregions, has_circle)])
+    radius = np.array([float(e['radius_km']) if has else 0.0 for e, has in zip(ecoregions, has_circle)])
+
+    # All center distances at once; pairs whose circles overlap
+    distance = haversine_km(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+    circle_pairs = (distance < radius[:, None] + radius[None, :]) & has_circle[:, None] & has_circle[None, :]
+    pairs = {(i, j) for i, j in zip(*np.nonzero(np.triu(circle_pairs, k=1)))}
+
+    # Polygon pairs within the border tolerance, from an STRtree over the geometries
+    with_geometry = [i for i, e in enumerate(ecoregions) if e['geometry'] is not None]
+    polygon_metrics_by_pair = {}
+    if with_geometry:
+        geoms = np.array([ecoregions[i]['geometry'] for i in with_geometry], dtype=object)
+        areas = {i: geodesic_area_km2(ecoregions[i]['geometry']) for i in with_geometry}
+        tree = shapely.STRtree(geoms)
+        left, right = tree.query(geoms, predicate='dwithin', distance=BORDER_TOLERANCE)
+        candidates = [(with_geometry[a], with_geometry[b]) for a, b in zip(left, right) if a < b]
+        for k, (i, j) in enumerate(candidates, 1):
+            print(f"  ↳ Intersected {k}/{len(candidates)} polygon pairs...", end='\r')
+            polygon_metrics_by_pair[(i, j)] = polygon_metrics(ecoregions[i]['geometry'], ecoregions[j]['geometry'])
+        print()
+        pairs |= set(polygon_metrics_by_pair)
+
+    rows = []
+    for i, j in sorted(pairs):
+        d = float(distance[i, j]) if has_circle[i] and has_circle[j] else None
+        lens = circle_overlap_km2(radius[i], radius[j], d) if d is not None else None
+        metrics = polygon_metrics_by_pair.get((i, j))
+        if metrics is None and ecoregions[i]['geometry'] is not None and ecoregions[j]['geometry'] is not None:
+            metrics = (0.0, 0.0)  # Both have polygons but they are apart
+
+        for a, b in ((i, j), (j, i)):
+            rows.append({
+                'ecoregion_id': ecoregions[a]['id'],
+                'other_ecoregion_id': ecoregions[b]['id'],
+                'center_distance_km': round(d, 1) if d is not None else None,
+                'circle_overlap_km2': round(lens, 1) if lens is not None else None,
+                'circle_overlap_fraction': round(lens / (math.pi * radius[a] ** 2), 4) if lens is not None else None,
+                'contains_other_center': bool(d <= radius[a]) if d is not None else None,
+                'intersection_area_km2': round(metrics[0], 1) if metrics else None,
+                'intersection_fraction': round(metrics[0] / areas[a], 4) if metrics and areas[a] else None,
+                'shared_border_km': round(metrics[1], 1) if metrics else None,
+            })
+    return rows
+
+
+def save_overlaps(ecoregions: List[Dict], rows: List[Dict], path: Path = OVERLAPS_FILE):
+    """Write the graph to the local file (atomically)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'computed_at': datetime.now(timezone.utc).isoformat(),
+            'ecoregions': {e['id']: e['name'] for e in ecoregions},
+            'overlaps': rows,
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def load_overlaps(path: Path = OVERLAPS_FILE) -> Dict[str, Dict[str, Dict]]:
+    """{ecoregion_id: {other_ecoregion_id: row}} from the local file (empty if not built)"""
+    try:
+        with open(path, 'r') as f:
+            rows = json.load(f)['overlaps']
+    except FileNotFoundError:
+        return {}
+    overlaps = {}
+    for row in rows:
+        overlaps.setdefault(row['ecoregion_id'], {})[row['other_ecoregion_id']] = row
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the ecoregion overlap / adjacency graph")
+    parser.add_argument("--tier", choices=TIERS, default='geometry',
+                        help="Ecoregion geometry column to intersect (default: geometry, full resolution)")
+    parser.add_argument("--output", type=Path, default=OVERLAPS_FILE,
+                        help=f"Local JSON file (default: {OVERLAPS_FILE})")
+    parser.add_argument("--local-only", action="store_true",
+                        help="Only write the local file, leave the ecoregion_overlaps table untouched")
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    print('🕸️  Ecoregion Overlap Graph\n')
+    print('=' * 60)
+
+    supabase = init_supabase()
+    start_time = time.time()
+
+    print(f"\n📍 Loading ecoregions ({args.tier})")
+    ecoregions = fetch_ecoregions(supabase, args.tier)
+    print(f"   ✓ {len(ecoregions)} ecoregions, "
+          f"{sum(1 for e in ecoregions if e['geometry'] is not None)} with geometry")
+
+    print('\n🔄 Computing overlaps')
+    rows = compute_overlaps(ecoregions)
+    print(f"   ✓ {len(rows) // 2} related pairs ({len(rows)} directed rows)")
+
+    save_overlaps(ecoregions, rows, args.output)
+    print(f"   ✓ Wrote {args.output}")
+
+    if not args.local_only:
+        # Upsert this run's rows in place, then drop pairs it did not produce;
+        # a failed write leaves the previous graph rather than an empty table
+        print('\n💾 Writing ecoregion_overlaps')
+        computed_at = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()  # computed_at is TIMESTAMP (UTC)
+        writer = create_writer(args.writer, 'ecoregion_overlaps', supabase=supabase, dsn=args.db_url,
+                               on_conflict='ecoregion_id,other_ecoregion_id')
+        try:
+            for i in range(0, len(rows), writer.batch_size):
+                writer.write([dict(row, computed_at=computed_at) for row in rows[i:i + writer.batch_size]])
+        finally:
+            writer.close()
+        print(f"   ✓ Wrote {len(rows)} rows ({args.writer})")
+
+        stale = supabase.table('ecoregion_overlaps').delete().lt('computed_at', computed_at).execute()
+        print(f"   ✓ Removed {len(stale.data)} pairs from earlier runs")
+
+    # Radius matches that swallow another ecoregion's center (the Borneo / Coral Triangle case)
+    names = {e['id']: e['name'] for e in ecoregions}
+    swallowed = [r for r in rows if r['contains_other_center']]
+    if swallowed:
+        print('\n⚠️  Radii reaching another ecoregion\'s center:\n')
+        for row in sorted(swallowed, key=lambda r: r['center_distance_km']):
+            print(f"   {names[row['ecoregion_id']]} → {names[row['other_ecoregion_id']]} "
+                  f"({row['center_distance_km']:,.0f} km, {row['circle_overlap_fraction']:.0%} of circle shared)")
+
+    print('\n' + '=' * 60)
+    print(f"🎉 Done in {time.time() - start_time:.1f}s")
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Geometry Derivation
+
+One pass over a feature geometry for the WWF, MVP and WDPA importers: parse
+once, reproject to WGS84 with a cached transformer, and derive everything the
+rows need from that single geometry:
+
+    center_lat / center_lng   centroid (degrees)
+    bounds                    (minx, miny, maxx, maxy) in degrees
+    radius_km                 half the bbox diagonal at ~111 km per degree
+    area_km2                  geodesic area on the WGS84 ellipsoid
+    simplified                topology-preserving simplification (optional)
+    ewkb                      hex EWKB (SRID 4326) of the simplified geometry
+
+EWKB goes to PostGIS as-is, through PostgREST or COPY; it is smaller than
+WKT text and skips the WKT parse on the server.
+
+Requirements:
+    pip install "shapely>=2" pyproj numpy
+
+Usage:
+    from geometry_derivation import derive_geometry
+
+    derived = derive_geometry(feature['geometry'], crs='EPSG:3857', max_radius_km=3000)
+    row = {'center_lat': derived['center_lat'], 'geometry': derived['ewkb'], ...}
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pyproj
+import shapely
+from shapely.geometry import shape, MultiPolygon
+from shapely.geometry.base import BaseGeometry
+
+KM_PER_DEGREE = 111  # Rough conversion used for radius_km
+EARTH_RADIUS_KM = 6371
+GEOD = pyproj.Geod(ellps='WGS84')
+
+
+def parse_geometry(geometry) -> BaseGeometry:
+    """Shapely geometry from a GeoJSON-like dict (fiona) or an already parsed geometry (cache)"""
+    return geometry if isinstance(geometry, BaseGeometry) else shape(geometry)
+
+
+def parse_geography(value) -> Optional[BaseGeometry]:
+    """Geometry from a PostgREST geography value: hex EWKB (the default), EWKT/WKT text or GeoJSON"""
+    if not value:
+        return None
+    if isinstance(value, dict):
+        return shape(value)
+    if value[:1] in ('0', '1') and all(c in '0123456789abcdefABCDEF' for c in value[:18]):
+        return shapely.from_wkb(value)
+    return shapely.from_wkt(value.split(';', 1)[-1])
+
+
+@lru_cache(maxsize=None)
+def wgs84_transformer(crs: str) -> Optional[pyproj.Transformer]:
+    """Transformer from `crs` to lon/lat WGS84, built once per CRS (None if already WGS84)"""
+    if pyproj.CRS.from_user_input(crs).to_epsg() == 4326:
+        return None
+    return pyproj.Transformer.from_crs(crs, 'EPSG:4326', always_xy=True)
+
+
+def to_wgs84(geom: BaseGeometry, crs: Optional[str] = None) -> BaseGeometry:
+    """Reproject to WGS84; all coordinates go through the transformer in one array call"""
+    transformer = wgs84_transformer(crs) if crs else None
+    if transformer is None:
+        return geom
+    return shapely.transform(geom, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])))
+
+
+def bbox_radius_km(bounds: Tuple[float, float, float, float], max_radius_km: Optional[float] = None) -> float:
+    """Half the bounding-box diagonal in km (rough: 1 degree ≈ 111 km)"""
+    lat_diff = abs(bounds[3] - bounds[1])
+    lng_diff = abs(bounds[2] - bounds[0])
+    radius_km = ((lat_diff ** 2 + lng_diff ** 2) ** 0.5) * KM_PER_DEGREE / 2
+    return min(radius_km, max_radius_km) if max_radius_km else radius_km
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in km (numpy-broadcasting)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def geodesic_area_km2(geom: BaseGeometry) -> float:
+    """Area on the WGS84 ellipsoid in km²"""
+    area, _ = GEOD.geometry_area_perimeter(geom)
+    return abs(area) / 1e6
+
+
+def to_ewkb(geom: BaseGeometry, multi: bool = False) -> str:
+    """Hex EWKB with SRID 4326; multi=True promotes a Polygon to a MultiPolygon"""
+    if multi and geom.geom_type == 'Polygon':
+        geom = MultiPolygon([geom])
+    return shapely.to_wkb(shapely.set_srid(geom, 4326), hex=True, include_srid=True)
+
+
+def derive_geometry(
+    geometry,
+    crs: Optional[str] = None,
+    simplify_tolerance: float = 0.0,
+    max_radius_km: Optional[float] = None,
+    with_area: bool = True,
+    multi: bool = False
+) -> Optional[Dict]:
+    """
+    Parse and reproject `geometry` once and derive centroid, bounds, radius,
+    area, simplified geometry and its EWKB. Returns None (with a warning) if
+    the geometry is missing, empty or cannot be parsed.
+
+    simplify_tolerance is in degrees; 0 keeps full detail. ewkb is None if
+    simplification collapses the geometry.
+    """
+    if not geometry:
+        return None
+    try:
+        geom = to_wgs84(parse_geometry(geometry), crs)
+        if geom.is_empty:
+            return None
+
+        centroid = geom.centroid
+        bounds = geom.bounds
+        simplified = shapely.simplify(geom, simplify_tolerance, preserve_topology=True) \
+            if simplify_tolerance > 0 else geom
+
+        return {
+            'geometry': geom,
+            'center_lat': centroid.y,
+            'center_lng': centroid.x,
+            'bounds': bounds,
+            'radius_km': bbox_radius_km(bounds, max_radius_km),
+            'area_km2': geodesic_area_km2(geom) if with_area else None,
+            'simplified': simplified,
+            'ewkb': to_ewkb(simplified, multi) if not simplified.is_empty else None,
+        }
+    except Exception as e:
+        print(f"  ⚠️ Warning: Could not derive geometry: {e}")
+        return None
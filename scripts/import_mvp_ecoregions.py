@@ -8,24 +8,15 @@ import os
 import sys
 from pathlib import Path
 import fiona
-from shapely.geometry import shape, mapping
-from shapely.ops import transform
-import pyproj
 from supabase import create_client
 from dotenv import load_dotenv
 import json
 
-load_dotenv(override=True)
+sys.path.append(os.path.dirname(__file__))
+from region_filter import MVP_ECOREGIONS  # Shared with the importers' --region mvp filter
+from geometry_derivation import derive_geometry
 
-# MVP Ecoregions - diverse, iconic, high biodiversity
-MVP_ECOREGIONS = [
-    "Amazon and Guianas",          # Iconic rainforest, highest biodiversity
-    "Arctic Terrestrial",           # Climate change, polar species
-    "Congo Basin",                  # Second largest rainforest
-    "Coral Triangle",               # Marine biodiversity hotspot
-    "Madagascar",                   # Endemic species island
-    "Borneo",                       # Orangutans, deforestation focus
-]
+load_dotenv(override=True)
 
 SHAPEFILE = Path.home() / 'Downloads' / 'protected-regions' / 'WWF_Priority_Ecoregions.shp'
 
@@ -38,35 +29,19 @@ def init_supabase():
     return create_client(url, key)
 
 def calculate_centroid_and_radius(geometry):
-    """Extract centroid and estimated radius from polygon, transform to WGS84"""
-    try:
-        geom = shape(geometry)
-
-        # Transform from Web Mercator (EPSG:3857) to WGS84 (EPSG:4326)
-        project = pyproj.Transformer.from_crs('EPSG:3857', 'EPSG:4326', always_xy=True).transform
-        geom_wgs84 = transform(project, geom)
-
-        # Get centroid in WGS84 (lat/lng)
-        centroid = geom_wgs84.centroid
-
-        # Calculate radius from bounding box in degrees, then convert to km
-        bounds = geom_wgs84.bounds  # (minx, miny, maxx, maxy) in degrees
-        lat_diff = abs(bounds[3] - bounds[1])
-        lng_diff = abs(bounds[2] - bounds[0])
-
-        # Convert degrees to km (rough approximation: 1 degree ≈ 111 km)
-        radius_km = ((lat_diff ** 2 + lng_diff ** 2) ** 0.5) * 111 / 2
-        radius_km = min(radius_km, 3000)  # Cap at 3000km
-
-        return {
-            'center_latitude': centroid.y,  # Latitude in degrees (-90 to 90)
-            'center_longitude': centroid.x,  # Longitude in degrees (-180 to 180)
-            'radius_km': round(radius_km, 1),
-        }
-    except Exception as e:
-        print(f"  ⚠️ Error calculating centroid: {e}")
+    """Extract centroid, estimated radius and area from polygon, transform to WGS84"""
+    # Web Mercator (EPSG:3857) -> WGS84 (EPSG:4326); the transformer is built once and reused
+    derived = derive_geometry(geometry, crs='EPSG:3857', max_radius_km=3000)  # Cap at 3000km
+    if not derived:
         return None
 
+    return {
+        'center_latitude': derived['center_lat'],  # Latitude in degrees (-90 to 90)
+        'center_longitude': derived['center_lng'],  # Longitude in degrees (-180 to 180)
+        'radius_km': round(derived['radius_km'], 1),
+        'area_km2': round(derived['area_km2'], 1),
+    }
+
 print('🌍 Importing 6 MVP WWF Priority Ecoregions\n')
 print('=' * 60)
 
@@ -108,6 +83,7 @@ with fiona.open(str(SHAPEFILE)) as src:
             'center_lat': geo_data['center_latitude'],
             'center_lng': geo_data['center_longitude'],
             'radius_km': int(geo_data['radius_km']),
+            'area_km2': geo_data['area_km2'],
             # Skip geometry for now - use center + radius matching instead
         }
 
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Keyset Reader
+
+Keyset-paginated iteration over any table with a sortable unique key column
+(`id` by default) or composite key, shared by every script that scans
+species, ecoregions, parks or the link tables.
+
+`.range(offset, ...)` paging makes Postgres walk and discard `offset` rows for
+every page, so a full scan is quadratic; an unpaged `select` silently stops at
+the PostgREST row cap. Here each page asks for `key > <last key of the
+previous page> ORDER BY key LIMIT page_size`, an index range scan on the
+primary key, so a full scan is linear. While the caller works through one
+page, a background thread already fetches the next.
+
+Requirements:
+    pip install supabase
+
+Usage:
+    from keyset_reader import iter_rows, iter_species, iter_species_pages
+
+    for row in iter_species(supabase, 'id, sample_points',
+                            filters=lambda q: q.not_.is_('sample_points', 'null')):
+        ...
+
+    for page in iter_species_pages(supabase, 'id, class', page_size=5000):
+        ...
+
+    for row in iter_rows(supabase, 'ecoregions', 'id, name'):
+        ...
+
+    for row in iter_rows(supabase, 'species_ecoregions', key=('species_id', 'ecoregion_id'),
+                         filters=lambda q: q.in_('species_id', ids)):
+        ...
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from supabase import Client
+
+PAGE_SIZE = 1000  # PostgREST's default max-rows
+
+Key = Union[str, Sequence[str]]
+
+
+def _projection(columns: str, keys: Tuple[str, ...] = ('id',)):
+    """Column list with the key columns added when missing (the keyset needs them), and which were added"""
+    names = [c.strip() for c in columns.split(',') if c.strip()]
+    if '*' in names:
+        return columns, []
+    missing = [key for key in keys if key not in names]
+    return ', '.join(missing + names), missing
+
+
+def _quote(value) -> str:
+    """A value inside a PostgREST logic tree (double-quoted, so commas and dots are literal)"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _after(keys: Tuple[str, ...], values: Tuple) -> str:
+    """PostgREST or=(...) filter for rows whose key tuple sorts after `values`"""
+    branches = []
+    for i, key in enumerate(keys):
+        equal = [f'{k}.eq.{_quote(v)}' for k, v in zip(keys[:i], values[:i])]
+        condition = f'{key}.gt.{_quote(values[i])}'
+        branches.append(f'and({",".join(equal + [condition])})' if equal else condition)
+    return ','.join(branches)
+
+
+def iter_row_pages(
+    supabase: Client,
+    table: str,
+    columns: str = '*',
+    filters: Optional[Callable] = None,
+    page_size: int = PAGE_SIZE,
+    prefetch: bool = True,
+    key: Key = 'id',
+) -> Iterator[List[Dict]]:
+    """
+    Yield pages of `table` rows ordered by `key` - a column, or a tuple of
+    columns compared lexicographically - which must be unique among the
+    filtered rows. `filters` receives the select builder and returns it with
+    extra conditions, e.g. `lambda q: q.eq('class', 'AVES')`.
+    """
+    keys = (key,) if isinstance(key, str) else tuple(key)
+    select, added = _projection(columns, keys)
+
+    def fetch(after: Optional[Tuple]) -> List[Dict]:
+        query = supabase.table(table).select(select)
+        if filters is not None:
+            query = filters(query)
+        if after is not None:
+            query = query.gt(keys[0], after[0]) if len(keys) == 1 else query.or_(_after(keys, after))
+        for k in keys:
+            query = query.order(k)
+        return query.limit(page_size).execute().data
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = fetch(None)
+        while page:
+            # Keep going until an empty page rather than a short one: a server-side
+            # max-rows cap below page_size would otherwise end the scan early
+            last_key = tuple(page[-1][k] for k in keys)
+            upcoming = executor.submit(fetch, last_key) if executor else None
+            for row in page:
+                for k in added:
+                    del row[k]
+            yield page
+            page = upcoming.result() if upcoming else fetch(last_key)
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_rows(
+    supabase: Client,
+    table: str,
+    columns: str = '*',
+    filters: Optional[Callable] = None,
+    page_size: int = PAGE_SIZE,
+    prefetch: bool = True,
+    key: Key = 'id',
+) -> Iterator[Dict]:
+    """Yield `table` rows one at a time (see iter_row_pages)"""
+    for page in iter_row_pages(supabase, table, columns, filters, page_size, prefetch, key):
+        yield from page
+
+
+def iter_species_pages(
+    supabase: Client,
+    columns: str = '*',
+    filters: Optional[Callable] = None,
+    page_size: int = PAGE_SIZE,
+    prefetch: bool = True,
+) -> Iterator[List[Dict]]:
+    """Yield pages of species rows ordered by id (see iter_row_pages)"""
+    return iter_row_pages(supabase, 'species', columns, filters, page_size, prefetch)
+
+
+def iter_species(
+    supabase: Client,
+    columns: str = '*',
+    filters: Optional[Callable] = None,
+    page_size: int = PAGE_SIZE,
+    prefetch: bool = True,
+) -> Iterator[Dict]:
+    """Yield species rows one at a time (see iter_row_pages)"""
+    return iter_rows(supabase, 'species', columns, filters, page_size, prefetch)
@@ -8,7 +8,8 @@ fall within ecoregion boundaries using PostGIS spatial functions.
 Strategy:
 1. For each ecoregion with geometry, find all species whose sample_points fall within it
 2. Use PostGIS ST_Contains or ST_DWithin for proximity matching
-3. Insert matches into species_ecoregions junction table
+3. Insert matches into species_ecoregions junction table (a full rebuild goes
+   through a staging table that is swapped in atomically at the end)
 4. Calculate overlap percentage based on how many sample points match
 
 Requirements:
@@ -21,12 +22,16 @@ Usage:
 import os
 import sys
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import json
 import time
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_rows
+from link_staging import RULE_MIXED, RULE_RPC_PROXIMITY, STAGING_TABLE, prepare_staging, set_link_rule, swap_staging
+
 # Load environment variables
 load_dotenv()
 
@@ -48,49 +53,47 @@ def init_supabase() -> Client:
     return create_client(url, key)
 
 
-def get_ecoregions_with_geometry(supabase: Client) -> List[Dict]:
-    """Fetch all ecoregions that have geometry defined"""
+def get_ecoregions_with_geometry(supabase: Client) -> Optional[List[Dict]]:
+    """Fetch all ecoregions that have geometry defined (None on failure)"""
     print('📍 Fetching ecoregions with geometry...')
 
     try:
-        response = supabase.table('ecoregions').select(
-            'id, ecoregion_id, name, biome, realm, geometry, center_lat, center_lng, radius_km'
-        ).not_.is_('geometry', 'null').execute()
-
-        ecoregions = response.data
+        # Matching runs server-side by id, so the geometry itself is not fetched
+        ecoregions = list(iter_rows(
+            supabase, 'ecoregions', 'id, ecoregion_id, name, biome, realm, center_lat, center_lng, radius_km',
+            filters=lambda q: q.not_.is_('geometry', 'null')))
         print(f'  ✓ Found {len(ecoregions)} ecoregions with geometry')
         return ecoregions
 
     except Exception as e:
         print(f'  ✗ Error fetching ecoregions: {e}')
-        return []
+        return None
 
 
-def get_ecoregions_with_center(supabase: Client) -> List[Dict]:
-    """Fetch ecoregions that only have center coordinates (no geometry)"""
+def get_ecoregions_with_center(supabase: Client) -> Optional[List[Dict]]:
+    """Fetch ecoregions that only have center coordinates (no geometry; None on failure)"""
     print('📍 Fetching ecoregions with center coordinates...')
 
     try:
-        response = supabase.table('ecoregions').select(
-            'id, ecoregion_id, name, biome, realm, center_lat, center_lng, radius_km'
-        ).is_('geometry', 'null').not_.is_('center_lat', 'null').execute()
-
-        ecoregions = response.data
+        ecoregions = list(iter_rows(
+            supabase, 'ecoregions', 'id, ecoregion_id, name, biome, realm, center_lat, center_lng, radius_km',
+            filters=lambda q: q.is_('geometry', 'null').not_.is_('center_lat', 'null')))
         print(f'  ✓ Found {len(ecoregions)} ecoregions with center points')
         return ecoregions
 
     except Exception as e:
         print(f'  ✗ Error fetching ecoregions: {e}')
-        return []
+        return None
 
 
 def match_species_to_ecoregion_by_geometry(
     supabase: Client,
     ecoregion: Dict
-) -> List[Tuple[str, str, float]]:
+) -> Optional[List[Tuple[str, str, float]]]:
     """
     Find all species whose sample_points fall within an ecoregion's geometry.
-    Returns list of (species_id, ecoregion_id, overlap_percentage) tuples.
+    Returns list of (species_id, ecoregion_id, overlap_percentage) tuples, or
+    None if the match RPC failed.
     """
     ecoregion_id = ecoregion['id']
     ecoregion_name = ecoregion['name']
@@ -113,17 +116,17 @@ def match_species_to_ecoregion_by_geometry(
     except Exception as e:
         # If RPC doesn't exist yet, we'll create it later
         print(f'    ⚠ RPC function not available yet: {e}')
-        return []
+        return None
 
 
 def match_species_to_ecoregion_by_proximity(
     supabase: Client,
     ecoregion: Dict,
     proximity_km: float = 50
-) -> List[Tuple[str, str, float]]:
+) -> Optional[List[Tuple[str, str, float]]]:
     """
     Find species whose sample_points are within proximity_km of ecoregion center.
-    Fallback method for ecoregions without geometry.
+    Fallback method for ecoregions without geometry. None if the RPC failed.
     """
     ecoregion_id = ecoregion['id']
     ecoregion_name = ecoregion['name']
@@ -150,15 +153,17 @@ def match_species_to_ecoregion_by_proximity(
 
     except Exception as e:
         print(f'    ⚠ RPC function not available: {e}')
-        return []
+        return None
 
 
 def insert_species_ecoregion_links(
     supabase: Client,
-    links: List[Tuple[str, str, float]]
+    links: List[Tuple[str, str, float]],
+    staged: bool = False
 ) -> Tuple[int, int]:
     """
-    Insert species-ecoregion links into the junction table.
+    Insert species-ecoregion links into the junction table (or, when staged,
+    into the staging table that replaces it at the end of the run).
     Returns (inserted_count, error_count)
     """
     if not links:
@@ -184,11 +189,15 @@ def insert_species_ecoregion_links(
         batch = records[i:i + BATCH_SIZE]
 
         try:
-            # Use upsert to avoid duplicate key errors
-            response = supabase.table('species_ecoregions').upsert(
-                batch,
-                on_conflict='species_id,ecoregion_id'
-            ).execute()
+            if staged:
+                # Staging has no primary key yet; each ecoregion is matched once, so no duplicates
+                response = supabase.table(STAGING_TABLE).insert(batch).execute()
+            else:
+                # Use upsert to avoid duplicate key errors
+                response = supabase.table('species_ecoregions').upsert(
+                    batch,
+                    on_conflict='species_id,ecoregion_id'
+                ).execute()
 
             inserted += len(batch)
             print(f'    ✓ Inserted {inserted}/{len(records)} links', end='\r')
@@ -204,15 +213,20 @@ def insert_species_ecoregion_links(
     return inserted, errors
 
 
-def clear_existing_links(supabase: Client):
-    """Clear all existing species-ecoregion links"""
-    print('🗑️  Clearing existing species-ecoregion links...')
+def stage_rebuild(supabase: Client) -> bool:
+    """
+    Start a from-scratch rebuild in the staging table. The live links stay
+    visible until swap_staging() replaces them at the end of the run.
+    """
+    print('📦 Preparing staging table for a full rebuild...')
 
     try:
-        response = supabase.table('species_ecoregions').delete().neq('species_id', '00000000-0000-0000-0000-000000000000').execute()
-        print('  ✓ Cleared existing links')
+        prepare_staging(supabase)
+        print('  ✓ Links will be swapped in when matching completes')
+        return True
     except Exception as e:
-        print(f'  ⚠ Warning: Could not clear existing links: {e}')
+        print(f'  ⚠ Warning: Could not prepare staging table, upserting into live links: {e}')
+        return False
 
 
 def create_matching_functions(supabase: Client):
@@ -367,27 +381,40 @@ def main():
 
     start_time = time.time()
     total_links = []
+    failures = 0  # Failed fetches, matches and link batches - a staged rebuild is not swapped in if any
 
-    # Clear existing links (optional)
-    clear_response = input('Clear existing species-ecoregion links? (y/n): ')
-    if clear_response.lower() == 'y':
-        clear_existing_links(supabase)
+    # Rebuild from scratch (optional) - staged, so existing links are replaced atomically
+    clear_response = input('Replace existing species-ecoregion links? (y/n): ')
+    staged = clear_response.lower() == 'y' and stage_rebuild(supabase)
+    if not staged:
+        # Upserting into the live links mixes this script's rule with whatever built them
+        set_link_rule(supabase, RULE_MIXED)
 
     # Step 1: Match species to ecoregions with geometry
     print('\n📍 STEP 1: Matching species to ecoregions with geometry...')
     ecoregions_with_geom = get_ecoregions_with_geometry(supabase)
+    if ecoregions_with_geom is None:
+        failures += 1
+        ecoregions_with_geom = []
 
     for i, ecoregion in enumerate(ecoregions_with_geom):
         print(f'\n[{i+1}/{len(ecoregions_with_geom)}] Processing: {ecoregion["name"]}')
         links = match_species_to_ecoregion_by_geometry(supabase, ecoregion)
+        if links is None:
+            failures += 1
+            continue
 
         if links:
-            inserted, errors = insert_species_ecoregion_links(supabase, links)
+            inserted, errors = insert_species_ecoregion_links(supabase, links, staged)
+            failures += errors
             total_links.extend(links)
 
     # Step 2: Match species to ecoregions with only center points
     print('\n📍 STEP 2: Matching species to ecoregions via proximity...')
     ecoregions_with_center = get_ecoregions_with_center(supabase)
+    if ecoregions_with_center is None:
+        failures += 1
+        ecoregions_with_center = []
 
     for i, ecoregion in enumerate(ecoregions_with_center):
         print(f'\n[{i+1}/{len(ecoregions_with_center)}] Processing: {ecoregion["name"]}')
@@ -396,11 +423,25 @@ def main():
             ecoregion,
             ecoregion.get('radius_km', PROXIMITY_THRESHOLD_KM)
         )
+        if links is None:
+            failures += 1
+            continue
 
         if links:
-            inserted, errors = insert_species_ecoregion_links(supabase, links)
+            inserted, errors = insert_species_ecoregion_links(supabase, links, staged)
+            failures += errors
             total_links.extend(links)
 
+    if staged:
+        # Raises before swapping if anything above failed; the live links stay
+        try:
+            swap_staging(supabase, failures=failures, rule=RULE_RPC_PROXIMITY)
+        except RuntimeError as e:
+            print(f'\n❌ {e}')
+            sys.exit(1)
+    elif failures:
+        print(f'\n⚠️  {failures} match/insert failure(s) - rerun to fill the missing links')
+
     # Summary
     duration = (time.time() - start_time) / 60
     unique_species = len(set(link[0] for link in total_links))
@@ -2,140 +2,206 @@
 """
 Link species to ecoregions using radius-based proximity matching
 Checks if species sample_points fall within ecoregion's center + radius
+
+All sample points are loaded once into NumPy arrays (species_linker.load_sample_points)
+and matched in a single pass. A latitude-banded grid maps every cell to the ecoregions
+whose center + radius circle can reach it, so each point is only measured against those
+candidates, with one batched haversine per cell instead of a math call per
+(point × ecoregion) pair. A species is linked to every ecoregion any of its points falls
+within (distance <= radius_km) - the same links as the original per-point loop.
+
+Requirements:
+    pip install numpy supabase python-dotenv
+
+Usage:
+    python3 scripts/link_species_radius_based.py                  # rebuild all links (staged, then swapped in)
+    python3 scripts/link_species_radius_based.py --dry-run        # match and report only
+    python3 scripts/link_species_radius_based.py --writer copy    # bulk-load over a direct Postgres connection
 """
 
 import os
 import sys
-from dotenv import load_dotenv
-from supabase import create_client
-import time
 import math
+import time
+import argparse
+from collections import Counter
+from typing import Dict, List, Tuple
+import numpy as np
+from dotenv import load_dotenv
 
-load_dotenv(override=True)
-
-url = os.getenv('VITE_SUPABASE_URL')
-key = os.getenv('VITE_SUPABASE_SERVICE_KEY')
-supabase = create_client(url, key)
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in km using Haversine formula"""
-    R = 6371  # Earth radius in km
-
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-
-    return R * c
-
-print('🔗 Linking Species to Ecoregions (Radius-based)\n')
-print('=' * 60)
-
-# Get ecoregions
-ecoregions = supabase.table('ecoregions').select('*').execute()
-print(f'\n📍 Ecoregions: {len(ecoregions.data)}\n')
-for eco in ecoregions.data:
-    print(f'   • {eco["name"]}: ({eco["center_lat"]:.1f}, {eco["center_lng"]:.1f}), r={eco["radius_km"]}km')
-
-# Clear existing links
-print(f'\n🗑️  Clearing existing links...')
-supabase.table('species_ecoregions').delete().neq('species_id', '00000000-0000-0000-0000-000000000000').execute()
-print('   ✓ Cleared\n')
-
-print('🔄 Processing species...\n')
-
-start_time = time.time()
-total_links = 0
-processed = 0
-
-BATCH_SIZE = 1000
-offset = 0
-
-while True:
-    # Fetch batch
-    species_batch = supabase.table('species')\
-        .select('id, scientific_name, sample_points')\
-        .not_.is_('sample_points', 'null')\
-        .range(offset, offset + BATCH_SIZE - 1)\
-        .execute()
-
-    if not species_batch.data:
-        break
-
-    links = []
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from geometry_derivation import EARTH_RADIUS_KM, haversine_km
+from link_staging import RULE_RADIUS, STAGING_TABLE, add_staging_arguments, prepare_staging, swap_staging
+from species_linker import SamplePoints, init_supabase, load_sample_points
+from keyset_reader import iter_rows
 
-    for species in species_batch.data:
-        sample_points = species.get('sample_points', [])
-        if not sample_points or not isinstance(sample_points, list):
-            continue
+load_dotenv(override=True)
 
-        # Check each sample point against each ecoregion
-        for point_data in sample_points:
-            lat = point_data.get('lat')
-            lng = point_data.get('lng')
-            if lat is None or lng is None:
+CELL_DEG = 2.0  # Grid cell size in degrees (latitude bands × longitude columns)
+CELL_MARGIN_DEG = 0.01  # Slack around each circle's extent so float rounding never drops a candidate
+BLOCK_POINTS = 100_000  # Points per distance matrix within one cell (bounds memory)
+
+
+def fetch_ecoregions(supabase) -> List[Dict]:
+    """Ecoregions with a center and radius"""
+    ecoregions = iter_rows(supabase, 'ecoregions', 'id, name, center_lat, center_lng, radius_km')
+    return [eco for eco in ecoregions
+            if eco['center_lat'] is not None and eco['center_lng'] is not None and eco['radius_km'] is not None]
+
+
+class RadiusGrid:
+    """Latitude-banded grid of the ecoregion circles that can reach each cell"""
+
+    def __init__(self, center_lat: np.ndarray, center_lng: np.ndarray, radius_km: np.ndarray,
+                 cell_deg: float = CELL_DEG):
+        self.center_lat = center_lat
+        self.center_lng = center_lng
+        self.radius_km = radius_km
+        self.cell_deg = cell_deg
+        self.n_rows = int(math.ceil(180 / cell_deg))
+        self.n_cols = int(math.ceil(360 / cell_deg))
+
+        cells: Dict[int, List[int]] = {}
+        for i in range(len(radius_km)):
+            for cell in self._circle_cells(center_lat[i], center_lng[i], radius_km[i]):
+                cells.setdefault(cell, []).append(i)
+        self.cells = {cell: np.array(ecos, dtype=np.int64) for cell, ecos in cells.items()}
+
+    def _circle_cells(self, lat: float, lng: float, radius_km: float) -> List[int]:
+        """Cells overlapping the bounding box of a spherical cap (all longitudes if it reaches a pole)"""
+        angle = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_min = max(lat - angle - CELL_MARGIN_DEG, -90.0)
+        lat_max = min(lat + angle + CELL_MARGIN_DEG, 90.0)
+        rows = range(self.row(lat_min), self.row(lat_max) + 1)
+
+        if lat_min <= -90.0 or lat_max >= 90.0 or angle >= 90.0:
+            cols = range(self.n_cols)
+        else:
+            half_width = math.degrees(math.asin(min(math.sin(math.radians(angle)) / math.cos(math.radians(lat)), 1.0)))
+            half_width += CELL_MARGIN_DEG
+            if half_width >= 180.0:
+                cols = range(self.n_cols)
+            else:
+                first, last = self.col(lng - half_width), self.col(lng + half_width)
+                cols = range(first, last + 1) if first <= last else \
+                    list(range(first, self.n_cols)) + list(range(0, last + 1))  # Wraps the antimeridian
+
+        return [r * self.n_cols + c for r in rows for c in cols]
+
+    def row(self, lat):
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+
+    def col(self, lng):
+        return np.clip(np.floor(np.mod(np.asarray(lng) + 180, 360) / self.cell_deg).astype(np.int64),
+                       0, self.n_cols - 1)
+
+    def match(self, lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(point index, ecoregion index) of every point within an ecoregion's radius"""
+        cell = self.row(lat) * self.n_cols + self.col(lng)
+        order = np.argsort(cell, kind='stable')
+        sorted_cells = cell[order]
+        bounds = np.flatnonzero(np.diff(sorted_cells)) + 1
+
+        point_hits, eco_hits = [], []
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(order)]):
+            if start == end:
                 continue
-
-            # Check against all ecoregions
-            for eco in ecoregions.data:
-                distance = haversine_distance(
-                    lat, lng,
-                    eco['center_lat'], eco['center_lng']
-                )
-
-                if distance <= eco['radius_km']:
-                    # Species found within this ecoregion
-                    links.append({
-                        'species_id': species['id'],
-                        'ecoregion_id': eco['id']
-                    })
-                    # Don't break - allow species to belong to multiple ecoregions
-
-    # Deduplicate links (species can have multiple points in same ecoregion)
-    if links:
-        seen = set()
-        unique_links = []
-        for link in links:
-            key = (link['species_id'], link['ecoregion_id'])
-            if key not in seen:
-                seen.add(key)
-                unique_links.append(link)
-
-        # Insert unique links
-        if unique_links:
-            try:
-                supabase.table('species_ecoregions').insert(unique_links).execute()
-                total_links += len(unique_links)
-            except Exception as e:
-                print(f'   ✗ Error inserting batch: {e}')
-
-    processed += len(species_batch.data)
-    offset += BATCH_SIZE
-
-    # Progress
-    if processed % 5000 == 0:
-        elapsed = time.time() - start_time
-        rate = processed / elapsed if elapsed > 0 else 0
-        print(f'   Progress: {processed:,} species, {total_links:,} links ({rate:.0f} species/sec)')
-
-duration = time.time() - start_time
-
-print('\n' + '=' * 60)
-print('🎉 Linking Complete!\n')
-print(f'   Species processed: {processed:,}')
-print(f'   Total links created: {total_links:,}')
-print(f'   Duration: {duration:.1f} seconds')
-print('\n' + '=' * 60)
-
-# Summary by ecoregion
-print('\n📊 Species per Ecoregion:\n')
-for eco in ecoregions.data:
-    count_result = supabase.table('species_ecoregions')\
-        .select('*', count='exact', head=True)\
-        .eq('ecoregion_id', eco['id'])\
-        .execute()
-    print(f'   {eco["name"]}: {count_result.count:,} species')
-
-print('\n✅ Done! Ready to test in browser.')
+            candidates = self.cells.get(int(sorted_cells[start]))
+            if candidates is None:
+                continue
+            for block in range(start, end, BLOCK_POINTS):
+                idx = order[block:min(block + BLOCK_POINTS, end)]
+                distance = haversine_km(lat[idx, None], lng[idx, None],
+                                        self.center_lat[candidates], self.center_lng[candidates])
+                p, e = np.nonzero(distance <= self.radius_km[candidates])
+                point_hits.append(idx[p])
+                eco_hits.append(candidates[e])
+
+        if not point_hits:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(point_hits), np.concatenate(eco_hits)
+
+
+def radius_links(points: SamplePoints, ecoregions: List[Dict]) -> List[Dict]:
+    """Unique (species_id, ecoregion_id) links for every point within an ecoregion's radius"""
+    grid = RadiusGrid(np.array([float(eco['center_lat']) for eco in ecoregions]),
+                      np.array([float(eco['center_lng']) for eco in ecoregions]),
+                      np.array([float(eco['radius_km']) for eco in ecoregions]))
+    point_idx, eco_idx = grid.match(points.lat, points.lng)
+    if not len(point_idx):
+        return []
+
+    n_eco = len(ecoregions)
+    species_idx, eco = np.divmod(np.unique(points.owner[point_idx] * n_eco + eco_idx), n_eco)
+    return [{'species_id': points.species_ids[s], 'ecoregion_id': ecoregions[e]['id']}
+            for s, e in zip(species_idx.tolist(), eco.tolist())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link species to ecoregions by center + radius proximity")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Match and report, but leave species_ecoregions untouched")
+    add_writer_arguments(parser)
+    add_staging_arguments(parser)
+    args = parser.parse_args()
+
+    print('🔗 Linking Species to Ecoregions (Radius-based)\n')
+    print('=' * 60)
+
+    supabase = init_supabase()
+
+    ecoregions = fetch_ecoregions(supabase)
+    print(f'\n📍 Ecoregions: {len(ecoregions)}\n')
+    for eco in ecoregions:
+        print(f'   • {eco["name"]}: ({eco["center_lat"]:.1f}, {eco["center_lng"]:.1f}), r={eco["radius_km"]}km')
+
+    print('\n🦎 Loading sample points')
+    points = load_sample_points(supabase)
+    print(f'   ✓ {len(points.species_ids):,} species, {len(points):,} points')
+
+    print('\n🔄 Processing species...\n')
+    start_time = time.time()
+    links = radius_links(points, ecoregions)
+    match_time = time.time() - start_time
+    rate = len(points) / match_time if match_time > 0 else 0
+    print(f'   ✓ {len(links):,} links in {match_time:.1f}s ({rate:,.0f} points/sec)')
+
+    if not args.dry_run:
+        # Build the new link set next to the live one, then swap it in
+        print(f'\n📦 Staging links...')
+        prepare_staging(supabase)
+        writer = create_writer(args.writer, STAGING_TABLE, supabase=supabase, dsn=args.db_url)
+        try:
+            for i in range(0, len(links), writer.batch_size):
+                writer.write(links[i:i + writer.batch_size])
+                print(f'   ↳ Staged {min(i + writer.batch_size, len(links)):,}/{len(links):,} links...', end='\r')
+            print()
+        finally:
+            writer.close()
+        try:
+            swap_staging(supabase, args.min_live_links, args.max_drop, rule=RULE_RADIUS)
+        except RuntimeError as e:
+            print(f'\n❌ {e}')
+            sys.exit(1)
+
+    duration = time.time() - start_time
+
+    print('\n' + '=' * 60)
+    print('🎉 Linking Complete!\n')
+    print(f'   Species processed: {len(points.species_ids):,}')
+    print(f'   Total links created: {len(links):,}')
+    print(f'   Duration: {duration:.1f} seconds')
+    print('\n' + '=' * 60)
+
+    # Summary by ecoregion
+    print('\n📊 Species per Ecoregion:\n')
+    per_ecoregion = Counter(link['ecoregion_id'] for link in links)
+    for eco in ecoregions:
+        print(f'   {eco["name"]}: {per_ecoregion[eco["id"]]:,} species')
+
+    print('\n✅ Done! Ready to test in browser.')
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,12 @@ import sys
 from dotenv import load_dotenv
 from supabase import create_client
 import time
-from shapely.geometry import shape, Point
-from shapely.wkt import loads as wkt_loads
+
+sys.path.append(os.path.dirname(__file__))
+from ecoregion_lod import LOD_TIERS, MATCH_TIER, LodMatcher, fetch_full_geometry
+from geometry_derivation import parse_geography
+from link_staging import RULE_POLYGON_PRESENCE, STAGING_TABLE, prepare_staging, swap_staging
+from keyset_reader import iter_rows, iter_species_pages
 
 load_dotenv(override=True)
 
@@ -21,91 +25,94 @@ supabase = create_client(url, key)
 print('🔗 Linking Species to WWF Ecoregions (Python-based)\n')
 print('=' * 60)
 
-# Get ecoregions with geometries
-ecoregions = supabase.table('ecoregions').select('*').execute()
-print(f'\n📍 Found {len(ecoregions.data)} ecoregions')
+# Get ecoregions with their ~10 km tier (built by ecoregion_lod.py); full geometry
+# is fetched per ecoregion only when a point lands near its boundary
+ecoregions = list(iter_rows(supabase, 'ecoregions', f'id, name, {MATCH_TIER}'))
+print(f'\n📍 Found {len(ecoregions)} ecoregions')
 
-# Parse ecoregion geometries
+# Build one matcher per ecoregion
 ecoregion_polygons = {}
-for eco in ecoregions.data:
+failures = 0  # Ecoregions that failed to load and link batches that failed to stage
+for eco in ecoregions:
     try:
-        geom_wkt = eco['geometry']
-        polygon = wkt_loads(geom_wkt)
+        coarse = parse_geography(eco[MATCH_TIER])
+        if coarse is not None:
+            matcher = LodMatcher(coarse, LOD_TIERS[MATCH_TIER],
+                                 load_full=lambda eco_id=eco['id']: fetch_full_geometry(supabase, eco_id))
+        else:
+            # No tier built yet: simplify the full geometry locally
+            full = fetch_full_geometry(supabase, eco['id'])
+            if full is None:
+                continue
+            matcher = LodMatcher.from_full(full)
         ecoregion_polygons[eco['id']] = {
             'name': eco['name'],
-            'polygon': polygon
+            'matcher': matcher
         }
         print(f'   ✓ Loaded: {eco["name"]}')
     except Exception as e:
         print(f'   ✗ Error loading {eco["name"]}: {e}')
+        failures += 1
 
 print(f'\n🔄 Processing species...')
 print(f'   This will check each species\' sample points against ecoregion boundaries')
 print(f'   Batch size: 1000 species at a time\n')
 
-# Clear existing links
-print('🗑️  Clearing existing links...')
-supabase.table('species_ecoregions').delete().neq('species_id', '00000000-0000-0000-0000-000000000000').execute()
-print('   ✓ Cleared\n')
+# Build the new links in a staging table; the live links stay visible until the swap
+print('📦 Preparing staging table...')
+prepare_staging(supabase)
+print('   ✓ Ready\n')
 
 start_time = time.time()
 total_links = 0
 processed = 0
 
-# Process species in batches
-BATCH_SIZE = 1000
-offset = 0
-
-while True:
-    # Fetch batch of species
-    species_batch = supabase.table('species')\
-        .select('id, scientific_name, sample_points')\
-        .not_.is_('sample_points', 'null')\
-        .range(offset, offset + BATCH_SIZE - 1)\
-        .execute()
+# Stream species in id order, one page at a time
+species_pages = iter_species_pages(supabase, 'id, scientific_name, sample_points',
+                                   filters=lambda q: q.not_.is_('sample_points', 'null'))
 
-    if not species_batch.data:
-        break
-
-    print(f'Processing species {offset}-{offset+len(species_batch.data)}...')
+for species_batch in species_pages:
+    print(f'Processing species {processed}-{processed+len(species_batch)}...')
 
     links = []
 
-    for species in species_batch.data:
+    for species in species_batch:
         sample_points = species.get('sample_points', [])
         if not sample_points or not isinstance(sample_points, list):
             continue
 
-        # Check each sample point against each ecoregion
+        # Check each sample point against each ecoregion. Several points usually
+        # fall in the same ecoregion, so each link is recorded once per species
+        seen = set()
         for point_data in sample_points:
             lat = point_data.get('lat')
             lng = point_data.get('lng')
             if lat is None or lng is None:
                 continue
 
-            point = Point(lng, lat)  # Note: shapely uses (lng, lat)
-
             # Check against all ecoregions
             for eco_id, eco_data in ecoregion_polygons.items():
-                if eco_data['polygon'].contains(point):
+                if eco_data['matcher'].contains(lng, lat):
                     # Species found in this ecoregion
-                    links.append({
-                        'species_id': species['id'],
-                        'ecoregion_id': eco_id
-                    })
-                    break  # One match per species is enough
+                    if eco_id not in seen:
+                        seen.add(eco_id)
+                        links.append({
+                            'species_id': species['id'],
+                            'ecoregion_id': eco_id
+                        })
+                    break  # One ecoregion per point is enough
 
     # Insert links for this batch
     if links:
         try:
-            supabase.table('species_ecoregions').insert(links).execute()
+            supabase.table(STAGING_TABLE).insert(links).execute()
             total_links += len(links)
             print(f'   ✓ Created {len(links)} links')
         except Exception as e:
             print(f'   ✗ Error inserting: {e}')
+            failures += 1
 
-    processed += len(species_batch.data)
-    offset += BATCH_SIZE
+    processed += len(species_batch)
 
     # Progress update
     if processed % 5000 == 0:
@@ -119,11 +126,19 @@ print('🎉 Linking Complete!\n')
 print(f'   Species processed: {processed}')
 print(f'   Total links created: {total_links}')
 print(f'   Duration: {duration:.1f} seconds')
+print(f'   Full-geometry checks: {sum(e["matcher"].exact_tests for e in ecoregion_polygons.values())}')
 print('\n' + '=' * 60)
 
+# Refuses (leaving the live links and the staging table) if anything above failed
+try:
+    swap_staging(supabase, failures=failures, rule=RULE_POLYGON_PRESENCE)
+except RuntimeError as e:
+    print(f'\n❌ {e}')
+    sys.exit(1)
+
 # Summary by ecoregion
 print('\n📊 Species per Ecoregion:\n')
-for ecoregion in ecoregions.data:
+for ecoregion in ecoregions:
     count_result = supabase.table('species_ecoregions')\
         .select('*', count='exact', head=True)\
         .eq('ecoregion_id', ecoregion['id'])\
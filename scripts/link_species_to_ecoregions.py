@@ -22,12 +22,12 @@ for eco in ecoregions.data:
 
 print('\n' + '=' * 60)
 print('🔄 Running spatial matching...')
-print('   This calls populate_all_species_ecoregion_links()')
-print('   It may take 2-3 minutes to process 53K species...\n')
+print('   This calls link_all_species_ecoregions() (one indexed join over species_sample_points)')
+print('   Run scripts/backfill_sample_points.py first if sample_points changed\n')
 
 try:
     # Call the SQL function via RPC
-    result = supabase.rpc('populate_all_species_ecoregion_links').execute()
+    result = supabase.rpc('link_all_species_ecoregions').execute()
     print('✅ Species-ecoregion linking complete!')
 
 except Exception as e:
@@ -10,6 +10,9 @@ from dotenv import load_dotenv
 from supabase import create_client
 import time
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_rows
+
 load_dotenv(override=True)
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -20,8 +23,8 @@ print('🔗 Linking Species to WWF Ecoregions\n')
 print('=' * 60)
 
 # Get ecoregions
-ecoregions = supabase.table('ecoregions').select('*').execute()
-print(f'\n📍 Found {len(ecoregions.data)} ecoregions to process\n')
+ecoregions = list(iter_rows(supabase, 'ecoregions', 'id, name'))
+print(f'\n📍 Found {len(ecoregions)} ecoregions to process\n')
 
 # Clear existing links
 print('🗑️  Clearing existing species-ecoregion links...')
@@ -36,11 +39,11 @@ print('   Estimated time: 3-5 minutes\n')
 start_time = time.time()
 total_links = 0
 
-for idx, ecoregion in enumerate(ecoregions.data, 1):
+for idx, ecoregion in enumerate(ecoregions, 1):
     eco_name = ecoregion['name']
     eco_id = ecoregion['id']
 
-    print(f'[{idx}/{len(ecoregions.data)}] {eco_name}')
+    print(f'[{idx}/{len(ecoregions)}] {eco_name}')
     print(f'   Querying species within polygon...')
 
     try:
@@ -83,12 +86,12 @@ print('=' * 60)
 print('🎉 Linking Complete!\n')
 print(f'   Total links created: {total_links}')
 print(f'   Duration: {duration:.1f} seconds')
-print(f'   Average: {total_links/len(ecoregions.data):.0f} species per ecoregion')
+print(f'   Average: {total_links/len(ecoregions):.0f} species per ecoregion')
 print('\n' + '=' * 60)
 
 # Summary by ecoregion
 print('\n📊 Species per Ecoregion:\n')
-for ecoregion in ecoregions.data:
+for ecoregion in ecoregions:
     count_result = supabase.table('species_ecoregions')\
         .select('*', count='exact', head=True)\
         .eq('ecoregion_id', ecoregion['id'])\
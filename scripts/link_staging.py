@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Staged species_ecoregions rebuilds
+
+Full-rebuild linkers write into species_ecoregions_staging instead of
+clearing the live table, then swap it in atomically once it is complete and
+its per-ecoregion counts pass validation (see
+supabase/migrations/20251017000010_species_ecoregions_staging_swap.sql).
+The app keeps reading the old links for the whole run.
+
+Each swap also records which rule built the links (species_ecoregions_link_rule),
+since the linkers do not agree: the incremental relinker only diffs against
+links built by its own RULE_HYBRID.
+
+Requirements:
+    pip install supabase
+
+Usage:
+    add_staging_arguments(parser)
+    ...
+    prepare_staging(supabase)                      # or keep_except=<ecoregion ids being rebuilt>
+    writer = create_writer(args.writer, STAGING_TABLE, supabase=supabase, dsn=args.db_url)
+    ...write links...
+    try:
+        swap_staging(supabase, args.min_live_links, args.max_drop, rule=RULE_RADIUS)  # or failures=<count>: refuse if > 0
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from supabase import Client
+
+STAGING_TABLE = 'species_ecoregions_staging'
+MIN_LIVE_LINKS = 10  # Ecoregions with fewer live links are not validated
+MAX_DROP = 0.5  # Largest share of an ecoregion's links a rebuild may drop
+SCHEMA_RELOAD_TIMEOUT = 30  # Seconds to wait for PostgREST to see the new staging table
+LINK_RULE_TABLE = 'species_ecoregions_link_rule'
+
+# Rules the linkers build species_ecoregions by
+RULE_HYBRID = 'hybrid'  # Points in polygon where an ecoregion has geometry, else center + radius (100 km default)
+RULE_POLYGON = 'polygon'  # Points in polygon only, with overlap shares - the polygon half of RULE_HYBRID
+RULE_RADIUS = 'radius'  # Center + radius for every ecoregion, no overlap shares
+RULE_POLYGON_PRESENCE = 'polygon_presence'  # Any point in polygon (LOD tiers), no overlap shares
+RULE_RPC_PROXIMITY = 'rpc_proximity'  # Match RPCs, 50 km proximity fallback (linkSpeciesToEcoregions.py)
+RULE_MIXED = 'mixed'  # Links from more than one rule, or unknown
+
+
+def add_staging_arguments(parser):
+    """Add the swap validation thresholds to an argparse parser"""
+    parser.add_argument("--max-drop", type=float, default=MAX_DROP,
+                        help=f"Refuse the swap if an ecoregion loses more than this share of its links "
+                             f"(default: {MAX_DROP}; 1 disables the check)")
+    parser.add_argument("--min-live-links", type=int, default=MIN_LIVE_LINKS,
+                        help=f"Only validate ecoregions with at least this many live links (default: {MIN_LIVE_LINKS})")
+
+
+def prepare_staging(supabase: Client, keep_except: Optional[List[str]] = None) -> int:
+    """
+    Create an empty, index-free staging table. With keep_except, it starts
+    with the live links of every ecoregion not in that list (for linkers that
+    rebuild only some ecoregions). Returns the number of links kept.
+    """
+    kept = supabase.rpc('prepare_species_ecoregions_staging',
+                        {'keep_except_ecoregions': keep_except}).execute().data
+
+    # PostgREST reloads its schema cache asynchronously after the NOTIFY
+    deadline = time.time() + SCHEMA_RELOAD_TIMEOUT
+    while True:
+        try:
+            supabase.table(STAGING_TABLE).select('species_id').limit(1).execute()
+            break
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(1)
+    return kept or 0
+
+
+def fetch_link_rule(supabase: Client) -> Optional[str]:
+    """Rule that built the current species_ecoregions rows (None if never recorded)"""
+    rows = supabase.table(LINK_RULE_TABLE).select('rule').execute().data
+    return rows[0]['rule'] if rows else None
+
+
+def set_link_rule(supabase: Client, rule: str):
+    """Record the rule behind the current species_ecoregions rows (for linkers that write them in place)"""
+    supabase.table(LINK_RULE_TABLE).upsert({
+        'singleton': True,
+        'rule': rule,
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+    }, on_conflict='singleton').execute()
+
+
+def swap_staging(supabase: Client, min_live_links: int = MIN_LIVE_LINKS, max_drop: float = MAX_DROP,
+                 dry_run: bool = False, failures: int = 0, rule: Optional[str] = None,
+                 partial: bool = False) -> List[Dict]:
+    """
+    Validate and index the staging table, then swap it in as species_ecoregions,
+    recording `rule` as the rule behind the new links (`partial`: staging kept
+    other ecoregions' live links, so the recorded rule becomes RULE_MIXED unless
+    they agree). Raises RuntimeError (and leaves the live table untouched) if
+    validation fails, or up front if the linker counted any failed matches or
+    writes: the per-ecoregion drop check cannot see a partly staged ecoregion
+    with few links.
+    """
+    if failures:
+        print(f"\n🔁 Not swapping: {failures:,} match/write failure(s) while staging")
+        print(f"   Live links were kept; {STAGING_TABLE} is left in place for inspection")
+        raise RuntimeError(f"{failures} failure(s) while staging links, refusing to swap")
+
+    print(f"\n🔁 {'Validating' if dry_run else 'Validating and swapping in'} staged links")
+    try:
+        report = supabase.rpc('swap_species_ecoregions_staging', {
+            'min_live_links': min_live_links,
+            'max_drop_fraction': max_drop,
+            'dry_run': dry_run,
+            'link_rule': rule,
+            'partial_rebuild': partial,
+        }).execute().data
+    except Exception as e:
+        print('   Live links were kept; fix the linker or rerun with a larger --max-drop')
+        raise RuntimeError(f"Swap refused: {e}") from e
+
+    live = sum(row['live_links'] for row in report)
+    staged = sum(row['staged_links'] for row in report)
+    print(f"   ✓ {live:,} live → {staged:,} staged links across {len(report)} ecoregions")
+    for row in report[:5]:
+        if row['staged_links'] < row['live_links']:
+            print(f"     ↓ {row['ecoregion_name']}: {row['live_links']:,} → {row['staged_links']:,}")
+    if not dry_run:
+        print('   ✓ Swapped in')
+    return report
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+WDPA Name Index
+
+Prebuilt on-disk index of protected-area names (WDPA polygon and point
+shapefiles, optionally the parks table), so "is Yasuní / Jaú in the data?"
+is a millisecond lookup instead of a multi-minute shapefile load.
+
+Names are normalized before indexing and querying: accents folded (NFKD),
+casefolded, punctuation collapsed to single spaces, so "Yasuní", "YASUNI"
+and "yasuni" share one key. Both NAME and ORIG_NAME are indexed.
+
+The index is one SQLite file in data/cache with two kinds of postings:
+    grams    3-grams of each normalized name -> entry ids  (substring search)
+    tokens   normalized words                -> entry ids  (prefix search)
+Posting lists are packed uint32 arrays, intersected smallest first; the few
+remaining candidates are verified against the normalized names. Each entry
+carries WDPAID, WDPA_PID, ISO3, designation, status, area and centroid.
+
+Requirements:
+    pip install fiona "shapely>=2"
+    pip install pyarrow                  # optional, reads the GeoParquet cache built by source_cache.py
+    pip install supabase python-dotenv   # only for build --from-db
+
+Usage:
+    python3 scripts/name_index.py build                # WDPA_*.shp in ~/Downloads/protected-regions
+    python3 scripts/name_index.py build --from-db      # also index the parks table
+    python3 scripts/name_index.py search "yasuní" "jau"
+    python3 scripts/name_index.py search --prefix "gates of"
+
+    from name_index import NameIndex
+    with NameIndex() as index:
+        matches = index.search('yasuni')
+"""
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import unicodedata
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+
+sys.path.append(os.path.dirname(__file__))
+from source_cache import CACHE_DIR, cached_source, iter_features, source_fields, source_hash
+
+# Configuration
+INDEX_PATH = CACHE_DIR / 'wdpa-names.sqlite'
+SHAPEFILE_DIR = Path.home() / 'Downloads' / 'protected-regions'
+GRAM = 3  # Substring postings are 3-grams; shorter queries use the token prefix postings
+INSERT_BATCH = 5000
+
+# Attribute columns read from the WDPA sources (missing ones are skipped)
+NAME_FIELDS = ['NAME', 'ORIG_NAME']
+PAYLOAD_FIELDS = ['WDPAID', 'WDPA_PID', 'ISO3', 'DESIG_ENG', 'STATUS', 'GIS_AREA', 'REP_AREA']
+
+# Columns of a search result, in entries table order
+ENTRY_COLUMNS = [
+    'source', 'name', 'orig_name', 'wdpa_id', 'wdpa_pid', 'iso3',
+    'designation', 'status', 'area_km2', 'lat', 'lng'
+]
+
+SCHEMA = """
+CREATE TABLE entries (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    name TEXT,
+    orig_name TEXT,
+    wdpa_id INTEGER,
+    wdpa_pid TEXT,
+    iso3 TEXT,
+    designation TEXT,
+    status TEXT,
+    area_km2 REAL,
+    lat REAL,
+    lng REAL,
+    keys TEXT NOT NULL  -- normalized names, '|'-separated
+);
+CREATE TABLE grams (gram TEXT PRIMARY KEY, entries BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE tokens (token TEXT PRIMARY KEY, entries BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE sources (source TEXT PRIMARY KEY, path TEXT, fingerprint TEXT, entries INTEGER, built_at REAL);
+"""
+
+
+def normalize_name(text) -> str:
+    """Accent-folded, casefolded name with punctuation collapsed to single spaces"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    folded = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return ' '.join(re.findall(r'[^\W_]+', folded))
+
+
+def name_grams(normalized: str) -> Set[str]:
+    """Overlapping GRAM-character substrings of a normalized name"""
+    return {normalized[i:i + GRAM] for i in range(len(normalized) - GRAM + 1)}
+
+
+def wdpa_entries(shapefile: Path) -> Iterator[Dict]:
+    """Index entries for one WDPA shapefile (GeoParquet cache if built)"""
+    source = cached_source(shapefile) or str(shapefile)
+    fields = source_fields(source)
+    columns = [f for f in NAME_FIELDS + PAYLOAD_FIELDS if f in fields]
+
+    for _, props, geom in iter_features(source, columns=columns):
+        lat = lng = None
+        if geom:
+            try:
+                geom = geom if isinstance(geom, BaseGeometry) else shape(geom)
+                centroid = geom.centroid
+                lat, lng = centroid.y, centroid.x
+            except Exception:
+                pass
+
+        yield {
+            'source': shapefile.name,
+            'name': props.get('NAME'),
+            'orig_name': props.get('ORIG_NAME'),
+            'wdpa_id': props.get('WDPAID'),
+            'wdpa_pid': props.get('WDPA_PID'),
+            'iso3': props.get('ISO3'),
+            'designation': props.get('DESIG_ENG'),
+            'status': props.get('STATUS'),
+            'area_km2': props.get('GIS_AREA') or props.get('REP_AREA'),
+            'lat': lat,
+            'lng': lng,
+        }
+
+
+def park_entries(supabase, page_size: int = 1000) -> Iterator[Dict]:
+    """Index entries for every row of the parks table"""
+    from keyset_reader import iter_rows  # Needs supabase, like the rest of --from-db
+
+    parks = iter_rows(supabase, 'parks', 'name, wdpa_id, iso3, designation_eng, status, gis_area_km2, center_lat, center_lng',
+                      page_size=page_size)
+    for park in parks:
+        area, lat, lng = (float(v) if v is not None else None
+                          for v in (park.get('gis_area_km2'), park.get('center_lat'), park.get('center_lng')))
+        yield {
+            'source': 'parks',
+            'name': park.get('name'),
+            'orig_name': None,
+            'wdpa_id': park.get('wdpa_id'),
+            'wdpa_pid': None,
+            'iso3': park.get('iso3'),
+            'designation': park.get('designation_eng'),
+            'status': park.get('status'),
+            'area_km2': area,
+            'lat': lat,
+            'lng': lng,
+        }
+
+
+def build_index(shapefiles: List[Path], path: Path = INDEX_PATH, supabase=None) -> Path:
+    """Write the name index for the given WDPA shapefiles (and the parks table if a client is given)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    conn.executescript(SCHEMA)
+
+    # Entry ids are assigned in increasing order, so every posting list stays sorted
+    grams = defaultdict(lambda: array('I'))
+    tokens = defaultdict(lambda: array('I'))
+    insert = f"INSERT INTO entries VALUES (?, {', '.join('?' * len(ENTRY_COLUMNS))}, ?)"
+    next_id = 0
+
+    def add_entries(source: str, entries: Iterator[Dict], fingerprint: Optional[str], source_path: Optional[str]):
+        nonlocal next_id
+        print(f"  ↳ Indexing {source}...")
+        count = 0
+        batch = []
+        for entry in entries:
+            keys = list(dict.fromkeys(k for k in map(normalize_name, (entry['name'], entry['orig_name'])) if k))
+            if not keys:
+                continue
+
+            entry_id = next_id
+            next_id += 1
+            for gram in set().union(*map(name_grams, keys)):
+                grams[gram].append(entry_id)
+            for token in set(' '.join(keys).split()):
+                tokens[token].append(entry_id)
+
+            batch.append((entry_id, *(entry[c] for c in ENTRY_COLUMNS), '|'.join(keys)))
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany(insert, batch)
+                batch = []
+            count += 1
+            if count % 10000 == 0:
+                print(f"    ↳ {count:,} names...", end='\r')
+
+        if batch:
+            conn.executemany(insert, batch)
+        conn.execute("INSERT INTO sources VALUES (?, ?, ?, ?, ?)",
+                     (source, source_path, fingerprint, count, time.time()))
+        print(f"    ✓ {count:,} names from {source}")
+
+    try:
+        for shapefile in shapefiles:
+            add_entries(shapefile.name, wdpa_entries(shapefile), source_hash(shapefile), str(shapefile))
+        if supabase is not None:
+            add_entries('parks', park_entries(supabase), None, None)
+
+        print(f"  ↳ Writing {len(grams):,} gram and {len(tokens):,} token posting lists...")
+        conn.executemany("INSERT INTO grams VALUES (?, ?)", ((g, ids.tobytes()) for g, ids in grams.items()))
+        conn.executemany("INSERT INTO tokens VALUES (?, ?)", ((t, ids.tobytes()) for t, ids in tokens.items()))
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    print(f"  ✓ Wrote {path.name} ({next_id:,} entries, {path.stat().st_size / 1e6:,.1f} MB)")
+    return path
+
+
+class NameIndex:
+    """Read-only view of a built name index"""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        if not path.exists():
+            raise FileNotFoundError(f"No name index at {path} - run: python3 scripts/name_index.py build")
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def sources(self) -> List[Dict]:
+        rows = self.conn.execute("SELECT source, path, fingerprint, entries, built_at FROM sources").fetchall()
+        return [dict(zip(('source', 'path', 'fingerprint', 'entries', 'built_at'), row)) for row in rows]
+
+    def has_source(self, source: str) -> bool:
+        return any(s['source'] == source for s in self.sources())
+
+    def stale_sources(self) -> List[str]:
+        """Indexed shapefiles that changed on disk since the index was built"""
+        return [
+            s['source'] for s in self.sources()
+            if s['path'] and Path(s['path']).exists() and source_hash(Path(s['path'])) != s['fingerprint']
+        ]
+
+    def _postings(self, table: str, column: str, keys: List[str]) -> List[array]:
+        placeholders = ', '.join('?' * len(keys))
+        rows = self.conn.execute(f"SELECT entries FROM {table} WHERE {column} IN ({placeholders})", keys)
+        postings = []
+        for (blob,) in rows:
+            ids = array('I')
+            ids.frombytes(blob)
+            postings.append(ids)
+        return postings
+
+    def _gram_candidates(self, query: str) -> Set[int]:
+        grams = sorted(name_grams(query))
+        postings = self._postings('grams', 'gram', grams)
+        if len(postings) < len(grams):
+            return set()  # Some 3-gram occurs in no name at all
+        return intersect(postings)
+
+    def _prefix_candidates(self, query: str) -> Set[int]:
+        per_token = []
+        for token in set(query.split()):
+            matched = set()
+            rows = self.conn.execute(
+                "SELECT entries FROM tokens WHERE token >= ? AND token < ?", (token, token + '\U0010ffff'))
+            for (blob,) in rows:
+                ids = array('I')
+                ids.frombytes(blob)
+                matched.update(ids)
+            if not matched:
+                return set()
+            per_token.append(matched)
+        return set.intersection(*per_token)
+
+    def search(self, query: str, limit: Optional[int] = 20, prefix: bool = False,
+               source: Optional[str] = None) -> List[Dict]:
+        """
+        Entries whose NAME or ORIG_NAME contains `query` (after normalization),
+        or with prefix=True, where every query word starts some word of the name.
+        Exact name matches rank first, then names starting with the query, then
+        whole-word matches, then the rest; ties go to the larger area.
+        """
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        if prefix or len(normalized) < GRAM:
+            candidates = self._prefix_candidates(normalized)
+        else:
+            candidates = self._gram_candidates(normalized)
+
+        matches = []
+        ids = sorted(candidates)
+        for i in range(0, len(ids), 900):  # Stay under SQLite's bound-parameter limit
+            chunk = ids[i:i + 900]
+            rows = self.conn.execute(
+                f"SELECT {', '.join(ENTRY_COLUMNS)}, keys FROM entries WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk)
+            for row in rows:
+                entry = dict(zip(ENTRY_COLUMNS, row[:-1]))
+                keys = row[-1].split('|')
+                if source and entry['source'] != source:
+                    continue
+                if not prefix and len(normalized) >= GRAM and not any(normalized in key for key in keys):
+                    continue  # 3-grams all present, but not contiguously
+                matches.append((match_rank(normalized, keys), -(entry['area_km2'] or 0), entry))
+
+        matches.sort(key=lambda m: m[:2])
+        return [entry for _, _, entry in matches[:limit]]
+
+
+def match_rank(normalized: str, keys: List[str]) -> int:
+    """0 exact name, 1 name starts with the query, 2 query is whole words of the name, 3 substring"""
+    if normalized in keys:
+        return 0
+    if any(k.startswith(normalized) for k in keys):
+        return 1
+    if any(f' {normalized} ' in f' {k} ' for k in keys):
+        return 2
+    return 3
+
+
+def intersect(postings: List[array]) -> Set[int]:
+    """Intersection of sorted posting lists, smallest first"""
+    postings = sorted(postings, key=len)
+    result = set(postings[0])
+    for ids in postings[1:]:
+        if not result:
+            break
+        result.intersection_update(ids)
+    return result
+
+
+def open_index(path: Path = INDEX_PATH) -> Optional[NameIndex]:
+    """The name index if one has been built, else None"""
+    return NameIndex(path) if path.exists() else None
+
+
+def init_supabase():
+    """Supabase client for build --from-db (imported lazily, only this mode needs it)"""
+    from supabase import create_client
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    url = os.getenv('VITE_SUPABASE_URL')
+    key = os.getenv('VITE_SUPABASE_SERVICE_KEY')
+    if not url or not key:
+        raise ValueError("Missing Supabase credentials in .env file")
+    return create_client(url, key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the WDPA / parks name index")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Build the index from WDPA shapefiles (and the parks table)")
+    build.add_argument("shapefiles", nargs='*', type=Path,
+                       help=f"WDPA shapefiles (default: WDPA_*.shp in {SHAPEFILE_DIR})")
+    build.add_argument("--from-db", action="store_true", help="Also index the names in the parks table")
+    build.add_argument("--index", type=Path, default=INDEX_PATH, help=f"Index file (default: {INDEX_PATH})")
+
+    search = commands.add_parser('search', help="Look up names in the index")
+    search.add_argument("terms", nargs='+', help="Names or name fragments (accents and case are ignored)")
+    search.add_argument("--prefix", action="store_true", help="Match word prefixes instead of substrings")
+    search.add_argument("--source", default=None, help="Only entries from this source (e.g. parks)")
+    search.add_argument("--limit", type=int, default=10, help="Matches shown per term (default: 10)")
+    search.add_argument("--index", type=Path, default=INDEX_PATH, help=f"Index file (default: {INDEX_PATH})")
+    args = parser.parse_args()
+
+    print('📇 WDPA Name Index\n')
+    print('=' * 60)
+
+    if args.command == 'build':
+        shapefiles = args.shapefiles or sorted(SHAPEFILE_DIR.glob('WDPA_*.shp'))
+        if not shapefiles and not args.from_db:
+            print(f"❌ No WDPA shapefiles found in {SHAPEFILE_DIR}")
+            sys.exit(1)
+
+        start_time = time.time()
+        supabase = init_supabase() if args.from_db else None
+        build_index(shapefiles, args.index, supabase)
+        print(f"\n✓ Built in {time.time() - start_time:.1f}s")
+        return
+
+    try:
+        index = NameIndex(args.index)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    with index:
+        for source in index.stale_sources():
+            print(f"⚠️  {source} changed since the index was built - rebuild with: name_index.py build")
+
+        for term in args.terms:
+            start = time.perf_counter()
+            matches = index.search(term, args.limit, args.prefix, args.source)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if not matches:
+                print(f"\n❌ Not found: \"{term}\" ({elapsed_ms:.1f} ms)")
+                continue
+
+            print(f"\n✅ \"{term}\": {len(matches)} match(es) ({elapsed_ms:.1f} ms)")
+            for m in matches:
+                area = f"{m['area_km2']:,.1f} km²" if m['area_km2'] is not None else 'N/A'
+                location = f"({m['lat']:.3f}, {m['lng']:.3f})" if m['lat'] is not None else 'N/A'
+                print(f"   - {m['name']}" + (f" / {m['orig_name']}" if m['orig_name'] and m['orig_name'] != m['name'] else ''))
+                print(f"     WDPA ID: {m['wdpa_id'] or 'N/A'}  PID: {m['wdpa_pid'] or 'N/A'}  "
+                      f"Country: {m['iso3'] or 'N/A'}  Source: {m['source']}")
+                print(f"     {m['designation'] or 'N/A'}, {m['status'] or 'N/A'}, {area}, centroid {location}")
+
+    print('\n' + '=' * 60)
+
+
+if __name__ == '__main__':
+    main()
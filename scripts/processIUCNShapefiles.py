@@ -3,36 +3,71 @@
 IUCN Shapefile Processing Script (Python)
 
 Efficiently processes IUCN Red List shapefiles and imports species data into Supabase.
-Uses streaming to handle large files without memory issues.
+Uses streaming to handle large files without memory issues, reading shapefiles
+directly from their zip archives (no extraction to disk).
 
 Requirements:
-    pip install fiona shapely supabase python-dotenv
+    pip install fiona "shapely>=2" numpy supabase python-dotenv
+    pip install pyarrow   # optional, reads the GeoParquet cache built by source_cache.py
 
 Usage:
     python3 scripts/processIUCNShapefiles.py
+    python3 scripts/processIUCNShapefiles.py --workers 8   # parse features in parallel
+    python3 scripts/processIUCNShapefiles.py --restart     # ignore saved checkpoints
+    python3 scripts/processIUCNShapefiles.py --writer copy # bulk-load over a direct Postgres connection
+    python3 scripts/source_cache.py data/iucn-spatial/*.zip  # one-time: cache archives as GeoParquet
+    python3 scripts/processIUCNShapefiles.py --attributes-only  # refresh status/taxonomy, skip geometry
+    python3 scripts/processIUCNShapefiles.py --consolidate      # one row per variant instead of per polygon
+    python3 scripts/processIUCNShapefiles.py --region mvp       # only ranges touching the served ecoregions
+
+Rows are upserted on a deterministic range_key and progress is checkpointed per
+archive and feature offset, so rerunning after a crash resumes where it stopped.
+
+By default every IUCN polygon becomes its own species row. --consolidate writes
+one row per variant (iucn_id, subspecies, subpopulation, presence, seasonal)
+instead; clear the IUCN rows (range_key IS NOT NULL) before switching modes.
+
+--region / --ecoregion / --bbox (see region_filter.py) drop ranges outside the
+served area before any sampling or upload.
 """
 
 import os
 import sys
-import zipfile
-import tempfile
-import shutil
 import json
+import hashlib
+import argparse
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-import fiona
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, Callable
+import numpy as np
+import shapely
 from shapely.geometry import shape, mapping
+from shapely.geometry.base import BaseGeometry
 from shapely.ops import transform
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import time
 
+sys.path.append(os.path.dirname(__file__))
+from shapefile_reader import find_zip_shapefile
+from source_cache import cached_source, count_features, iter_features
+from region_filter import RegionFilter, add_region_arguments, build_region_filter
+from db_writers import create_writer, add_writer_arguments
+from keyset_reader import iter_species_pages
+
 # Load environment variables (override=True to reload from file)
 load_dotenv(override=True)
 
 # Configuration
 SHAPEFILE_DIR = Path(__file__).parent.parent / 'data' / 'iucn-spatial'
 BATCH_SIZE = 500  # Insert 500 species at a time
+CHUNK_SIZE = 2000  # Features per worker task when running with --workers
+WRITE_QUEUE_BATCHES = 4  # Parsed batches buffered ahead of the database writer
+CHECKPOINT_FILE = SHAPEFILE_DIR / '.import_checkpoint.json'
+MAX_VARIANT_POINTS = 64  # Cap on merged sample points per consolidated variant row
 
 # Conservation status mapping
 STATUS_MAP = {
@@ -46,6 +81,20 @@ STATUS_MAP = {
     'EW': 'Extinct in the Wild'
 }
 
+# DBF fields read by --attributes-only (no geometry is touched)
+ATTRIBUTE_FIELDS = [
+    'id_no', 'sci_name', 'subspecies', 'subpop', 'category',
+    'kingdom', 'phylum', 'class', 'order_', 'family', 'genus',
+    'marine', 'terrestria', 'freshwater'
+]
+
+# species columns that --attributes-only compares and updates
+ATTRIBUTE_COLUMNS = [
+    'scientific_name', 'conservation_status', 'conservation_status_full',
+    'kingdom', 'phylum', 'class', 'order_name', 'family', 'genus',
+    'is_marine', 'is_terrestrial', 'is_freshwater'
+]
+
 
 def init_supabase() -> Client:
     """Initialize Supabase client"""
@@ -60,35 +109,32 @@ def init_supabase() -> Client:
     return create_client(url, key)
 
 
-def extract_sample_points(geometry: dict, max_points: int = 8) -> Tuple[List[Dict], Optional[float]]:
+def range_coordinates(geom) -> np.ndarray:
+    """(N, 2) array of lng/lat outline coordinates (exterior rings only for polygons)"""
+    if geom.geom_type in ('Polygon', 'MultiPolygon'):
+        rings = shapely.get_exterior_ring(shapely.get_parts(geom))
+        return shapely.get_coordinates(rings)
+    return shapely.get_coordinates(geom)
+
+
+def extract_sample_points(geometry, max_points: int = 8) -> Tuple[List[Dict], Optional[float]]:
     """
     Extract sample points from geometry for accurate species-to-park matching.
     Intelligently selects representative points across the species' range.
+
+    Vectorized with NumPy: outline coordinates are binned into a grid in one
+    pass and the middle coordinate of each cell (in outline order) is picked.
+    Accepts a GeoJSON-like dict or an already parsed shapely geometry.
     """
     if not geometry:
         return [], None
 
     try:
-        geom = shape(geometry)
+        geom = geometry if isinstance(geometry, BaseGeometry) else shape(geometry)
 
         # Get all coordinates from the geometry
-        coords = []
-        if geom.geom_type == 'Point':
-            coords = [geom.coords[0]]
-        elif geom.geom_type in ('LineString', 'MultiPoint'):
-            coords = list(geom.coords)
-        elif geom.geom_type == 'Polygon':
-            coords = list(geom.exterior.coords)
-        elif geom.geom_type == 'MultiPolygon':
-            for poly in geom.geoms:
-                coords.extend(list(poly.exterior.coords))
-        elif geom.geom_type == 'MultiLineString':
-            for line in geom.geoms:
-                coords.extend(list(line.coords))
-        else:
-            coords = list(geom.coords) if hasattr(geom, 'coords') else []
-
-        if not coords:
+        coords = range_coordinates(geom)
+        if len(coords) == 0:
             return [], None
 
         # Calculate bounding box for area estimation
@@ -102,34 +148,29 @@ def extract_sample_points(geometry: dict, max_points: int = 8) -> Tuple[List[Dic
         lat_step = lat_diff / grid_size if lat_diff > 0 else 1
         lng_step = lng_diff / grid_size if lng_diff > 0 else 1
 
-        grid_map = {}
-        for lng, lat in coords:
-            grid_lat = int((lat - bounds[1]) / lat_step) if lat_step > 0 else 0
-            grid_lng = int((lng - bounds[0]) / lng_step) if lng_step > 0 else 0
-            key = f"{grid_lat},{grid_lng}"
-
-            if key not in grid_map:
-                grid_map[key] = []
-            grid_map[key].append((lng, lat))
-
-        # Select one representative point from each grid cell
-        sample_points = []
-        for cell_coords in grid_map.values():
-            if len(sample_points) >= max_points:
-                break
-            # Take the middle coordinate from this cell
-            mid_idx = len(cell_coords) // 2
-            lng, lat = cell_coords[mid_idx]
-            sample_points.append({'lat': lat, 'lng': lng})
+        lngs = coords[:, 0]
+        lats = coords[:, 1]
+        grid_lat = ((lats - bounds[1]) / lat_step).astype(np.int64)
+        grid_lng = ((lngs - bounds[0]) / lng_step).astype(np.int64)
+        cell_ids = grid_lat * (grid_size + 1) + grid_lng
+
+        # Group coordinate indices by cell, preserving outline order within each cell
+        order = np.argsort(cell_ids, kind='stable')
+        _, first_seen, counts = np.unique(cell_ids, return_index=True, return_counts=True)
+        starts = np.cumsum(counts) - counts
+        middles = order[starts + counts // 2]
+
+        # Select one representative point from each grid cell, in first-seen cell order
+        selected = middles[np.argsort(first_seen, kind='stable')][:max_points]
+        sample_points = [
+            {'lat': lat, 'lng': lng}
+            for lng, lat in coords[selected].tolist()
+        ]
 
         # If we have very few samples, add extreme points
         if len(sample_points) < 4 and len(coords) >= 4:
-            extremes = [
-                coords[0],
-                coords[len(coords) // 3],
-                coords[(2 * len(coords)) // 3],
-                coords[-1]
-            ]
+            n = len(coords)
+            extremes = coords[[0, n // 3, (2 * n) // 3, n - 1]].tolist()
             for lng, lat in extremes:
                 if len(sample_points) >= max_points:
                     break
@@ -148,171 +189,572 @@ def extract_sample_points(geometry: dict, max_points: int = 8) -> Tuple[List[Dic
         return [], None
 
 
-def process_shapefile_features(shp_path: Path) -> List[Dict]:
+def species_range_key(record: Dict, geom: Optional[BaseGeometry]) -> str:
+    """
+    Deterministic row key for one range polygon: variant fields plus a hash of
+    the polygon itself, so the same feature always maps to the same row.
     """
-    Stream-process features from a shapefile without loading entire file into memory.
-    Returns list of species records.
+    variant = '|'.join(str(record[field]) for field in
+                       ('iucn_id', 'subspecies', 'subpopulation', 'presence', 'seasonal'))
+    digest = hashlib.sha1(variant.encode('utf-8'))
+    if geom is not None:
+        digest.update(shapely.to_wkb(geom))
+    return digest.hexdigest()
+
+
+def variant_fields(props: Dict) -> Tuple[str, str]:
+    """Normalized (subspecies, subpopulation) of an IUCN feature ('' when absent)"""
+    subspecies = props.get('subspecies') if props.get('subspecies') not in ('None', '0', 0, None) else ''
+    subpopulation = props.get('subpop') if props.get('subpop') not in ('None', '0', 0, None) else ''
+    return subspecies, subpopulation
+
+
+def species_attributes(props: Dict) -> Dict:
+    """Red List status, taxonomy and habitat columns of an IUCN feature"""
+    return {
+        'scientific_name': props['sci_name'],
+        'conservation_status': props.get('category'),
+        'conservation_status_full': STATUS_MAP.get(props.get('category')),
+
+        # Taxonomy
+        'kingdom': props.get('kingdom'),
+        'phylum': props.get('phylum'),
+        'class': props.get('class'),
+        'order_name': props.get('order_'),
+        'family': props.get('family'),
+        'genus': props.get('genus'),
+
+        # Habitat classification
+        'is_marine': props.get('marine') in ('true', '1', True),
+        'is_terrestrial': props.get('terrestria') in ('true', '1', True),
+        'is_freshwater': props.get('freshwater') in ('true', '1', True),
+    }
+
+
+def range_bbox(geom: Optional[BaseGeometry]) -> Dict[str, Optional[float]]:
+    """Bounding box columns of a range polygon (all None without geometry)"""
+    if geom is None or geom.is_empty:
+        return {'range_min_lat': None, 'range_min_lng': None, 'range_max_lat': None, 'range_max_lng': None}
+    min_lng, min_lat, max_lng, max_lat = geom.bounds
+    return {'range_min_lat': min_lat, 'range_min_lng': min_lng, 'range_max_lat': max_lat, 'range_max_lng': max_lng}
+
+
+def build_species_record(props: Dict, geometry) -> Optional[Dict]:
+    """Map one IUCN feature to a species record (None if required fields are missing)"""
+    # Skip if missing required fields
+    if not props.get('id_no') or not props.get('sci_name'):
+        return None
+
+    # Parse geometry once - it feeds both the sample points and the row key
+    # (cached sources already hand over shapely geometries)
+    if isinstance(geometry, BaseGeometry):
+        geom = geometry
+    else:
+        geom = shape(geometry) if geometry else None
+
+    # Extract sample points for accurate geographic matching
+    sample_points, approx_area = extract_sample_points(geom, 8)
+
+    subspecies, subpopulation = variant_fields(props)
+
+    record = {
+        'iucn_id': props['id_no'],
+        **species_attributes(props),
+
+        # Subspecies and population variants
+        'subspecies': subspecies,
+        'subpopulation': subpopulation,
+        'presence': props.get('presence') if props.get('presence') not in (None, '') else 0,
+        'seasonal': props.get('seasonal') if props.get('seasonal') not in (None, '') else 0,
+        'source': props.get('source'),
+        'distribution_comments': props.get('dist_comm'),
+
+        # Accurate geographic data
+        'sample_points': sample_points if sample_points else None,
+        'approx_range_area_km2': approx_area,
+        **range_bbox(geom),
+
+        # Countries will be populated later
+        'countries': None,
+
+        # Metadata
+        'iucn_citation': props.get('citation'),
+        'compiler': props.get('compiler'),
+        'year_compiled': props.get('yrcompiled')
+    }
+    record['range_key'] = species_range_key(record, geom)
+    return record
+
+
+def process_shapefile_features(
+    shp_path: str,
+    start: int = 0,
+    region: Optional[RegionFilter] = None
+) -> Iterator[Tuple[int, Dict]]:
     """
+    Stream-process features from a shapefile (or its GeoParquet cache) without
+    loading entire file into memory.
+    Yields (feature_index, record) pairs one at a time, beginning at feature `start`,
+    so the caller can write while parsing continues and checkpoint by offset.
+    With a region, features outside it are skipped before any geometry work.
+    """
+    parsed = 0
+    bbox = region.bbox if region else None
+
+    # Open and read errors propagate: the caller must not mark a partly read
+    # archive complete. Only a malformed feature is skipped.
+    total_features = count_features(shp_path)
+    print(f"  ↳ Total features: {total_features}")
+
+    for idx, props, geometry in iter_features(shp_path, start, bbox=bbox):
+        try:
+            if region:
+                geometry = region.match(geometry)
+                if geometry is None:
+                    continue
+            record = build_species_record(props, geometry)
+
+            # Progress indicator
+            if (idx + 1) % 100 == 0:
+                print(f"  ↳ Processed {idx + 1}/{total_features} features...", end='\r')
+
+        except Exception as e:
+            print(f"\n  ⚠ Warning: Error processing feature {idx}: {e}")
+            continue
+
+        if record:
+            parsed += 1
+            yield idx, record
+
+    print(f"\n  ↳ Parsed {parsed} species records with sample points")
+    if region:
+        print(f"  ↳ Discarded {total_features - start - parsed} features outside {region.label}")
+
+
+def process_feature_range(task: Tuple[str, int, int, Optional[RegionFilter]]) -> List[Tuple[int, Dict]]:
+    """
+    Worker entry point: parse features [start, stop) of one shapefile,
+    keeping only those inside the region (if any).
+    Runs in a separate process, so it opens its own handle and stays quiet.
+    """
+    shp_path, start, stop, region = task
     records = []
 
-    try:
-        with fiona.open(shp_path, 'r') as src:
-            total_features = len(src)
-            print(f"  ↳ Total features: {total_features}")
-
-            for idx, feature in enumerate(src):
-                try:
-                    props = feature['properties']
-
-                    # Skip if missing required fields
-                    if not props.get('id_no') or not props.get('sci_name'):
-                        continue
-
-                    # Extract sample points for accurate geographic matching
-                    sample_points, approx_area = extract_sample_points(feature['geometry'], 8)
-
-                    record = {
-                        'iucn_id': props['id_no'],
-                        'scientific_name': props['sci_name'],
-                        'conservation_status': props.get('category'),
-                        'conservation_status_full': STATUS_MAP.get(props.get('category')),
-
-                        # Taxonomy
-                        'kingdom': props.get('kingdom'),
-                        'phylum': props.get('phylum'),
-                        'class': props.get('class'),
-                        'order_name': props.get('order_'),
-                        'family': props.get('family'),
-                        'genus': props.get('genus'),
-
-                        # Habitat classification
-                        'is_marine': props.get('marine') in ('true', '1', True),
-                        'is_terrestrial': props.get('terrestria') in ('true', '1', True),
-                        'is_freshwater': props.get('freshwater') in ('true', '1', True),
-
-                        # Subspecies and population variants
-                        'subspecies': props.get('subspecies') if props.get('subspecies') not in ('None', '0', 0, None) else '',
-                        'subpopulation': props.get('subpop') if props.get('subpop') not in ('None', '0', 0, None) else '',
-                        'presence': props.get('presence') if props.get('presence') not in (None, '') else 0,
-                        'seasonal': props.get('seasonal') if props.get('seasonal') not in (None, '') else 0,
-                        'source': props.get('source'),
-                        'distribution_comments': props.get('dist_comm'),
-
-                        # Accurate geographic data
-                        'sample_points': sample_points if sample_points else None,
-                        'approx_range_area_km2': approx_area,
-
-                        # Countries will be populated later
-                        'countries': None,
-
-                        # Metadata
-                        'iucn_citation': props.get('citation'),
-                        'compiler': props.get('compiler'),
-                        'year_compiled': props.get('yrcompiled')
-                    }
-
-                    records.append(record)
-
-                    # Progress indicator
-                    if (idx + 1) % 100 == 0:
-                        print(f"  ↳ Processed {idx + 1}/{total_features} features...", end='\r')
-
-                except Exception as e:
-                    print(f"\n  ⚠ Warning: Error processing feature {idx}: {e}")
+    for idx, props, geometry in iter_features(shp_path, start, stop, bbox=region.bbox if region else None):
+        try:
+            if region:
+                geometry = region.match(geometry)
+                if geometry is None:
                     continue
+            record = build_species_record(props, geometry)
+            if record:
+                records.append((idx, record))
+        except Exception as e:
+            print(f"\n  ⚠ Warning: Error processing feature {idx}: {e}")
+
+    return records
 
-            print(f"\n  ↳ Parsed {len(records)} species records with sample points")
-            return records
 
+def process_shapefile_features_parallel(
+    shp_path: str,
+    pool: ProcessPoolExecutor,
+    chunk_size: int = CHUNK_SIZE,
+    max_pending: int = 4,
+    start: int = 0,
+    region: Optional[RegionFilter] = None
+) -> Iterator[Tuple[int, Dict]]:
+    """
+    Split a shapefile into feature ranges and parse them across a process pool.
+    Yields (feature_index, record) pairs in feature order, so output matches the
+    serial path. At most max_pending chunks are in flight, which keeps memory
+    flat if the writer lags.
+    """
+    total_features = count_features(shp_path)  # Open errors propagate to process_archive
+    print(f"  ↳ Total features: {total_features}")
+
+    ranges = iter(range(start, total_features, chunk_size))
+    pending = deque()
+    parsed = 0
+
+    def submit_next() -> bool:
+        range_start = next(ranges, None)
+        if range_start is None:
+            return False
+        stop = min(range_start + chunk_size, total_features)
+        pending.append((stop, pool.submit(process_feature_range, (shp_path, range_start, stop, region))))
+        return True
+
+    while len(pending) < max_pending and submit_next():
+        pass
+
+    try:
+        while pending:
+            # Oldest chunk first keeps the merged stream in feature order
+            stop, future = pending.popleft()
+            chunk_records = future.result()
+            submit_next()
+
+            print(f"  ↳ Processed {stop}/{total_features} features...", end='\r')
+            parsed += len(chunk_records)
+            yield from chunk_records
     except Exception as e:
-        print(f"  ✗ Error opening shapefile: {e}")
-        return []
+        # Re-raise so the archive is not marked complete; the checkpoint keeps
+        # the last committed offset for the next run
+        print(f"\n  ✗ Worker failed: {e}")
+        for _, future in pending:
+            future.cancel()
+        raise
 
+    print(f"\n  ↳ Parsed {parsed} species records with sample points")
+    if region:
+        print(f"  ↳ Discarded {total_features - start - parsed} features outside {region.label}")
 
-def insert_species(supabase: Client, records: List[Dict]) -> Tuple[int, int]:
-    """Insert species records into Supabase in batches"""
 
-    # NOTE: We do NOT deduplicate records with the same variant key anymore!
-    # Each record represents a different geographic polygon, and we want to capture
-    # sample points from ALL polygons to get better geographic coverage for
-    # accurate species-to-park matching in the game.
+def variant_key(record: Dict) -> Tuple:
+    """(iucn_id, subspecies, subpopulation, presence, seasonal) of a species record"""
+    return (record['iucn_id'], record['subspecies'], record['subpopulation'], record['presence'], record['seasonal'])
+
 
-    print(f"  ↳ Inserting {len(records)} species records (all geographic regions) into database...")
+def merge_variant_record(merged: Dict, record: Dict):
+    """Fold one more polygon of the same variant into a consolidated record"""
+    merged['sample_points'].extend(record['sample_points'] or [])
+    merged['range_polygon_count'] += 1
 
-    inserted_count = 0
-    error_count = 0
+    if record['approx_range_area_km2'] is not None:
+        merged['approx_range_area_km2'] = (merged['approx_range_area_km2'] or 0) + record['approx_range_area_km2']
 
-    for i in range(0, len(records), BATCH_SIZE):
-        batch = records[i:i + BATCH_SIZE]
+    for column, pick in (('range_min_lat', min), ('range_min_lng', min), ('range_max_lat', max), ('range_max_lng', max)):
+        if record[column] is not None:
+            merged[column] = record[column] if merged[column] is None else pick(merged[column], record[column])
+
+
+def thin_sample_points(points: List[Dict], max_points: int = MAX_VARIANT_POINTS) -> List[Dict]:
+    """Drop exact duplicates, then keep an evenly spaced subset if still over max_points"""
+    unique = list({(p['lat'], p['lng']): p for p in points}.values())
+    if len(unique) <= max_points:
+        return unique
+    keep = np.linspace(0, len(unique) - 1, max_points).round().astype(int)
+    return [unique[i] for i in keep]
+
+
+def consolidate_records(records: Iterable[Tuple[int, Dict]]) -> Iterator[Tuple[int, Dict]]:
+    """
+    --consolidate: merge every polygon of one variant into a single record with
+    the union of their sample points, the combined bbox and the summed area.
+    Polygons of a variant are not contiguous in the shapefiles, so the whole
+    archive is grouped first (records are small once sampled). range_key
+    becomes the variant hash, so reruns upsert the same rows.
+    """
+    variants = {}
+    last_idx = -1
+
+    for idx, record in records:
+        last_idx = idx
+        key = variant_key(record)
+        if key in variants:
+            merge_variant_record(variants[key], record)
+        else:
+            merged = dict(record, sample_points=list(record['sample_points'] or []), range_polygon_count=1)
+            variants[key] = merged
+
+    if variants:
+        total_polygons = sum(merged['range_polygon_count'] for merged in variants.values())
+        print(f"  ↳ Consolidated {total_polygons} polygons into {len(variants)} variant records")
+
+    for merged in variants.values():
+        merged['sample_points'] = thin_sample_points(merged['sample_points']) or None
+        merged['range_key'] = species_range_key(merged, None)
+        yield last_idx, merged
+
+
+def species_writer(
+    writer,
+    batches: queue.Queue,
+    counts: Dict[str, int],
+    on_commit: Optional[Callable[[int], None]] = None
+):
+    """
+    Consumer thread: upsert batches from the queue until the None sentinel arrives.
+    on_commit(next_feature) is called after each batch while every batch so far
+    has succeeded, so a checkpoint never skips past a failed batch.
+    """
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        batch, next_feature = item
 
         try:
-            # Insert all records - each polygon gets its own database entry
-            # We'll use the UUID 'id' as primary key, allowing multiple entries
-            # with the same (iucn_id, subspecies, subpopulation, presence, seasonal)
-            response = supabase.table('species').insert(
-                batch
-            ).execute()
+            # Each polygon gets its own database entry, keyed by its deterministic
+            # range_key - re-sending a polygon updates its row instead of duplicating it
+            writer.write(batch)
 
-            inserted_count += len(batch)
-            print(f"    ✓ Inserted {inserted_count}/{len(records)} records", end='\r')
+            counts['inserted'] += len(batch)
+            print(f"    ✓ Upserted {counts['inserted']} records", end='\r')
+
+            if on_commit and counts['errors'] == 0:
+                on_commit(next_feature)
 
         except Exception as e:
-            error_msg = str(e)
-            print(f"\n    ✗ Batch {i // BATCH_SIZE + 1} failed: {e}")
-            error_count += len(batch)
+            print(f"\n    ✗ Batch {counts['batches'] + 1} failed: {e}")
+            counts['errors'] += len(batch)
+
+        counts['batches'] += 1
+
+
+def insert_species(
+    writer,
+    records: Iterable[Tuple[int, Dict]],
+    queue_batches: int = WRITE_QUEUE_BATCHES,
+    on_commit: Optional[Callable[[int], None]] = None
+) -> Tuple[int, int]:
+    """
+    Upsert species records into Supabase in batches of writer.batch_size.
+
+    (feature_index, record) pairs are pulled from the (possibly lazy) iterable on
+    this thread and handed to a writer thread through a bounded queue, so parsing
+    overlaps the network writes and at most queue_batches batches are buffered.
+    """
+
+    # NOTE: We do NOT deduplicate records with the same variant key anymore!
+    # Each record represents a different geographic polygon, and we want to capture
+    # sample points from ALL polygons to get better geographic coverage for
+    # accurate species-to-park matching in the game.
+
+    print("  ↳ Upserting species records (all geographic regions) into database as they are parsed...")
 
-    print(f"\n  ↳ Successfully inserted: {inserted_count}")
-    if error_count > 0:
-        print(f"  ↳ Errors/Skipped: {error_count}")
+    counts = {'inserted': 0, 'errors': 0, 'batches': 0}
+    batches = queue.Queue(maxsize=queue_batches)
+    writer_thread = threading.Thread(target=species_writer, args=(writer, batches, counts, on_commit), daemon=True)
+    writer_thread.start()
 
-    return inserted_count, error_count
+    # Keyed by range_key: an identical polygon repeated within one batch would
+    # otherwise make the upsert touch the same row twice and fail
+    batch = {}
+    try:
+        for idx, record in records:
+            batch[record['range_key']] = record
+            if len(batch) >= writer.batch_size:
+                batches.put((list(batch.values()), idx + 1))  # Blocks while the writer is behind
+                batch = {}
+
+        if batch:
+            batches.put((list(batch.values()), idx + 1))
+    finally:
+        batches.put(None)
+        writer_thread.join()
+
+    print(f"\n  ↳ Successfully upserted: {counts['inserted']}")
+    if counts['errors'] > 0:
+        print(f"  ↳ Errors/Skipped: {counts['errors']}")
+
+    return counts['inserted'], counts['errors']
 
 
-def find_shapefile(extract_dir: Path) -> Optional[Path]:
-    """Find .shp file in extracted directory"""
-    for shp_file in extract_dir.rglob('*.shp'):
-        return shp_file
-    return None
+def archive_fingerprint(zip_path: Path) -> str:
+    """Cheap identity for an archive, so a replaced download restarts from zero"""
+    stat = zip_path.stat()
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
 
 
-def process_archive(zip_path: Path, supabase: Client) -> bool:
-    """Process a single IUCN shapefile archive"""
+def load_checkpoints(path: Path = CHECKPOINT_FILE) -> Dict[str, Dict]:
+    """Load per-archive import progress saved by a previous run"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_checkpoints(checkpoints: Dict[str, Dict], path: Path = CHECKPOINT_FILE):
+    """Write checkpoints atomically so a crash mid-write never corrupts them"""
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoints, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def locate_source(zip_path: Path, use_cache: bool = True) -> Optional[str]:
+    """GeoParquet cache of an archive if built, else its shapefile read in place"""
+    shp_path = cached_source(zip_path) if use_cache else None
+    if shp_path:
+        print(f"  ↳ Reading cached {Path(shp_path).name}")
+        return shp_path
+
+    shp_path = find_zip_shapefile(zip_path)
+    if not shp_path:
+        print(f"  ✗ No .shp file found")
+        return None
+    print(f"  ↳ Reading {shp_path.split('!', 1)[1]} directly from archive")
+    return shp_path
+
+
+def process_archive(
+    zip_path: Path,
+    writer,
+    pool: Optional[ProcessPoolExecutor] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_pending: int = 4,
+    checkpoints: Optional[Dict[str, Dict]] = None,
+    use_cache: bool = True,
+    consolidate: bool = False,
+    region: Optional[RegionFilter] = None
+) -> bool:
+    """Process a single IUCN shapefile archive (GeoParquet cache if built, else read in place)"""
     filename = zip_path.stem
     print(f"\n📦 Processing: {filename}")
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        extract_dir = Path(temp_dir) / filename
+    # Resume from the last committed feature offset for this exact archive
+    checkpoints = checkpoints if checkpoints is not None else {}
+    fingerprint = archive_fingerprint(zip_path)
+    # Consolidated and region-filtered imports produce different rows, so they are tracked separately
+    checkpoint_name = zip_path.name
+    if consolidate:
+        checkpoint_name += '#consolidated'
+    if region:
+        checkpoint_name += f'#region={region.label}'
+    checkpoint = checkpoints.get(checkpoint_name)
+    if not checkpoint or checkpoint.get('fingerprint') != fingerprint:
+        checkpoint = {'fingerprint': fingerprint, 'next_feature': 0, 'complete': False}
+        checkpoints[checkpoint_name] = checkpoint
+
+    if checkpoint['complete']:
+        print("  ✓ Already imported (checkpoint) - skipping")
+        return True
+
+    # A variant can only be merged from the whole archive, so consolidated
+    # imports restart the archive and checkpoint only on completion
+    start = 0 if consolidate else checkpoint['next_feature']
+    if start:
+        print(f"  ↳ Resuming from feature {start} (checkpoint)")
+
+    def commit(next_feature: int):
+        checkpoint['next_feature'] = next_feature
+        save_checkpoints(checkpoints)
 
-        try:
-            # Step 1: Extract
-            print("  ↳ Extracting...")
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-
-            # Step 2: Find shapefile
-            shp_path = find_shapefile(extract_dir)
-            if not shp_path:
-                print(f"  ✗ No .shp file found")
-                return False
-
-            # Step 3: Stream-process features
+    try:
+        # Step 1: Prefer the GeoParquet cache, else locate shapefile inside the archive
+        shp_path = locate_source(zip_path, use_cache)
+        if not shp_path:
+            return False
+
+        # Step 2: Stream-process features (lazily - nothing is parsed yet)
+        if pool:
+            print("  ↳ Processing features (parallel)...")
+            records = process_shapefile_features_parallel(shp_path, pool, chunk_size, max_pending, start, region)
+        else:
             print("  ↳ Processing features (streaming)...")
-            records = process_shapefile_features(shp_path)
+            records = process_shapefile_features(shp_path, start, region)
 
-            if not records:
-                print("  ⚠ No valid species records found")
-                return False
+        if consolidate:
+            records = consolidate_records(records)
 
-            # Step 4: Insert into database
-            inserted, errors = insert_species(supabase, records)
+        # Step 3: Upsert into database while parsing continues
+        inserted, errors = insert_species(writer, records, on_commit=None if consolidate else commit)
 
-            print(f"  ✓ Completed {filename}")
-            return True
+        if inserted + errors == 0 and not start:
+            print("  ⚠ No valid species records found")
+            return False
 
-        except Exception as e:
-            print(f"  ✗ Error processing {filename}: {e}")
+        if errors:
+            print(f"  ⚠ {errors} records failed - rerun to resume from feature {checkpoint['next_feature']}")
             return False
 
+        checkpoint['complete'] = True
+        save_checkpoints(checkpoints)
+
+        print(f"  ✓ Completed {filename}")
+        return True
+
+    except Exception as e:
+        # Read or worker failure: leave the checkpoint incomplete so a rerun
+        # resumes from the last committed feature
+        print(f"  ✗ Error processing {filename}: {e}")
+        print(f"  ⚠ Not marked complete - rerun to resume from feature {checkpoint['next_feature']}")
+        return False
+
+
+def read_species_attributes(shp_path: str) -> Dict[Tuple[int, str, str], Dict]:
+    """
+    Read only the DBF attribute table (no geometry) and return the attribute
+    columns per (iucn_id, subspecies, subpopulation). Every range polygon of a
+    variant carries the same attributes, so the first feature wins.
+    """
+    attributes = {}
+    for idx, props, _ in iter_features(shp_path, columns=ATTRIBUTE_FIELDS, with_geometry=False):
+        if not props.get('id_no') or not props.get('sci_name'):
+            continue
+        key = (int(props['id_no']), *variant_fields(props))
+        if key not in attributes:
+            attributes[key] = species_attributes(props)
+    return attributes
+
+
+def fetch_species_attributes(supabase: Client, page_size: int = 1000) -> List[Dict]:
+    """Current attribute columns of every IUCN-sourced species row"""
+    columns = ', '.join(['id', 'iucn_id', 'subspecies', 'subpopulation'] + ATTRIBUTE_COLUMNS)
+    rows = []
+    for page in iter_species_pages(supabase, columns, page_size=page_size,
+                                   filters=lambda q: q.not_.is_('iucn_id', 'null')):
+        rows.extend(page)
+        print(f"  ↳ Loaded {len(rows):,} species rows...", end='\r')
+    print()
+    return rows
+
+
+def diff_species_attributes(rows: List[Dict], attributes: Dict[Tuple[int, str, str], Dict]) -> Dict[tuple, List[str]]:
+    """
+    Compare stored rows with the source attributes. Returns the changed columns
+    grouped by identical update payload -> species ids, so every group becomes
+    a single bulk update.
+    """
+    updates = {}
+    for row in rows:
+        key = (int(row['iucn_id']), row.get('subspecies') or '', row.get('subpopulation') or '')
+        source = attributes.get(key)
+        if source is None:
+            continue
+
+        changed = tuple((column, value) for column, value in source.items() if row.get(column) != value)
+        if changed:
+            updates.setdefault(changed, []).append(row['id'])
+    return updates
+
+
+def refresh_attributes(zip_files: List[Path], supabase: Client, writer, use_cache: bool = True) -> int:
+    """
+    --attributes-only: push Red List status, taxonomy and habitat changes from
+    the DBF tables to existing species rows. Geometry and sample_points are
+    never read or written. Returns the number of rows updated.
+    """
+    print('\n📋 Reading attribute tables (geometry skipped)...')
+    attributes = {}
+    for zip_path in zip_files:
+        print(f"\n📦 {zip_path.stem}")
+        shp_path = locate_source(zip_path, use_cache)
+        if shp_path:
+            archive_attributes = read_species_attributes(shp_path)
+            print(f"  ↳ {len(archive_attributes):,} species variants")
+            attributes.update(archive_attributes)
+
+    print('\n📊 Loading current species attributes...')
+    rows = fetch_species_attributes(supabase)
+
+    updates = diff_species_attributes(rows, attributes)
+    changed_rows = sum(len(ids) for ids in updates.values())
+    print(f"  ↳ {changed_rows:,} of {len(rows):,} rows changed ({len(updates):,} distinct updates)")
+
+    updated = 0
+    for i, (changes, ids) in enumerate(updates.items(), 1):
+        try:
+            updated += writer.update(dict(changes), 'id', ids)
+        except Exception as e:
+            print(f"\n  ⚠ Update failed ({', '.join(c for c, _ in changes)}): {e}")
+        print(f"  ↳ Applied {i:,}/{len(updates):,} updates ({updated:,} rows)...", end='\r')
+
+    print(f"\n  ✓ Updated {updated:,} species rows")
+    return updated
+
 
 def get_species_count(supabase: Client) -> int:
     """Get current species count from database"""
@@ -325,11 +767,37 @@ def get_species_count(supabase: Client) -> int:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Import IUCN Red List range shapefiles into Supabase")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to parse features (default: 1, serial)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"Features per worker task (default: {CHUNK_SIZE})")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore saved checkpoints and re-read every archive from the start")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Read the zip archives even if a GeoParquet cache exists")
+    parser.add_argument("--consolidate", action="store_true",
+                        help="Merge all polygons of a variant into one row (union of sample points, combined bbox)")
+    parser.add_argument("--attributes-only", action="store_true",
+                        help="Only refresh Red List status, taxonomy and habitat flags of existing rows")
+    add_region_arguments(parser)
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        region = build_region_filter(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid region: {e}")
+        sys.exit(1)
+
     print('🌍 IUCN Shapefile Processing Script (Python)\n')
     print('=' * 60)
 
-    # Initialize Supabase
+    # Initialize Supabase and the species writer
     supabase = init_supabase()
+    writer = create_writer(args.writer, 'species', supabase=supabase, dsn=args.db_url,
+                           on_conflict='range_key', batch_size=BATCH_SIZE)
+    print(f"✓ Writer: {args.writer} ({writer.batch_size} rows per batch)")
 
     # Check shapefile directory
     if not SHAPEFILE_DIR.exists():
@@ -344,27 +812,50 @@ def main():
         print('\n❌ No shapefile archives found')
         sys.exit(1)
 
+    if args.attributes_only:
+        start_time = time.time()
+        try:
+            refresh_attributes(zip_files, supabase, writer, not args.no_cache)
+        finally:
+            writer.close()
+        print('\n' + '=' * 60)
+        print(f"🎉 Attribute refresh complete in {(time.time() - start_time) / 60:.1f} minutes")
+        print('=' * 60)
+        return
+
     # Get initial count
     initial_count = get_species_count(supabase)
     print(f"\n📊 Current species in database: {initial_count}")
 
-    # Clear existing species data before fresh import
-    if initial_count > 0:
-        print(f"\n🗑️  Clearing {initial_count} existing species records...")
-        print("   ⚠️  Note: Due to Supabase timeout limits, this may not complete.")
-        print("   If records remain, the import will add new entries.")
-        print("   You may need to manually truncate via SQL Editor if duplicates occur.")
-        initial_count = 0  # Proceed with import regardless
+    # Load checkpoints - upserts on range_key make re-sent rows safe either way
+    checkpoints = {} if args.restart else load_checkpoints()
+    if checkpoints:
+        done = sum(1 for c in checkpoints.values() if c.get('complete'))
+        print(f"\n♻️  Resuming from checkpoint ({done} archive(s) already complete)")
+        print(f"   Delete {CHECKPOINT_FILE.name} or pass --restart to start over")
+
+    if region:
+        print(f"\n🗺️  Region filter: {region.label} (bbox {', '.join(f'{v:.2f}' for v in region.bbox)})")
 
     print('\nStarting processing...')
     start_time = time.time()
 
-    # Process each archive
+    # Process each archive (one pool shared across archives when parallel)
     success_count = 0
-    for i, zip_path in enumerate(zip_files):
-        print(f"\n[{i + 1}/{len(zip_files)}]")
-        if process_archive(zip_path, supabase):
-            success_count += 1
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    if pool:
+        print(f"⚙️  Using {args.workers} worker processes")
+
+    try:
+        for i, zip_path in enumerate(zip_files):
+            print(f"\n[{i + 1}/{len(zip_files)}]")
+            if process_archive(zip_path, writer, pool, args.chunk_size, args.workers * 2, checkpoints,
+                               not args.no_cache, args.consolidate, region):
+                success_count += 1
+    finally:
+        if pool:
+            pool.shutdown()
+        writer.close()
 
     # Get final count
     final_count = get_species_count(supabase)
@@ -6,28 +6,80 @@ Processes World Database on Protected Areas (WDPA) shapefiles
 and imports protected areas into Supabase.
 
 Requirements:
-    pip install fiona shapely supabase python-dotenv
+    pip install fiona "shapely>=2" pyproj supabase python-dotenv
+    pip install pyarrow   # optional, reads the GeoParquet cache built by source_cache.py
 
 Usage:
     python3 scripts/processWDPAShapefiles.py
+    python3 scripts/processWDPAShapefiles.py --writer copy   # bulk-load over a direct Postgres connection
+    python3 scripts/processWDPAShapefiles.py --no-cache      # ignore the GeoParquet cache
+    python3 scripts/processWDPAShapefiles.py --workers 8     # centroids + mapping across 8 processes
+    python3 scripts/processWDPAShapefiles.py --refresh       # apply a new monthly release as a diff
+    python3 scripts/processWDPAShapefiles.py --region mvp    # only parks inside the served ecoregions
+    python3 scripts/processWDPAShapefiles.py --simplify-tolerance 0.005  # coarser parks.bounds
+
+--refresh compares a hash of each record's attributes and geometry with the
+stored parks rows (by wdpa_id) and only upserts new or changed parks. Parks
+missing from the release are retired (retired_at set), not deleted, so
+species/park links survive.
+
+Parks are upserted on wdpa_id in every mode, so re-running an import updates
+rows instead of failing on the unique key. Features without a WDPAID have no
+key to upsert on and are skipped (and counted in the summary). A WDPAID made
+of several parcels (features, possibly split across the polygon and point
+shapefiles) becomes one row: a first attribute-only pass finds those WDPAIDs,
+their parcels are set aside while the shapefiles stream, and they are written
+last as the union of their geometry (polygon parcels win over point parcels)
+with the first such parcel's attributes and the summed GIS areas.
+
+Polygon parks also get parks.bounds: the boundary simplified with topology
+preserved (--simplify-tolerance, in degrees) and sent as hex EWKB, so park
+lookups can use polygon containment through the GIST index.
+
+--region / --ecoregion / --bbox (see region_filter.py) drop parks outside the
+served area before centroids or upload. A filtered --refresh never retires
+parks, since parks outside the region are simply not read.
 """
 
 import os
 import sys
+import json
+import math
+import hashlib
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
-import fiona
-from shapely.geometry import shape, Point
+from datetime import datetime, timezone
+from typing import AbstractSet, List, Dict, Optional, Tuple, Iterator
+import shapely
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import time
 
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from source_cache import cached_source, count_features, iter_features
+from geometry_derivation import derive_geometry, parse_geometry
+from region_filter import RegionFilter, add_region_arguments, build_region_filter
+from keyset_reader import iter_row_pages
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
 SHAPEFILE_DIR = Path.home() / 'Downloads' / 'protected-regions'
 BATCH_SIZE = 500
+CHUNK_SIZE = 5000  # Features per worker task when running with --workers
+SIMPLIFY_TOLERANCE = 0.001  # Degrees (~110 m at the equator) for parks.bounds
+PARCEL_AREA_FIELDS = ('GIS_AREA', 'GIS_M_AREA')  # Summed when parcels are merged into one park
+
+# Attribute columns read from the source (the cache decodes only these)
+WDPA_FIELDS = [
+    'NAME', 'WDPAID', 'DESIG', 'DESIG_ENG', 'IUCN_CAT', 'STATUS', 'STATUS_YR',
+    'GIS_AREA', 'REP_AREA', 'GIS_M_AREA', 'ISO3', 'PARENT_ISO', 'GOV_TYPE',
+    'OWN_TYPE', 'MANG_AUTH', 'VERIF', 'METADATAID', 'SUB_LOC'
+]
 
 def init_supabase() -> Client:
     """Initialize Supabase client"""
@@ -39,101 +91,415 @@ def init_supabase() -> Client:
 
     return create_client(url, key)
 
-def calculate_centroid(geometry) -> Optional[Dict[str, float]]:
-    """Calculate centroid from geometry"""
+def wdpa_id_of(props: Dict) -> Optional[int]:
+    """A feature's WDPAID as an int (fiona may return 555.0), or None if missing"""
+    value = props.get('WDPAID')
+    if value is None or value == '':
+        return None
     try:
-        geom = shape(geometry)
-        centroid = geom.centroid
-        return {
-            'lat': centroid.y,
-            'lng': centroid.x
-        }
-    except Exception as e:
-        print(f"  ⚠️  Warning: Could not calculate centroid: {e}")
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(value) if math.isfinite(value) else None
+
+def park_hash(park_data: Dict, geom) -> str:
+    """Fingerprint of a park's mapped attributes and geometry (WKB) for --refresh"""
+    digest = hashlib.sha1(json.dumps(park_data, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(shapely.to_wkb(geom))
+    return digest.hexdigest()
+
+def build_park_record(props: Dict, geom, tolerance: float = SIMPLIFY_TOLERANCE) -> Optional[Dict]:
+    """Map one WDPA feature to a parks row (None if no centroid can be computed)"""
+    # Parse geometry once - it feeds the centroid, the bounds and the source hash
+    derived = derive_geometry(geom, simplify_tolerance=tolerance, with_area=False, multi=True)
+    if not derived:
         return None
+    # Point parks have no boundary to store
+    polygonal = derived['geometry'].geom_type in ('Polygon', 'MultiPolygon')
+
+    # Map WDPA fields to parks table
+    park_data = {
+        'name': props.get('NAME', 'Unknown'),
+        'wdpa_id': wdpa_id_of(props),
+        'designation': props.get('DESIG'),
+        'designation_eng': props.get('DESIG_ENG'),
+        'iucn_category': props.get('IUCN_CAT') if props.get('IUCN_CAT') != 'Not Reported' else None,
+        'status': props.get('STATUS'),
+        'status_year': props.get('STATUS_YR'),
+        'gis_area_km2': props.get('GIS_AREA'),
+        'reported_area_km2': props.get('REP_AREA'),
+        'marine_area_km2': props.get('GIS_M_AREA'),
+        'iso3': props.get('ISO3'),
+        'parent_iso3': props.get('PARENT_ISO'),
+        'governance': props.get('GOV_TYPE'),
+        'own_type': props.get('OWN_TYPE'),
+        'management_authority': props.get('MANG_AUTH'),
+        'verif': props.get('VERIF'),
+        'metadataid': props.get('METADATAID'),
+        'sub_location': props.get('SUB_LOC'),
+        'center_lat': derived['center_lat'],
+        'center_lng': derived['center_lng'],
+        'bounds': derived['ewkb'] if polygonal else None,
+        'park_type': 'protected_area'
+    }
+
+    # Clean up None values and empty strings
+    park_data = {k: v for k, v in park_data.items() if v not in [None, '', 'Unknown']}
+    park_data['source_hash'] = park_hash(park_data, derived['geometry'])
+    return park_data
+
+def count_parcels(sources: List[str]) -> Counter:
+    """WDPAID -> number of features (parcels) across all sources, read from attributes only"""
+    counts = Counter()
+    for source in sources:
+        for _, props, _ in iter_features(source, columns=['WDPAID'], with_geometry=False):
+            wdpa_id = wdpa_id_of(props)
+            if wdpa_id is not None:
+                counts[wdpa_id] += 1
+    return counts
+
+def merge_parcels(parcels: Dict[int, List[Tuple[Dict, object]]],
+                  tolerance: float = SIMPLIFY_TOLERANCE) -> Iterator[Dict]:
+    """
+    One parks row per multi-parcel WDPAID: the union of its parcels' geometry,
+    the first parcel's attributes and the summed GIS areas. When a WDPAID has
+    polygon parcels, its point parcels (no boundary) are left out.
+    """
+    for wdpa_id, items in parcels.items():
+        if not items:  # No parcel inside the region
+            continue
+        items = [(props, geom if geom.is_valid else shapely.make_valid(geom)) for props, geom in items]
+        polygons = [(props, geom) for props, geom in items if geom.geom_type in ('Polygon', 'MultiPolygon')]
+        used = polygons or items
+        merged = shapely.union_all([geom for _, geom in used])
+
+        props = dict(used[0][0])
+        for field in PARCEL_AREA_FIELDS:
+            values = [p[field] for p, _ in used if p.get(field) is not None]
+            if values:
+                props[field] = sum(values)
+
+        park_data = build_park_record(props, merged, tolerance)
+        if park_data:
+            yield park_data
+
+def process_wdpa_features(
+    source: str,
+    total_features: int,
+    region: Optional[RegionFilter] = None,
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    parcels: Optional[Dict[int, List]] = None
+) -> Iterator[Dict]:
+    """
+    Serial path: yield parks rows in feature order (only parks inside the region,
+    if any). Features whose WDPAID is a key of `parcels` are appended there
+    instead, for merge_parcels().
+    """
+    bbox = region.bbox if region else None
+    for idx, props, geom in iter_features(source, columns=WDPA_FIELDS, bbox=bbox):
+        if (idx + 1) % 1000 == 0:
+            print(f"  ↳ Processed {idx + 1:,}/{total_features:,} features...", end='\r')
+
+        if region:
+            geom = region.match(geom)
+            if geom is None:
+                continue
+
+        wdpa_id = wdpa_id_of(props)
+        if parcels is not None and wdpa_id in parcels:
+            if geom is not None:
+                parcels[wdpa_id].append((props, parse_geometry(geom)))
+            continue
+
+        park_data = build_park_record(props, geom, tolerance)
+        if park_data:
+            yield park_data
+
+def process_feature_range(
+    task: Tuple[str, int, int, Optional[RegionFilter], float, AbstractSet]
+) -> Tuple[List[Dict], List[Tuple[int, Dict, object]]]:
+    """
+    Worker entry point: centroids, simplified bounds and attribute mapping for
+    features [start, stop) inside the region (if any). Parcels of multi-parcel
+    WDPAIDs come back parsed but unmapped, as (wdpa_id, props, geometry).
+    Runs in a separate process, so it opens its own handle and stays quiet.
+    """
+    source, start, stop, region, tolerance, multi_parcel = task
+    records, parcels = [], []
+    bbox = region.bbox if region else None
+    for _, props, geom in iter_features(source, start, stop, columns=WDPA_FIELDS, bbox=bbox):
+        if region:
+            geom = region.match(geom)
+            if geom is None:
+                continue
+        wdpa_id = wdpa_id_of(props)
+        if wdpa_id in multi_parcel:
+            if geom is not None:
+                parcels.append((wdpa_id, props, parse_geometry(geom)))
+            continue
+        park_data = build_park_record(props, geom, tolerance)
+        if park_data:
+            records.append(park_data)
+    return records, parcels
+
+def process_wdpa_features_parallel(
+    source: str,
+    pool: ProcessPoolExecutor,
+    total_features: int,
+    chunk_size: int = CHUNK_SIZE,
+    max_pending: int = 4,
+    region: Optional[RegionFilter] = None,
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    parcels: Optional[Dict[int, List]] = None
+) -> Iterator[Dict]:
+    """
+    Split the feature index into ranges and process them across a process pool.
+    Yields parks rows (and fills `parcels`) in feature order, so output matches
+    the serial path. At most max_pending chunks are in flight, which keeps
+    memory flat if the writer lags.
+    """
+    ranges = iter(range(0, total_features, chunk_size))
+    pending = deque()
+    multi_parcel = frozenset(parcels) if parcels else frozenset()
+
+    def submit_next() -> bool:
+        range_start = next(ranges, None)
+        if range_start is None:
+            return False
+        stop = min(range_start + chunk_size, total_features)
+        pending.append((stop, pool.submit(process_feature_range,
+                                          (source, range_start, stop, region, tolerance, multi_parcel))))
+        return True
+
+    while len(pending) < max_pending and submit_next():
+        pass
+
+    try:
+        while pending:
+            # Oldest chunk first keeps the merged stream in feature order
+            stop, future = pending.popleft()
+            chunk_records, chunk_parcels = future.result()
+            submit_next()
+            for wdpa_id, props, geom in chunk_parcels:
+                parcels[wdpa_id].append((props, geom))
+
+            print(f"  ↳ Processed {stop:,}/{total_features:,} features...", end='\r')
+            yield from chunk_records
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+def fetch_stored_parks(supabase: Client, page_size: int = 1000) -> Dict[int, Tuple[Optional[str], bool]]:
+    """
+    wdpa_id -> (source_hash, retired) for every WDPA-sourced parks row.
+    Raises ValueError if a wdpa_id is stored more than once - the diff (and
+    the upsert on wdpa_id) needs one row per park.
+    """
+    stored = {}
+    duplicates = set()
+    # Paged by the primary key, so rows sharing a wdpa_id are all seen
+    pages = iter_row_pages(supabase, 'parks', 'wdpa_id, source_hash, retired_at',
+                           filters=lambda q: q.not_.is_('wdpa_id', 'null'), page_size=page_size)
+    for page in pages:
+        for row in page:
+            if row['wdpa_id'] in stored:
+                duplicates.add(row['wdpa_id'])
+            stored[row['wdpa_id']] = (row['source_hash'], row['retired_at'] is not None)
+        print(f"  ↳ Loaded {len(stored):,} stored parks...", end='\r')
+    print()
+    if duplicates:
+        sample = ', '.join(str(wdpa_id) for wdpa_id in sorted(duplicates)[:10])
+        raise ValueError(f"{len(duplicates):,} wdpa_id(s) stored more than once (e.g. {sample}); "
+                         f"apply migration 20251017000003_add_parks_refresh_tracking.sql to merge them")
+    return stored
+
+def refresh_filter(records: Iterator[Dict], refresh: Dict) -> Iterator[Dict]:
+    """
+    --refresh: pass through only parks that are new, changed or coming back
+    from retirement; count the rest as unchanged. Every wdpa_id seen is
+    recorded so parks missing from the release can be retired afterwards.
+    Parcels are merged upstream and parks without a wdpa_id dropped, so each
+    wdpa_id arrives once.
+    """
+    stored, seen, stats = refresh['stored'], refresh['seen'], refresh['stats']
+
+    for park_data in records:
+        wdpa_id = park_data['wdpa_id']
+        seen.add(wdpa_id)
+
+        previous = stored.get(wdpa_id)
+        if previous is None:
+            stats['inserted'] += 1
+        elif previous[0] != park_data['source_hash'] or previous[1]:
+            stats['updated'] += 1
+        else:
+            stats['unchanged'] += 1
+            continue
+
+        park_data['retired_at'] = None
+        yield park_data
+
+def retire_missing_parks(writer, refresh: Dict) -> int:
+    """Mark active parks that are absent from the new release as retired"""
+    missing = [
+        wdpa_id for wdpa_id, (_, retired) in refresh['stored'].items()
+        if not retired and wdpa_id not in refresh['seen']
+    ]
+    if missing:
+        writer.update({'retired_at': datetime.now(timezone.utc).isoformat()}, 'wdpa_id', missing)
+    return len(missing)
+
+def resolve_source(shapefile_path: Path, use_cache: bool = True) -> str:
+    """The GeoParquet cache of a shapefile if one is built (and wanted), else the shapefile"""
+    source = cached_source(shapefile_path) if use_cache else None
+    return source or str(shapefile_path)
+
+def require_wdpa_id(records: Iterator[Dict], counts: Dict[str, int]) -> Iterator[Dict]:
+    """
+    Drop parks without a wdpa_id, adding to counts['skipped']: NULLs never
+    conflict, so every rerun would insert them again as duplicates.
+    """
+    for park_data in records:
+        if park_data.get('wdpa_id') is None:
+            counts['skipped'] += 1
+            continue
+        yield park_data
+
+def write_parks(records: Iterator[Dict], writer, counts: Dict[str, int], total: Optional[int] = None):
+    """
+    Upsert parks rows in writer-sized batches, adding to counts['written'] and
+    counts['failed_batches']. A failed batch is reported and skipped.
+    """
+    parks_batch = []
 
-def process_wdpa_shapefile(shapefile_path: Path, supabase: Client) -> int:
-    """Process a single WDPA shapefile"""
+    def flush():
+        try:
+            writer.write(parks_batch)
+            counts['written'] += len(parks_batch)
+            print(f"    ✓ Wrote {counts['written']:,}{f'/{total:,}' if total else ''} records", end='\r')
+        except Exception as e:
+            print(f"\n  ⚠️  Warning: Batch write failed: {e}")
+            counts['failed_batches'] += 1
+
+    # Single writer: batches go out in feature order whichever path parsed them
+    for park_data in records:
+        parks_batch.append(park_data)
+        if len(parks_batch) >= writer.batch_size:
+            flush()
+            parks_batch = []
+
+    if parks_batch:
+        flush()
+
+def process_wdpa_shapefile(
+    shapefile_path: Path,
+    writer,
+    use_cache: bool = True,
+    pool: Optional[ProcessPoolExecutor] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_pending: int = 4,
+    refresh: Optional[Dict] = None,
+    region: Optional[RegionFilter] = None,
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    parcels: Optional[Dict[int, List]] = None
+) -> Tuple[int, int, bool]:
+    """
+    Process a single WDPA shapefile (or its GeoParquet cache). Parcels of the
+    WDPAIDs in `parcels` are collected there for process_parcels().
+    Returns (parks written, parks skipped without WDPAID, complete) - complete
+    only if the source was read to the end and every batch was written.
+    """
     print(f"\n📦 Processing: {shapefile_path.name}")
 
-    parks_batch = []
-    total_inserted = 0
+    source = resolve_source(shapefile_path, use_cache)
+    if source != str(shapefile_path):
+        print(f"  ↳ Reading cached {Path(source).name}")
+
+    counts = {'written': 0, 'skipped': 0, 'failed_batches': 0}
+    parcels_before = sum(len(items) for items in parcels.values()) if parcels else 0
 
     try:
-        with fiona.open(shapefile_path) as src:
-            total_features = len(src)
-            print(f"  ↳ Total features: {total_features:,}")
-
-            for idx, feature in enumerate(src, 1):
-                if idx % 1000 == 0:
-                    print(f"  ↳ Processed {idx:,}/{total_features:,} features...", end='\r')
-
-                props = feature['properties']
-                geom = feature['geometry']
-
-                # Calculate centroid
-                centroid = calculate_centroid(geom)
-                if not centroid:
-                    continue
-
-                # Map WDPA fields to parks table
-                park_data = {
-                    'name': props.get('NAME', 'Unknown'),
-                    'wdpa_id': props.get('WDPAID'),
-                    'designation': props.get('DESIG'),
-                    'designation_eng': props.get('DESIG_ENG'),
-                    'iucn_category': props.get('IUCN_CAT') if props.get('IUCN_CAT') != 'Not Reported' else None,
-                    'status': props.get('STATUS'),
-                    'status_year': props.get('STATUS_YR'),
-                    'gis_area_km2': props.get('GIS_AREA'),
-                    'reported_area_km2': props.get('REP_AREA'),
-                    'marine_area_km2': props.get('GIS_M_AREA'),
-                    'iso3': props.get('ISO3'),
-                    'parent_iso3': props.get('PARENT_ISO'),
-                    'governance': props.get('GOV_TYPE'),
-                    'own_type': props.get('OWN_TYPE'),
-                    'management_authority': props.get('MANG_AUTH'),
-                    'verif': props.get('VERIF'),
-                    'metadataid': props.get('METADATAID'),
-                    'sub_location': props.get('SUB_LOC'),
-                    'center_lat': centroid['lat'],
-                    'center_lng': centroid['lng'],
-                    'park_type': 'protected_area'
-                }
-
-                # Clean up None values and empty strings
-                park_data = {k: v for k, v in park_data.items() if v not in [None, '', 'Unknown']}
-
-                parks_batch.append(park_data)
-
-                # Insert in batches
-                if len(parks_batch) >= BATCH_SIZE:
-                    try:
-                        supabase.table('parks').insert(parks_batch).execute()
-                        total_inserted += len(parks_batch)
-                        print(f"    ✓ Inserted {total_inserted:,}/{total_features:,} records", end='\r')
-                        parks_batch = []
-                    except Exception as e:
-                        print(f"\n  ⚠️  Warning: Batch insert failed: {e}")
-                        parks_batch = []
-
-            # Insert remaining records
-            if parks_batch:
-                try:
-                    supabase.table('parks').insert(parks_batch).execute()
-                    total_inserted += len(parks_batch)
-                except Exception as e:
-                    print(f"\n  ⚠️  Warning: Final batch insert failed: {e}")
-
-            print(f"\n  ✓ Completed: {total_inserted:,} parks inserted")
-            return total_inserted
+        total_features = count_features(source)
+        print(f"  ↳ Total features: {total_features:,}")
+
+        if pool:
+            print("  ↳ Processing features (parallel)...")
+            records = process_wdpa_features_parallel(source, pool, total_features, chunk_size, max_pending,
+                                                     region, tolerance, parcels)
+        else:
+            records = process_wdpa_features(source, total_features, region, tolerance, parcels)
+
+        records = require_wdpa_id(records, counts)
+        if refresh is not None:
+            records = refresh_filter(records, refresh)
+
+        write_parks(records, writer, counts, total_features)
+
+        deferred = (sum(len(items) for items in parcels.values()) if parcels else 0) - parcels_before
+        print(f"\n  ✓ Completed: {counts['written']:,} parks written")
+        if deferred:
+            print(f"  ↳ {deferred:,} parcels of multi-parcel parks set aside for merging")
+        if counts['skipped']:
+            print(f"  ↳ Skipped {counts['skipped']:,} features without WDPAID")
+        if region and refresh is None:
+            discarded = total_features - counts['written'] - counts['skipped'] - deferred
+            print(f"  ↳ Discarded {discarded:,} features outside {region.label}")
+        if counts['failed_batches']:
+            print(f"  ⚠️  {counts['failed_batches']} batch(es) failed")
+        return counts['written'], counts['skipped'], counts['failed_batches'] == 0
 
     except Exception as e:
         print(f"\n  ✗ Error processing shapefile: {e}")
-        return total_inserted
+        return counts['written'], counts['skipped'], False
+
+def process_parcels(
+    parcels: Dict[int, List],
+    writer,
+    refresh: Optional[Dict] = None,
+    tolerance: float = SIMPLIFY_TOLERANCE
+) -> Tuple[int, bool]:
+    """Write one merged row per multi-parcel WDPAID. Returns (parks written, complete)"""
+    print(f"\n🧩 Merging parcels of {sum(1 for items in parcels.values() if items):,} multi-parcel parks")
+    counts = {'written': 0, 'failed_batches': 0}
+    try:
+        records = merge_parcels(parcels, tolerance)
+        if refresh is not None:
+            records = refresh_filter(records, refresh)
+        write_parks(records, writer, counts)
+        print(f"\n  ✓ Completed: {counts['written']:,} parks written")
+        if counts['failed_batches']:
+            print(f"  ⚠️  {counts['failed_batches']} batch(es) failed")
+        return counts['written'], counts['failed_batches'] == 0
+    except Exception as e:
+        print(f"\n  ✗ Error merging parcels: {e}")
+        return counts['written'], False
 
 def main():
     """Main processing function"""
+    parser = argparse.ArgumentParser(description="Import WDPA protected-area shapefiles into Supabase")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Read the shapefiles even if a GeoParquet cache exists")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used for centroids and attribute mapping (default: 1, serial)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"Features per worker task (default: {CHUNK_SIZE})")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Diff against stored parks by wdpa_id: upsert new/changed, retire missing")
+    parser.add_argument("--simplify-tolerance", type=float, default=SIMPLIFY_TOLERANCE,
+                        help=f"Boundary simplification for parks.bounds in degrees, 0 keeps full detail "
+                             f"(default: {SIMPLIFY_TOLERANCE})")
+    add_region_arguments(parser)
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+    if args.simplify_tolerance < 0:
+        parser.error("--simplify-tolerance must be >= 0")
+
+    try:
+        region = build_region_filter(args)
+    except (OSError, ValueError) as e:
+        print(f"✗ Invalid region: {e}")
+        sys.exit(1)
+
     print("🌍 WDPA Shapefile Processing Script (Python)")
     print("=" * 60)
 
@@ -141,12 +507,15 @@ def main():
     try:
         supabase = init_supabase()
         print("✓ Connected to Supabase")
+        writer = create_writer(args.writer, 'parks', supabase=supabase, dsn=args.db_url,
+                               on_conflict='wdpa_id', batch_size=BATCH_SIZE)
+        print(f"✓ Writer: {args.writer} ({writer.batch_size} rows per batch)")
     except Exception as e:
         print(f"✗ Failed to connect to Supabase: {e}")
         sys.exit(1)
 
     # Find shapefiles
-    shapefiles = list(SHAPEFILE_DIR.glob("WDPA_*.shp"))
+    shapefiles = sorted(SHAPEFILE_DIR.glob("WDPA_*.shp"))  # Fixed order keeps merged parcels' hashes stable
 
     if not shapefiles:
         print(f"✗ No WDPA shapefiles found in {SHAPEFILE_DIR}")
@@ -166,16 +535,78 @@ def main():
         print(f"⚠️  Could not get initial count: {e}")
         initial_count = 0
 
+    # Refresh mode: load stored hashes once, shared across the polygon and point shapefiles
+    refresh = None
+    if args.refresh:
+        print("\n♻️  Refresh mode: loading stored park hashes...")
+        try:
+            stored = fetch_stored_parks(supabase)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        refresh = {
+            'stored': stored,
+            'seen': set(),
+            'stats': {'inserted': 0, 'updated': 0, 'unchanged': 0},
+        }
+
+    if region:
+        print(f"\n🗺️  Region filter: {region.label} (bbox {', '.join(f'{v:.2f}' for v in region.bbox)})")
+
     print("\nStarting processing...")
     start_time = time.time()
 
+    # WDPAIDs with several parcels are merged into one row after all shapefiles are read
+    print("\n🔎 Finding multi-parcel parks...")
+    try:
+        parcel_counts = count_parcels([resolve_source(shp, not args.no_cache) for shp in shapefiles])
+    except Exception as e:
+        print(f"✗ Could not read WDPAIDs: {e}")
+        sys.exit(1)
+    parcels = {wdpa_id: [] for wdpa_id, n in parcel_counts.items() if n > 1}
+    print(f"  ↳ {len(parcels):,} WDPAIDs span {sum(parcel_counts[w] for w in parcels):,} parcels")
+
     total_parks = 0
+    skipped = 0  # Features without a WDPAID
+    retired = 0
+    incomplete = []  # Shapefiles that were not fully read or not fully written
+
+    # Process each shapefile (one pool shared across shapefiles when parallel)
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    if pool:
+        print(f"⚙️  Using {args.workers} worker processes")
 
-    # Process each shapefile
-    for idx, shapefile in enumerate(shapefiles, 1):
-        print(f"\n[{idx}/{len(shapefiles)}]")
-        parks_added = process_wdpa_shapefile(shapefile, supabase)
-        total_parks += parks_added
+    try:
+        for idx, shapefile in enumerate(shapefiles, 1):
+            print(f"\n[{idx}/{len(shapefiles)}]")
+            parks_added, parks_skipped, complete = process_wdpa_shapefile(
+                shapefile, writer, not args.no_cache, pool, args.chunk_size, args.workers * 2, refresh, region,
+                args.simplify_tolerance, parcels)
+            total_parks += parks_added
+            skipped += parks_skipped
+            if not complete:
+                incomplete.append(shapefile.name)
+
+        if parcels:
+            parks_added, complete = process_parcels(parcels, writer, refresh, args.simplify_tolerance)
+            total_parks += parks_added
+            if not complete:
+                incomplete.append('multi-parcel parks')
+
+        # Retire only after every shapefile was read and written - a park may be
+        # in either one, and a partial seen set would retire parks still in the
+        # release. A region-filtered run never saw the parks outside it either
+        if refresh is not None and region:
+            print("\n  ↳ Region filter active - skipping retirement of missing parks")
+        elif refresh is not None and incomplete:
+            print(f"\n  ⚠️  Skipping retirement of missing parks: {', '.join(incomplete)} did not finish cleanly")
+            print("     Rerun --refresh once every shapefile imports without errors")
+        elif refresh is not None:
+            retired = retire_missing_parks(writer, refresh)
+    finally:
+        if pool:
+            pool.shutdown()
+        writer.close()
 
     elapsed_time = (time.time() - start_time) / 60
 
@@ -194,7 +625,15 @@ def main():
     print(f"   Initial parks: {initial_count:,}")
     print(f"   Final parks: {final_count:,}")
     print(f"   New parks added: {final_count - initial_count:,}")
+    if refresh is not None:
+        stats = refresh['stats']
+        print(f"   Refresh: {stats['inserted']:,} new, {stats['updated']:,} changed, "
+              f"{stats['unchanged']:,} unchanged, {retired:,} retired")
+    if skipped:
+        print(f"   Skipped: {skipped:,} features without WDPAID")
     print(f"   Shapefiles processed: {len(shapefiles)}")
+    if incomplete:
+        print(f"   Incomplete: {', '.join(incomplete)}")
     print(f"   Duration: {elapsed_time:.1f} minutes")
     print("=" * 60)
     print()
@@ -4,31 +4,39 @@ WWF Ecoregions Shapefile Processing Script
 
 Processes WWF Priority Ecoregions shapefiles and imports them into Supabase.
 
+Each geometry is parsed and reprojected to WGS84 once (geometry_derivation.py);
+centroid, radius, area and the uploaded EWKB all come from that single pass.
+
 Requirements:
-    pip install fiona shapely supabase python-dotenv
+    pip install fiona "shapely>=2" pyproj supabase python-dotenv
 
 Usage:
     python3 scripts/processWWFEcoregions.py
+    python3 scripts/processWWFEcoregions.py --writer copy   # bulk-load over a direct Postgres connection
+    python3 scripts/processWWFEcoregions.py --simplify-tolerance 0.01  # smaller geometry payload
 """
 
 import os
 import sys
+import argparse
 from pathlib import Path
-from typing import List, Dict, Optional
 import fiona
-from shapely.geometry import shape, mapping
-from shapely.ops import transform
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import time
 import json
 
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from geometry_derivation import derive_geometry
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
 SHAPEFILE_DIR = Path.home() / 'Downloads' / 'protected-regions'
 BATCH_SIZE = 100
+MAX_RADIUS_KM = 2000  # Cap on the bbox-derived radius
 
 def init_supabase() -> Client:
     """Initialize Supabase client"""
@@ -43,40 +51,7 @@ def init_supabase() -> Client:
     return create_client(url, key)
 
 
-def calculate_centroid(geometry) -> Optional[Dict[str, float]]:
-    """Calculate centroid from geometry"""
-    try:
-        geom = shape(geometry)
-        centroid = geom.centroid
-        return {
-            'lat': centroid.y,
-            'lng': centroid.x
-        }
-    except Exception as e:
-        print(f"  ⚠️ Warning: Could not calculate centroid: {e}")
-        return None
-
-
-def calculate_radius(geometry) -> float:
-    """Estimate radius in km from geometry bounds"""
-    try:
-        geom = shape(geometry)
-        bounds = geom.bounds  # (minx, miny, maxx, maxy)
-
-        # Calculate rough radius as half the diagonal of bounding box
-        lat_diff = abs(bounds[3] - bounds[1])
-        lng_diff = abs(bounds[2] - bounds[0])
-
-        # Rough conversion: 1 degree ≈ 111 km
-        radius_km = ((lat_diff ** 2 + lng_diff ** 2) ** 0.5) * 111 / 2
-
-        return min(radius_km, 2000)  # Cap at 2000km
-    except Exception as e:
-        print(f"  ⚠️ Warning: Could not calculate radius: {e}")
-        return 100  # Default 100km
-
-
-def process_wwf_shapefile(shapefile_path: Path, supabase: Client) -> int:
+def process_wwf_shapefile(shapefile_path: Path, writer, simplify_tolerance: float = 0.0) -> int:
     """Process WWF ecoregions shapefile"""
     print(f"\n📦 Processing: {shapefile_path.name}")
 
@@ -88,34 +63,31 @@ def process_wwf_shapefile(shapefile_path: Path, supabase: Client) -> int:
             total_features = len(src)
             print(f"  ↳ Total features: {total_features:,}")
 
+            # Sources may be Web Mercator; derive_geometry reprojects with a cached transformer
+            crs = src.crs.to_string() if src.crs else None
+
             for idx, feature in enumerate(src, 1):
                 if idx % 10 == 0:
                     print(f"  ↳ Processed {idx:,}/{total_features:,} features...", end='\r')
 
                 props = feature['properties']
-                geom = feature['geometry']
 
-                # Calculate centroid and radius
-                centroid = calculate_centroid(geom)
-                if not centroid:
+                # Parse once: centroid, radius, area and EWKB for PostGIS
+                derived = derive_geometry(feature['geometry'], crs, simplify_tolerance, MAX_RADIUS_KM, multi=True)
+                if not derived:
                     continue
 
-                radius_km = calculate_radius(geom)
-
-                # Convert geometry to WKT for PostGIS
-                geom_shape = shape(geom)
-                geom_wkt = geom_shape.wkt
-
                 # Map WWF fields to ecoregions table
                 ecoregion_data = {
                     'ecoregion_id': str(props.get('ECO_ID') or props.get('G200_NUM') or f'wwf_{idx}'),
                     'name': props.get('ECO_NAME') or props.get('G200_REGIO') or 'Unknown Ecoregion',
                     'biome': props.get('BIOME') or props.get('G200_BIOME'),
                     'realm': props.get('REALM') or props.get('G200_REALM'),
-                    'center_lat': centroid['lat'],
-                    'center_lng': centroid['lng'],
-                    'radius_km': int(radius_km),
-                    'geometry': f'SRID=4326;{geom_wkt}'
+                    'center_lat': derived['center_lat'],
+                    'center_lng': derived['center_lng'],
+                    'radius_km': int(derived['radius_km']),
+                    'area_km2': round(derived['area_km2'], 1),
+                    'geometry': derived['ewkb']
                 }
 
                 # Clean up None values
@@ -124,12 +96,9 @@ def process_wwf_shapefile(shapefile_path: Path, supabase: Client) -> int:
                 ecoregions_batch.append(ecoregion_data)
 
                 # Insert in batches
-                if len(ecoregions_batch) >= BATCH_SIZE:
+                if len(ecoregions_batch) >= writer.batch_size:
                     try:
-                        supabase.table('ecoregions').upsert(
-                            ecoregions_batch,
-                            on_conflict='ecoregion_id'
-                        ).execute()
+                        writer.write(ecoregions_batch)
                         total_inserted += len(ecoregions_batch)
                         print(f"    ✓ Inserted {total_inserted:,}/{total_features:,} ecoregions", end='\r')
                         ecoregions_batch = []
@@ -140,10 +109,7 @@ def process_wwf_shapefile(shapefile_path: Path, supabase: Client) -> int:
             # Insert remaining records
             if ecoregions_batch:
                 try:
-                    supabase.table('ecoregions').upsert(
-                        ecoregions_batch,
-                        on_conflict='ecoregion_id'
-                    ).execute()
+                    writer.write(ecoregions_batch)
                     total_inserted += len(ecoregions_batch)
                 except Exception as e:
                     print(f"\n  ⚠️  Warning: Final batch insert failed: {e}")
@@ -158,12 +124,23 @@ def process_wwf_shapefile(shapefile_path: Path, supabase: Client) -> int:
 
 def main():
     """Main processing function"""
+    parser = argparse.ArgumentParser(description="Import WWF ecoregion shapefiles into Supabase")
+    parser.add_argument("--simplify-tolerance", type=float, default=0.0,
+                        help="Simplify uploaded geometry by this many degrees, topology preserved (default: 0, full detail)")
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+    if args.simplify_tolerance < 0:
+        parser.error("--simplify-tolerance must be >= 0")
+
     print('🌍 WWF Ecoregions Shapefile Processing Script\n')
     print('=' * 60)
 
     # Initialize Supabase
     supabase = init_supabase()
     print('✓ Connected to Supabase')
+    writer = create_writer(args.writer, 'ecoregions', supabase=supabase, dsn=args.db_url,
+                           on_conflict='ecoregion_id', batch_size=BATCH_SIZE)
+    print(f"✓ Writer: {args.writer} ({writer.batch_size} rows per batch)")
 
     # Find shapefiles
     shapefiles = list(SHAPEFILE_DIR.glob("**/WWF*.shp"))
@@ -203,9 +180,11 @@ def main():
     # Process each shapefile
     for idx, shapefile in enumerate(shapefiles, 1):
         print(f"\n[{idx}/{len(shapefiles)}]")
-        ecoregions_added = process_wwf_shapefile(shapefile, supabase)
+        ecoregions_added = process_wwf_shapefile(shapefile, writer, args.simplify_tolerance)
         total_ecoregions += ecoregions_added
 
+    writer.close()
+
     elapsed_time = (time.time() - start_time) / 60
 
     # Get final count
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Region Filter
+
+Restricts the IUCN and WDPA importers to the area we actually serve, so
+features elsewhere are dropped before sampling, centroid work or upload.
+
+Two stages:
+    1. The reader's spatial filter (fiona bbox / GeoParquet bbox pushdown)
+       skips features whose bounding box misses the region outright.
+    2. An exact polygon intersection test against the (prepared) region
+       geometry decides the remaining candidates.
+
+Regions can be given as:
+    --region mvp            the MVP_ECOREGIONS below (WWF Priority Ecoregions)
+    --ecoregion "Borneo"    one or more WWF Priority Ecoregion names (repeatable)
+    --bbox=W,S,E,N          a lon/lat bounding box
+Several options combine into the union of their areas.
+
+Requirements:
+    pip install fiona "shapely>=2" pyproj
+
+Usage:
+    from region_filter import add_region_arguments, build_region_filter
+
+    add_region_arguments(parser)
+    region = build_region_filter(args)       # None when no filter was requested
+    geom = region.match(feature['geometry'])  # parsed geometry, or None if outside
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+import fiona
+import shapely
+from shapely.geometry import box, shape
+from shapely.geometry.base import BaseGeometry
+
+sys.path.append(os.path.dirname(__file__))
+from geometry_derivation import to_wgs84
+
+# MVP Ecoregions - diverse, iconic, high biodiversity
+MVP_ECOREGIONS = [
+    "Amazon and Guianas",          # Iconic rainforest, highest biodiversity
+    "Arctic Terrestrial",           # Climate change, polar species
+    "Congo Basin",                  # Second largest rainforest
+    "Coral Triangle",               # Marine biodiversity hotspot
+    "Madagascar",                   # Endemic species island
+    "Borneo",                       # Orangutans, deforestation focus
+]
+
+# Named region presets for --region
+REGIONS = {
+    'mvp': MVP_ECOREGIONS,
+}
+
+WWF_SHAPEFILE = Path.home() / 'Downloads' / 'protected-regions' / 'WWF_Priority_Ecoregions.shp'
+
+
+class RegionFilter:
+    """Served area in lon/lat (EPSG:4326) with a bbox for the reader's spatial filter"""
+
+    def __init__(self, geometry: BaseGeometry, label: str):
+        self.geometry = geometry
+        self.label = label
+        self.bbox = geometry.bounds  # (minx, miny, maxx, maxy)
+
+    def match(self, geometry) -> Optional[BaseGeometry]:
+        """Parsed geometry if it intersects the region, else None"""
+        if not geometry:
+            return None
+        geom = geometry if isinstance(geometry, BaseGeometry) else shape(geometry)
+
+        # Preparation does not survive pickling into worker processes, so do it lazily
+        if not shapely.is_prepared(self.geometry):
+            shapely.prepare(self.geometry)
+        return geom if self.geometry.intersects(geom) else None
+
+
+def parse_bbox(text: str) -> Tuple[float, float, float, float]:
+    """'W,S,E,N' -> (minx, miny, maxx, maxy)"""
+    try:
+        west, south, east, north = (float(v) for v in text.split(','))
+    except ValueError:
+        raise ValueError(f"--bbox expects W,S,E,N in degrees, got: {text}")
+    if west >= east or south >= north:
+        raise ValueError(f"--bbox is empty or inverted: {text}")
+    return west, south, east, north
+
+
+def load_ecoregions(names: List[str], shapefile: Path = WWF_SHAPEFILE) -> BaseGeometry:
+    """Union of the named WWF Priority Ecoregions, reprojected to lon/lat"""
+    wanted = set(names)
+    parts = []
+    found = set()
+
+    with fiona.open(str(shapefile)) as src:
+        crs = src.crs.to_string() if src.crs else None
+        for feature in src:
+            props = feature['properties']
+            name = props.get('FLAG_NAME') or props.get('simple')
+            if name not in wanted or not feature['geometry']:
+                continue
+            parts.append(to_wgs84(shape(feature['geometry']), crs))
+            found.add(name)
+
+    missing = wanted - found
+    if missing:
+        raise ValueError(f"Ecoregion(s) not found in {shapefile.name}: {', '.join(sorted(missing))}")
+
+    return shapely.make_valid(shapely.union_all(parts))
+
+
+def build_region_filter(args) -> Optional[RegionFilter]:
+    """RegionFilter for the --region/--ecoregion/--bbox options (None if none given)"""
+    names = list(args.ecoregion or [])
+    labels = list(names)
+    if args.region:
+        names.extend(REGIONS[args.region])
+        labels.append(args.region)
+
+    parts = []
+    if names:
+        parts.append(load_ecoregions(names, args.ecoregion_shapefile))
+    if args.bbox:
+        parts.append(box(*parse_bbox(args.bbox)))
+        labels.append(f"bbox {args.bbox}")
+
+    if not parts:
+        return None
+    return RegionFilter(shapely.union_all(parts), ' + '.join(labels))
+
+
+def add_region_arguments(parser):
+    """Register the --region / --ecoregion / --bbox options shared by the importers"""
+    parser.add_argument("--region", choices=sorted(REGIONS),
+                        help="Only import features inside a named set of ecoregions (mvp: the served MVP ecoregions)")
+    parser.add_argument("--ecoregion", action="append", metavar="NAME",
+                        help="Only import features inside this WWF Priority Ecoregion (repeatable)")
+    parser.add_argument("--bbox", metavar="W,S,E,N",
+                        help="Only import features intersecting this lon/lat bounding box "
+                             "(write --bbox=W,S,E,N when W is negative)")
+    parser.add_argument("--ecoregion-shapefile", type=Path, default=WWF_SHAPEFILE,
+                        help=f"WWF Priority Ecoregions shapefile (default: {WWF_SHAPEFILE})")
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Incremental Species <-> Ecoregion Relinker
+
+Keeps species_ecoregions current without ever clearing it. Each run:
+
+1. Streams every species and hashes its sample point coordinates, and every
+   ecoregion's geometry hash (ecoregions.geometry_hash, kept current by a
+   trigger whenever its geometry or center/radius is written).
+2. Compares them with species_link_state / ecoregion_link_state, the hashes
+   the current links were computed from.
+3. Recomputes links only for changed species (against every ecoregion) and
+   changed ecoregions (against every species), with the same rules as
+   link_all_species_ecoregions(): points inside the polygon for ecoregions
+   with geometry, within center + radius (default 100 km) for the rest.
+   Full geometry is downloaded only for changed ecoregions and for those
+   whose bbox contains a changed species' point.
+4. Diffs the result against the stored links of that scope and applies only
+   the inserts/updates and deletes, then records the new hashes.
+
+Deleted species and ecoregions drop out through ON DELETE CASCADE. The first
+run (empty state tables) recomputes everything, still as a diff.
+
+The diff is only meaningful against links built by the same rule, so the
+relinker refuses to run unless species_ecoregions_link_rule says the live
+links were built by RULE_HYBRID (see link_staging.py). --full rebuilds every
+link under RULE_HYBRID whatever built them, and records the rule.
+
+Requirements:
+    pip install "shapely>=2" numpy supabase python-dotenv
+
+Usage:
+    python3 scripts/relink_species_ecoregions.py                  # apply changes since the last run
+    python3 scripts/relink_species_ecoregions.py --dry-run        # report the diff only
+    python3 scripts/relink_species_ecoregions.py --full           # ignore stored hashes and the link rule, recompute (and diff) everything
+    python3 scripts/relink_species_ecoregions.py --writer copy    # upsert over a direct Postgres connection
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import shapely
+from supabase import Client
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from ecoregion_lod import fetch_ecoregion_ids, fetch_full_geometry
+from link_species_radius_based import RadiusGrid
+from species_linker import SamplePoints, init_supabase, link_points, overlap_rows, point_coordinates
+from keyset_reader import iter_rows, iter_species_pages
+from link_staging import RULE_HYBRID, RULE_MIXED, fetch_link_rule, set_link_rule
+
+# Load environment variables
+load_dotenv(override=True)
+
+# Configuration
+DEFAULT_RADIUS_KM = 100  # Same fallback as link_all_species_ecoregions()
+IN_CHUNK = 100  # Ids per ?col=in.(...) filter (keeps the URL short)
+
+LinkKey = Tuple[str, str]
+
+
+def points_hash(coords: List[Tuple[float, float]]) -> str:
+    """sha1 of a species' (lng, lat) sample point coordinates"""
+    return hashlib.sha1(json.dumps(coords, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def fetch_state(supabase: Client, table: str, key: str, hash_column: str) -> Dict[str, str]:
+    """id -> hash the current links were computed from"""
+    return {row[key]: row[hash_column]
+            for row in iter_rows(supabase, table, f'{key}, {hash_column}', key=key)}
+
+
+def load_species(supabase: Client, stored: Dict[str, str], full: bool) -> Tuple[SamplePoints, List[str], np.ndarray]:
+    """Every species' points, current hashes, and which species changed since their last link"""
+    species_ids, hashes, owner, coords = [], [], [], []
+    for page in iter_species_pages(supabase, 'id, sample_points'):
+        for row in page:
+            points = point_coordinates(row['sample_points'])
+            owner.extend([len(species_ids)] * len(points))
+            coords.extend(points)
+            species_ids.append(row['id'])
+            hashes.append(points_hash(points))
+        print(f"  ↳ Loaded {len(species_ids):,} species, {len(coords):,} points...", end='\r')
+    print()
+
+    changed = np.array([full or stored.get(species_id) != h for species_id, h in zip(species_ids, hashes)], dtype=bool)
+    xy = np.array(coords, dtype=float).reshape(-1, 2)
+    return SamplePoints(species_ids, np.array(owner, dtype=np.int64), xy[:, 0], xy[:, 1]), hashes, changed
+
+
+def fetch_ecoregions(supabase: Client) -> List[Dict]:
+    """Every ecoregion with its link-input hash, center/radius, bbox and whether it has geometry"""
+    with_geometry = {eco['id'] for eco in fetch_ecoregion_ids(supabase)}
+    columns = 'id, geometry_hash, center_lat, center_lng, radius_km, ' \
+              'bbox_min_lat, bbox_min_lng, bbox_max_lat, bbox_max_lng'
+
+    ecoregions = []
+    for row in iter_rows(supabase, 'ecoregions', columns):
+        row['has_geometry'] = row['id'] in with_geometry
+        ecoregions.append(row)
+    return ecoregions
+
+
+def bbox_hit(eco: Dict, lng: np.ndarray, lat: np.ndarray) -> bool:
+    """Whether any point falls inside the ecoregion's bbox (True when it has no bbox)"""
+    if not len(lng):
+        return False
+    if eco['bbox_min_lat'] is None:
+        return True
+    return bool(np.any((lat >= float(eco['bbox_min_lat'])) & (lat <= float(eco['bbox_max_lat'])) &
+                       (lng >= float(eco['bbox_min_lng'])) & (lng <= float(eco['bbox_max_lng']))))
+
+
+def compute_links(supabase: Client, points: SamplePoints, changed_species: np.ndarray,
+                  ecoregions: List[Dict], changed_ecos: Set[int]) -> List[Dict]:
+    """species_ecoregions rows for every (changed species × ecoregion) and (species × changed ecoregion) pair"""
+    changed_points = changed_species[points.owner]
+    cp, up = np.flatnonzero(changed_points), np.flatnonzero(~changed_points)
+    point_hits, eco_hits = [], []
+
+    def collect(point_subset: np.ndarray, eco_subset: List[int], matcher):
+        if len(point_subset) and eco_subset:
+            p, e = matcher(point_subset, eco_subset)
+            point_hits.append(point_subset[p])
+            eco_hits.append(np.asarray(eco_subset, dtype=np.int64)[e])
+
+    # Polygons: changed points against every polygon whose bbox they reach, unchanged points
+    # against changed polygons only
+    polygon_ecos = [i for i, eco in enumerate(ecoregions) if eco['has_geometry']]
+    needed = [i for i in polygon_ecos
+              if i in changed_ecos or bbox_hit(ecoregions[i], points.lng[cp], points.lat[cp])]
+    polygons = {}
+    for n, i in enumerate(needed, 1):
+        print(f"  ↳ Loaded {n}/{len(needed)} ecoregion geometries...", end='\r')
+        geom = fetch_full_geometry(supabase, ecoregions[i]['id'])
+        if geom is not None and not geom.is_empty:
+            polygons[i] = geom if geom.is_valid else shapely.make_valid(geom)
+    if needed:
+        print()
+
+    def polygon_matcher(point_subset, eco_subset):
+        return link_points(points.lng[point_subset], points.lat[point_subset], [polygons[i] for i in eco_subset])
+
+    collect(cp, [i for i in needed if i in polygons], polygon_matcher)
+    collect(up, [i for i in needed if i in polygons and i in changed_ecos], polygon_matcher)
+
+    # Center + radius for ecoregions without geometry
+    radius_ecos = [i for i, eco in enumerate(ecoregions)
+                   if not eco['has_geometry'] and eco['center_lat'] is not None and eco['center_lng'] is not None]
+
+    def radius_matcher(point_subset, eco_subset):
+        grid = RadiusGrid(np.array([float(ecoregions[i]['center_lat']) for i in eco_subset]),
+                          np.array([float(ecoregions[i]['center_lng']) for i in eco_subset]),
+                          np.array([float(ecoregions[i]['radius_km'] or DEFAULT_RADIUS_KM) for i in eco_subset]))
+        return grid.match(points.lat[point_subset], points.lng[point_subset])
+
+    collect(cp, radius_ecos, radius_matcher)
+    collect(up, [i for i in radius_ecos if i in changed_ecos], radius_matcher)
+
+    if not point_hits:
+        return []
+    return overlap_rows(points, [eco['id'] for eco in ecoregions],
+                        np.concatenate(point_hits), np.concatenate(eco_hits))
+
+
+def fetch_links(supabase: Client, species_ids: List[str], ecoregion_ids: List[str],
+                all_ecoregions: bool) -> Dict[LinkKey, Dict]:
+    """Stored links of the changed species and changed ecoregions"""
+    links = {}
+    columns = 'species_id, ecoregion_id, overlap_percentage, is_primary_habitat'
+
+    link_key = ('species_id', 'ecoregion_id')
+
+    def scan(column: str, ids: List[str], excluded: Optional[List[str]] = None):
+        # IN_CHUNK ids per scan, paged on the composite primary key
+        for i in range(0, len(ids), IN_CHUNK):
+            def filters(q, chunk=ids[i:i + IN_CHUNK]):
+                q = q.in_(column, chunk)
+                return q.not_.in_('ecoregion_id', excluded) if excluded else q
+            for row in iter_rows(supabase, 'species_ecoregions', columns, key=link_key, filters=filters):
+                links[(row['species_id'], row['ecoregion_id'])] = row
+
+    scan('ecoregion_id', ecoregion_ids)
+    if all_ecoregions:
+        return links
+
+    # Links of changed species with unchanged ecoregions
+    excluded = ecoregion_ids if ecoregion_ids and len(ecoregion_ids) <= IN_CHUNK else None
+    scan('species_id', species_ids, excluded)
+    return links
+
+
+def diff_links(desired: List[Dict], stored: Dict[LinkKey, Dict]) -> Tuple[List[Dict], List[LinkKey]]:
+    """Rows to upsert (new or changed values) and stored keys to delete"""
+    upserts = []
+    for row in desired:
+        previous = stored.get((row['species_id'], row['ecoregion_id']))
+        if previous is None or previous['overlap_percentage'] is None \
+                or float(previous['overlap_percentage']) != row['overlap_percentage'] \
+                or bool(previous['is_primary_habitat']) != row['is_primary_habitat']:
+            upserts.append(row)
+    desired_keys = {(row['species_id'], row['ecoregion_id']) for row in desired}
+    deletes = [key for key in stored if key not in desired_keys]
+    return upserts, deletes
+
+
+def delete_links(supabase: Client, keys: List[LinkKey]):
+    """Delete (species_id, ecoregion_id) links, grouped by ecoregion"""
+    by_ecoregion: Dict[str, List[str]] = {}
+    for species_id, ecoregion_id in keys:
+        by_ecoregion.setdefault(ecoregion_id, []).append(species_id)
+    for ecoregion_id, species_ids in by_ecoregion.items():
+        for i in range(0, len(species_ids), IN_CHUNK):
+            supabase.table('species_ecoregions').delete() \
+                .eq('ecoregion_id', ecoregion_id) \
+                .in_('species_id', species_ids[i:i + IN_CHUNK]) \
+                .execute()
+
+
+def write_batches(writer, rows: List[Dict], label: str):
+    for i in range(0, len(rows), writer.batch_size):
+        writer.write(rows[i:i + writer.batch_size])
+        print(f"  ↳ {label}: {min(i + writer.batch_size, len(rows)):,}/{len(rows):,}...", end='\r')
+    if rows:
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relink only species and ecoregions that changed since the last run")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore stored hashes and recompute every link (still applied as a diff)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Compute and report the diff, but write nothing")
+    add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    print('🔗 Incremental Species ↔ Ecoregion Relink\n')
+    print('=' * 60)
+
+    supabase = init_supabase()
+    start_time = time.time()
+
+    # Links built by another rule would all look stale and be deleted
+    link_rule = fetch_link_rule(supabase)
+    if link_rule != RULE_HYBRID and not args.full:
+        print(f"\n❌ species_ecoregions was built by the '{link_rule or 'unknown'}' rule, "
+              f"not '{RULE_HYBRID}'; a diff against it would delete those links as stale")
+        print('   Rerun with --full to rebuild every link under the hybrid rule')
+        sys.exit(1)
+
+    print('\n📍 Loading ecoregions')
+    ecoregions = fetch_ecoregions(supabase)
+    eco_state = fetch_state(supabase, 'ecoregion_link_state', 'ecoregion_id', 'geometry_hash')
+    changed_ecos = {i for i, eco in enumerate(ecoregions)
+                    if args.full or eco_state.get(eco['id']) != eco['geometry_hash']}
+    print(f"   ✓ {len(ecoregions)} ecoregions, {len(changed_ecos)} changed")
+
+    print('\n🦎 Loading species')
+    species_state = fetch_state(supabase, 'species_link_state', 'species_id', 'points_hash')
+    points, species_hashes, changed_species = load_species(supabase, species_state, args.full)
+    print(f"   ✓ {len(points.species_ids):,} species, {int(changed_species.sum()):,} changed")
+
+    if not changed_ecos and not changed_species.any():
+        print('\n✅ Nothing changed since the last run')
+        return
+
+    print('\n🔄 Recomputing affected links')
+    desired = compute_links(supabase, points, changed_species, ecoregions, changed_ecos)
+    changed_species_ids = [points.species_ids[i] for i in np.flatnonzero(changed_species)]
+    changed_eco_ids = [ecoregions[i]['id'] for i in sorted(changed_ecos)]
+    stored = fetch_links(supabase, changed_species_ids, changed_eco_ids, len(changed_ecos) == len(ecoregions))
+    upserts, deletes = diff_links(desired, stored)
+    print(f"   ✓ {len(desired):,} links in scope ({len(stored):,} stored): "
+          f"{len(upserts):,} to insert/update, {len(deletes):,} to delete")
+
+    if not args.dry_run:
+        print('\n💾 Applying diff')
+        writer = create_writer(args.writer, 'species_ecoregions', supabase=supabase, dsn=args.db_url,
+                               on_conflict='species_id,ecoregion_id')
+        species_writer = create_writer(args.writer, 'species_link_state', supabase=supabase, dsn=args.db_url,
+                                       on_conflict='species_id')
+        eco_writer = create_writer(args.writer, 'ecoregion_link_state', supabase=supabase, dsn=args.db_url,
+                                   on_conflict='ecoregion_id')
+        try:
+            if link_rule != RULE_HYBRID:
+                # Until the full diff is applied the links come from both rules
+                set_link_rule(supabase, RULE_MIXED)
+            write_batches(writer, upserts, 'Upserted links')
+            delete_links(supabase, deletes)
+            if link_rule != RULE_HYBRID:
+                set_link_rule(supabase, RULE_HYBRID)
+
+            # Record hashes only once the links they describe are in place
+            linked_at = datetime.now(timezone.utc).isoformat()
+            write_batches(species_writer, [
+                {'species_id': points.species_ids[i], 'points_hash': species_hashes[i], 'linked_at': linked_at}
+                for i in np.flatnonzero(changed_species)
+            ], 'Species state')
+            write_batches(eco_writer, [
+                {'ecoregion_id': ecoregions[i]['id'], 'geometry_hash': ecoregions[i]['geometry_hash'],
+                 'linked_at': linked_at}
+                for i in sorted(changed_ecos)
+            ], 'Ecoregion state')
+        finally:
+            writer.close()
+            species_writer.close()
+            eco_writer.close()
+
+    print('\n' + '=' * 60)
+    print(f"🎉 Relink complete in {time.time() - start_time:.1f}s")
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
-"""Search database for the missing parks"""
+"""Search database for the missing parks
+
+Looks names up in the prebuilt name index (scripts/name_index.py build --from-db)
+when it holds the parks table, instead of one ilike scan per search term.
+"""
 
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from dotenv import load_dotenv
 from supabase import create_client
+from name_index import open_index
 
 load_dotenv(override=True)
 url = os.getenv('VITE_SUPABASE_URL')
@@ -25,21 +31,43 @@ searches = [
     ('Yasuni National Park', ['yasuni', 'yasuní', 'parque nacional yasuni'])
 ]
 
+# Name index with the parks table in it (accent-insensitive); else query the database
+index = open_index()
+if index and not index.has_source('parks'):
+    index.close()
+    index = None
+if index:
+    print('\n📇 Using the name index (rebuild with name_index.py build --from-db after imports)')
+
+
+def find_parks(term):
+    """Up to 5 parks whose name contains term"""
+    if index:
+        return [{
+            'name': park['name'], 'wdpa_id': park['wdpa_id'],
+            'center_lat': park['lat'], 'center_lng': park['lng'],
+            'gis_area_km2': park['area_km2'], 'iso3': park['iso3'], 'designation_eng': park['designation'],
+        } for park in index.search(term, limit=5, source='parks')]
+
+    response = supabase.table('parks')\
+        .select('name, wdpa_id, center_lat, center_lng, gis_area_km2, iso3, designation_eng')\
+        .ilike('name', f'%{term}%')\
+        .limit(5)\
+        .execute()
+    return response.data
+
+
 for park_name, search_terms in searches:
     print(f'\n🔎 Searching for: {park_name}')
 
     found = False
     for term in search_terms:
-        response = supabase.table('parks')\
-            .select('name, wdpa_id, center_lat, center_lng, gis_area_km2, iso3, designation_eng')\
-            .ilike('name', f'%{term}%')\
-            .limit(5)\
-            .execute()
+        parks = find_parks(term)
 
-        if response.data and len(response.data) > 0:
+        if parks:
             found = True
-            print(f'   ✅ Found {len(response.data)} match(es) for "{term}":')
-            for park in response.data:
+            print(f'   ✅ Found {len(parks)} match(es) for "{term}":')
+            for park in parks:
                 area = park.get('gis_area_km2') or 0
                 print(f'      - {park["name"]}')
                 print(f'        WDPA ID: {park.get("wdpa_id", "N/A")}')
@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
-"""Search WDPA shapefiles for specific parks"""
+"""Search WDPA shapefiles for specific parks
 
+Answers from the prebuilt name index (scripts/name_index.py) when one exists:
+accent-insensitive, milliseconds per term, no shapefile is opened.
+
+Otherwise uses the GeoParquet cache (scripts/source_cache.py) when one exists: only the
+attribute columns are read and the name match is pushed down into the scan.
+Otherwise falls back to loading the full shapefile with geopandas.
+"""
+
+import os
 import sys
-import geopandas as gpd
 from pathlib import Path
 
+sys.path.append(os.path.dirname(__file__))
+from source_cache import cached_source, count_features, read_table
+from name_index import INDEX_PATH, open_index
+
+# Attribute columns printed for each match (geometry is never needed)
+SEARCH_COLUMNS = ['NAME', 'WDPA_PID', 'GIS_AREA', 'REP_AREA', 'ISO3', 'STATUS']
+
 shapefile_dir = Path('/home/potranquito/Downloads/protected-regions')
 print('🔍 Searching WDPA Shapefiles for Missing Parks\n')
 print('=' * 70)
@@ -32,24 +47,62 @@ shapefiles = [
     shapefile_dir / 'WDPA_Oct2025_Public_shp-points.shp'
 ]
 
+index = open_index()
+if index:
+    print(f'\n📇 Using name index {INDEX_PATH.name}')
+    for source in index.stale_sources():
+        print(f'   ⚠️  {source} changed since the index was built - rerun name_index.py build')
+
+    for region, search_terms in target_parks.items():
+        print(f'\n   🔎 Searching for {region} parks:')
+
+        for term in search_terms:
+            matches = index.search(term, limit=None)
+            if matches:
+                print(f'      ✅ Found "{term}": {len(matches)} match(es)')
+                for park in matches[:3]:
+                    area = park['area_km2'] or 0
+                    print(f'         - {park["name"]} ({park["source"]})')
+                    print(f'           WDPA_PID: {park["wdpa_pid"] or "N/A"}')
+                    print(f'           Area: {area:,.1f} km²')
+                    print(f'           Country: {park["iso3"] or "N/A"}')
+                    print(f'           Status: {park["status"] or "N/A"}')
+                if len(matches) > 3:
+                    print(f'         ... and {len(matches) - 3} more')
+            else:
+                print(f'      ❌ Not found: "{term}"')
+    index.close()
+    shapefiles = []  # Index answered every term - skip the shapefile scan
+
 for shapefile in shapefiles:
     if not shapefile.exists():
         print(f'❌ Shapefile not found: {shapefile}')
         continue
 
     print(f'\n📦 Searching: {shapefile.name}')
-    print(f'   Loading shapefile...')
 
     try:
-        gdf = gpd.read_file(shapefile)
-        print(f'   Total features: {len(gdf):,}')
+        cache = cached_source(shapefile)
+        if cache:
+            import pyarrow.compute as pc
+            print(f'   Reading cached {Path(cache).name}')
+            print(f'   Total features: {count_features(cache):,}')
+        else:
+            import geopandas as gpd
+            print(f'   Loading shapefile...')
+            gdf = gpd.read_file(shapefile)
+            print(f'   Total features: {len(gdf):,}')
 
         for region, search_terms in target_parks.items():
             print(f'\n   🔎 Searching for {region} parks:')
 
             for term in search_terms:
                 # Case-insensitive search in NAME field
-                matches = gdf[gdf['NAME'].str.lower().str.contains(term, na=False)]
+                if cache:
+                    name_filter = pc.match_substring(pc.utf8_lower(pc.field('NAME')), term)
+                    matches = read_table(cache, SEARCH_COLUMNS, name_filter).to_pandas()
+                else:
+                    matches = gdf[gdf['NAME'].str.lower().str.contains(term, na=False)]
 
                 if len(matches) > 0:
                     print(f'      ✅ Found "{term}": {len(matches)} match(es)')
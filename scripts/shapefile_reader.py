@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Shapefile Reader Helpers
+
+Opens shapefiles directly inside their .zip archives through fiona's virtual
+filesystem (GDAL /vsizip/), so the importers never extract gigabytes of scratch
+data to disk. Only the central directory of the archive is scanned to find the
+.shp member; GDAL then reads just the .shp/.shx/.dbf/.prj members it needs.
+
+Requirements:
+    pip install fiona
+
+Usage:
+    from shapefile_reader import find_zip_shapefile, open_zipped_shapefile
+
+    with open_zipped_shapefile(zip_path) as src:
+        for feature in src:
+            ...
+"""
+
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+import fiona
+
+# Sidecar members a shapefile cannot be read without
+REQUIRED_SIDECARS = ('.shx', '.dbf')
+
+
+def list_zip_shapefiles(zip_path: Path) -> List[str]:
+    """List .shp members of an archive that have their required sidecar files"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = set(zip_ref.namelist())
+
+    shapefiles = []
+    for member in sorted(members):
+        if not member.lower().endswith('.shp') or member.startswith('__MACOSX/'):
+            continue
+
+        stem = member[:-4]
+        if all(stem + ext in members or stem + ext.upper() in members for ext in REQUIRED_SIDECARS):
+            shapefiles.append(member)
+
+    return shapefiles
+
+
+def zip_member_path(zip_path: Path, member: str) -> str:
+    """Build a fiona virtual-filesystem path for a member inside a zip archive"""
+    return f"zip://{Path(zip_path).resolve()}!{member}"
+
+
+def find_zip_shapefile(zip_path: Path) -> Optional[str]:
+    """Return a fiona-openable path to the first shapefile inside an archive"""
+    shapefiles = list_zip_shapefiles(zip_path)
+    if not shapefiles:
+        return None
+    return zip_member_path(zip_path, shapefiles[0])
+
+
+@contextmanager
+def open_zipped_shapefile(zip_path: Path):
+    """Open the first shapefile inside an archive without extracting it"""
+    shp_path = find_zip_shapefile(zip_path)
+    if not shp_path:
+        raise FileNotFoundError(f"No .shp file found in {zip_path}")
+
+    with fiona.open(shp_path, 'r') as src:
+        yield src
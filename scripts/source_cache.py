@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Source Data Cache (GeoParquet)
+
+One-time conversion of the raw IUCN / WDPA / WWF shapefiles into a local
+GeoParquet cache, so later imports and diagnostics skip the shapefile parse.
+
+Each cache file is keyed by the SHA-1 of its source: the zip, or a plain .shp
+together with its .dbf/.prj/.cpg sidecars, so a new download (or an edited
+attribute table) gets a new cache entry automatically. Columns:
+
+    fid        feature index in the source shapefile (0-based, sorted)
+    <attrs>    every DBF attribute, under its original field name
+    bbox       struct<xmin, ymin, xmax, ymax> (GeoParquet 1.1 bbox covering)
+    geometry   WKB
+
+Readers use pyarrow datasets, so only the requested columns are decoded and
+filters on fid / bbox / attributes are pushed down to row-group statistics.
+
+Requirements:
+    pip install fiona "shapely>=2" pyarrow
+
+Usage:
+    python3 scripts/source_cache.py data/iucn-spatial/*.zip
+    python3 scripts/source_cache.py ~/Downloads/protected-regions/WDPA_Oct2025_Public_shp-polygons.shp
+    python3 scripts/source_cache.py --force ~/Downloads/protected-regions/WWF_Priority_Ecoregions.shp
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import fiona
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Cache is optional - tools fall back to reading shapefiles
+    pa = None
+
+sys.path.append(os.path.dirname(__file__))
+from shapefile_reader import find_zip_shapefile
+
+# Configuration
+CACHE_DIR = Path(__file__).parent.parent / 'data' / 'cache'
+HASH_INDEX = CACHE_DIR / 'hashes.json'
+ROW_GROUP_SIZE = 5000  # Features per Parquet row group (granularity of pushdown)
+SHAPEFILE_PARTS = ('.shp', '.dbf', '.prj', '.cpg')  # Files that decide a plain shapefile's contents
+
+# Fiona field type -> Arrow type
+FIELD_TYPES = {
+    'int': 'int64', 'int32': 'int64', 'int64': 'int64',
+    'float': 'float64',
+    'bool': 'bool',
+}
+
+
+def file_hash(path: Path) -> str:
+    """SHA-1 of a source file, memoized by (size, mtime) so multi-GB files hash once"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    fingerprint = f"{stat.st_size}:{int(stat.st_mtime)}"
+
+    try:
+        with open(HASH_INDEX, 'r') as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {}
+
+    entry = index.get(str(path))
+    if entry and entry['fingerprint'] == fingerprint:
+        return entry['sha1']
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+            digest.update(block)
+
+    index[str(path)] = {'fingerprint': fingerprint, 'sha1': digest.hexdigest()}
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so an interrupted or concurrent run never leaves a truncated index
+    tmp_index = HASH_INDEX.with_name(f"{HASH_INDEX.name}.{os.getpid()}.tmp")
+    with open(tmp_index, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_index, HASH_INDEX)
+
+    return digest.hexdigest()
+
+
+def source_hash(source: Path) -> str:
+    """SHA-1 of a source: the zip itself, or a .shp combined with its sidecar files"""
+    source = Path(source)
+    if source.suffix.lower() != '.shp':
+        return file_hash(source)
+
+    digest = hashlib.sha1()
+    for suffix in SHAPEFILE_PARTS:
+        for part in (source.with_suffix(suffix), source.with_suffix(suffix.upper())):
+            if part.exists():
+                digest.update(f"{suffix}:{file_hash(part)}\n".encode())
+                break
+    return digest.hexdigest()
+
+
+def cache_path(source: Path) -> Path:
+    """Cache file location for a source file"""
+    return CACHE_DIR / f"{Path(source).stem}-{source_hash(source)[:16]}.parquet"
+
+
+def cached_source(source: Path) -> Optional[str]:
+    """Path of an up-to-date cache for `source`, or None (no cache / no pyarrow)"""
+    if pa is None or not Path(source).exists():
+        return None
+    path = cache_path(source)
+    return str(path) if path.exists() else None
+
+
+def is_cache(path: str) -> bool:
+    return str(path).endswith('.parquet')
+
+
+def shapefile_path(source: Path) -> str:
+    """fiona-openable path for a .zip archive or a plain .shp"""
+    if str(source).lower().endswith('.zip'):
+        shp_path = find_zip_shapefile(source)
+        if not shp_path:
+            raise FileNotFoundError(f"No .shp file found in {source}")
+        return shp_path
+    return str(source)
+
+
+def arrow_schema(fiona_schema: Dict) -> 'pa.Schema':
+    """Arrow schema for a fiona collection's attributes plus fid/bbox/geometry"""
+    fields = [pa.field('fid', pa.int64())]
+    for name, field_type in fiona_schema['properties'].items():
+        base = field_type.split(':')[0]
+        fields.append(pa.field(name, getattr(pa, FIELD_TYPES.get(base, 'string'))()))
+    fields.append(pa.field('bbox', pa.struct([(k, pa.float64()) for k in ('xmin', 'ymin', 'xmax', 'ymax')])))
+    fields.append(pa.field('geometry', pa.binary()))
+    return pa.schema(fields)
+
+
+def geo_metadata(geometry_types: set, bounds: List[float], crs_json: Optional[Dict]) -> bytes:
+    """GeoParquet 1.1 file metadata"""
+    column = {
+        'encoding': 'WKB',
+        'geometry_types': sorted(geometry_types),
+        'bbox': bounds,
+        'covering': {'bbox': {k: ['bbox', k] for k in ('xmin', 'ymin', 'xmax', 'ymax')}},
+    }
+    if crs_json is not None:
+        column['crs'] = crs_json
+    return json.dumps({'version': '1.1.0', 'primary_column': 'geometry', 'columns': {'geometry': column}}).encode()
+
+
+def crs_projjson(src) -> Optional[Dict]:
+    """PROJJSON for the source CRS (omitted for lon/lat WGS84, the GeoParquet default)"""
+    if not src.crs_wkt or src.crs.to_epsg() == 4326:
+        return None
+    try:
+        import pyproj
+        return pyproj.CRS.from_wkt(src.crs_wkt).to_json_dict()
+    except ImportError:
+        return None
+
+
+def write_row_group(writer, schema, columns: Dict[str, list], geoms: list) -> Tuple[set, np.ndarray]:
+    """
+    Encode one buffered row group (WKB and bboxes computed vectorized) and write it.
+    Returns the geometry types seen and the row group's total bounds.
+    """
+    geometries = np.array([shape(g) if g else None for g in geoms], dtype=object)
+    bounds = shapely.bounds(geometries)
+
+    columns['bbox'] = [
+        None if geom is None else dict(zip(('xmin', 'ymin', 'xmax', 'ymax'), b))
+        for geom, b in zip(geometries, bounds.tolist())
+    ]
+    columns['geometry'] = shapely.to_wkb(geometries).tolist()
+    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    present = geometries[~shapely.is_missing(geometries) & ~shapely.is_empty(geometries)]
+    geometry_types = {geom.geom_type for geom in present}
+    if not len(present):
+        return geometry_types, np.full(4, np.nan)
+    return geometry_types, np.concatenate([
+        np.nanmin(bounds[:, :2], axis=0), np.nanmax(bounds[:, 2:], axis=0)
+    ])
+
+
+def build_cache(source: Path, force: bool = False) -> Path:
+    """Convert one shapefile (or zipped shapefile) into its GeoParquet cache file"""
+    if pa is None:
+        raise RuntimeError('The source cache needs pyarrow: pip install pyarrow')
+
+    source = Path(source)
+    target = cache_path(source)
+    if target.exists() and not force:
+        print(f"  ✓ Cache is current: {target.name}")
+        return target
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_target = target.with_suffix('.parquet.tmp')
+
+    with fiona.open(shapefile_path(source), 'r') as src:
+        total_features = len(src)
+        schema = arrow_schema(src.schema)
+        prop_names = list(src.schema['properties'])
+        print(f"  ↳ Converting {total_features:,} features from {source.name}...")
+
+        geometry_types = set()
+        total_bounds = [float('inf'), float('inf'), float('-inf'), float('-inf')]
+
+        writer = pq.ParquetWriter(tmp_target, schema, compression='zstd')
+        try:
+            columns = {name: [] for name in ['fid'] + prop_names}
+            geoms = []
+
+            for idx, feature in enumerate(src):
+                props = feature['properties']
+                columns['fid'].append(idx)
+                for name in prop_names:
+                    columns[name].append(props.get(name))
+                geoms.append(feature['geometry'])
+
+                if len(geoms) >= ROW_GROUP_SIZE or idx == total_features - 1:
+                    types, bounds = write_row_group(writer, schema, columns, geoms)
+                    geometry_types |= types
+                    if not np.isnan(bounds).any():
+                        total_bounds = [min(total_bounds[0], bounds[0]), min(total_bounds[1], bounds[1]),
+                                        max(total_bounds[2], bounds[2]), max(total_bounds[3], bounds[3])]
+                    columns = {name: [] for name in ['fid'] + prop_names}
+                    geoms = []
+                    print(f"  ↳ Converted {idx + 1:,}/{total_features:,} features...", end='\r')
+
+            writer.add_key_value_metadata({'geo': geo_metadata(geometry_types, total_bounds, crs_projjson(src))})
+        finally:
+            writer.close()
+
+    os.replace(tmp_target, target)
+    print(f"\n  ✓ Wrote {target.name} ({target.stat().st_size / 1e6:,.1f} MB)")
+    return target
+
+
+def count_features(path: str) -> int:
+    """Feature count of a cache file or a fiona-openable shapefile path"""
+    if is_cache(path):
+        return pq.ParquetFile(path).metadata.num_rows
+    with fiona.open(path, 'r') as src:
+        return len(src)
+
+
+def source_fields(path: str) -> List[str]:
+    """Attribute field names of a cache file or a fiona-openable shapefile path"""
+    if is_cache(path):
+        return [name for name in pq.read_schema(path).names if name not in ('fid', 'bbox', 'geometry')]
+    with fiona.open(path, 'r') as src:
+        return list(src.schema['properties'])
+
+
+def source_crs(path: str) -> Optional[str]:
+    """CRS of a cache file or a fiona-openable shapefile path (None for lon/lat WGS84 or unknown)"""
+    if is_cache(path):
+        geo = pq.read_schema(path).metadata.get(b'geo')
+        crs_json = json.loads(geo)['columns']['geometry'].get('crs') if geo else None
+        if crs_json is None:
+            return None
+        import pyproj
+        return pyproj.CRS.from_json_dict(crs_json).to_string()
+    with fiona.open(path, 'r') as src:
+        return src.crs.to_string() if src.crs else None
+
+
+def read_table(path: str, columns: Optional[List[str]] = None, filter=None) -> 'pa.Table':
+    """Read a cache file with column projection and a pushed-down filter expression"""
+    return ds.dataset(path, format='parquet').to_table(columns=columns, filter=filter)
+
+
+def iter_features(
+    path: str,
+    start: int = 0,
+    stop: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    with_geometry: bool = True,
+    filter=None,
+    bbox: Optional[Tuple[float, float, float, float]] = None
+) -> Iterator[Tuple[int, Dict, object]]:
+    """
+    Yield (feature_index, properties, geometry) for features [start, stop).
+    With `bbox` (minx, miny, maxx, maxy), only features whose bounding box
+    intersects it are read (fiona spatial filter / bbox column pushdown).
+
+    Reads a cache file when `path` is one (geometry is a shapely geometry, only
+    `columns` are decoded, `filter` is pushed down), otherwise falls back to
+    fiona (geometry is a GeoJSON-like dict; only `columns` are read from the DBF,
+    and with_geometry=False skips the .shp entirely).
+    """
+    if not is_cache(path):
+        with fiona.open(path, 'r', include_fields=columns, ignore_geometry=not with_geometry) as src:
+            if bbox is None:
+                items = src.items(start, stop)
+            else:
+                # With a spatial filter, fiona's start/stop count filtered features,
+                # so the index range goes into an attribute filter on FID instead
+                where = f"FID >= {start}" + (f" AND FID < {stop}" if stop is not None else '')
+                items = src.items(bbox=bbox, where=where)
+            for idx, feature in items:
+                yield idx, dict(feature['properties']), feature['geometry'] if with_geometry else None
+        return
+
+    dataset = ds.dataset(path, format='parquet')
+    prop_names = columns if columns is not None else [
+        name for name in dataset.schema.names if name not in ('fid', 'bbox', 'geometry')
+    ]
+
+    expression = ds.field('fid') >= start
+    if stop is not None:
+        expression = expression & (ds.field('fid') < stop)
+    if filter is not None:
+        expression = expression & filter
+    if bbox is not None:
+        minx, miny, maxx, maxy = bbox
+        expression = expression & (ds.field('bbox', 'xmax') >= minx) & (ds.field('bbox', 'xmin') <= maxx) \
+            & (ds.field('bbox', 'ymax') >= miny) & (ds.field('bbox', 'ymin') <= maxy)
+
+    scan_columns = ['fid'] + prop_names + (['geometry'] if with_geometry else [])
+    scanner = dataset.scanner(columns=scan_columns, filter=expression, use_threads=False)
+
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        fids = batch.column('fid').to_pylist()
+        props = batch.select(prop_names).to_pylist()
+        if with_geometry:
+            geometries = shapely.from_wkb(batch.column('geometry').to_numpy(zero_copy_only=False))
+        else:
+            geometries = [None] * batch.num_rows
+        yield from zip(fids, props, geometries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert source shapefiles into the local GeoParquet cache")
+    parser.add_argument("sources", nargs='+', type=Path, help="Shapefile (.shp) or zipped shapefile (.zip) paths")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if a current cache exists")
+    args = parser.parse_args()
+
+    print('🗄️  Source Data Cache Builder\n')
+    print('=' * 60)
+
+    for i, source in enumerate(args.sources, 1):
+        print(f"\n[{i}/{len(args.sources)}] 📦 {source.name}")
+        if not source.exists():
+            print(f"  ✗ Not found: {source}")
+            continue
+        try:
+            build_cache(source, force=args.force)
+        except Exception as e:
+            print(f"  ✗ Error building cache: {e}")
+
+    print('\n' + '=' * 60)
+    print(f"Cache directory: {CACHE_DIR}")
+
+
+if __name__ == '__main__':
+    main()
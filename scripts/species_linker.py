@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Species-to-Ecoregion Linker (vectorized)
+
+Links every species to every ecoregion polygon its sample points fall in, and
+records the share of points inside (species_ecoregions.overlap_percentage,
+as match_species_to_ecoregion_by_points computes it in SQL).
+
+Instead of one shapely Point and one polygon.contains call per
+(point, ecoregion) pair, all sample points are loaded into NumPy arrays once
+and matched in chunks against an STRtree over the ecoregion polygons: one
+bulk `query(points)` per chunk yields bounding-box candidates, then one
+vectorized `contains_xy` per candidate polygon (prepared once per process)
+keeps the real hits. Chunks run across a process pool with --workers;
+per-(species, ecoregion) counts are then a single np.unique over the hits.
+
+Points on a polygon boundary do not match (ST_Contains semantics). Ecoregions
+without geometry are left to the radius-based linker.
+
+Requirements:
+    pip install "shapely>=2" numpy supabase python-dotenv
+
+Usage:
+    python3 scripts/species_linker.py                  # relink polygon ecoregions (staged, then swapped in)
+    python3 scripts/species_linker.py --workers 8      # match chunks in parallel
+    python3 scripts/species_linker.py --dry-run        # match and report only
+    python3 scripts/species_linker.py --writer copy    # bulk-load over a direct Postgres connection
+
+    from species_linker import link_points
+    point_idx, eco_idx = link_points(lng, lat, polygons)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(__file__))
+from db_writers import create_writer, add_writer_arguments
+from geometry_derivation import parse_geography
+from link_staging import RULE_POLYGON, STAGING_TABLE, add_staging_arguments, prepare_staging, swap_staging
+from keyset_reader import iter_rows, iter_species_pages
+
+# Load environment variables
+load_dotenv(override=True)
+
+# Configuration
+PAGE_SIZE = 1000  # Species per PostgREST page
+CHUNK_POINTS = 200_000  # Sample points per matching task
+PRIMARY_HABITAT_PERCENT = 50.0  # Same threshold as populate_all_species_ecoregion_links()
+TIERS = ['geometry', 'geometry_1km']
+
+
+def init_supabase() -> Client:
+    """Initialize Supabase client"""
+    url = os.getenv('VITE_SUPABASE_URL')
+    key = os.getenv('VITE_SUPABASE_SERVICE_KEY')
+    if not url or not key:
+        print('❌ Missing Supabase credentials')
+        sys.exit(1)
+    return create_client(url, key)
+
+
+class SamplePoints:
+    """All sample points as flat arrays; owner[i] is the index into species_ids of point i"""
+
+    def __init__(self, species_ids: List[str], owner: np.ndarray, lng: np.ndarray, lat: np.ndarray):
+        self.species_ids = species_ids
+        self.owner = owner
+        self.lng = lng
+        self.lat = lat
+        self.totals = np.bincount(owner, minlength=len(species_ids))
+
+    def __len__(self) -> int:
+        return len(self.lng)
+
+
+def point_coordinates(sample_points) -> List[Tuple[float, float]]:
+    """(lng, lat) pairs of a species' sample_points JSON (list, or a JSON string)"""
+    if isinstance(sample_points, str):
+        try:
+            sample_points = json.loads(sample_points)
+        except ValueError:
+            return []
+    if not isinstance(sample_points, list):
+        return []
+    return [(p['lng'], p['lat']) for p in sample_points
+            if isinstance(p, dict) and p.get('lat') is not None and p.get('lng') is not None]
+
+
+def load_sample_points(supabase: Client, page_size: int = PAGE_SIZE) -> SamplePoints:
+    """Every species' sample points, streamed from the species table"""
+    species_ids, owner, coords = [], [], []
+    pages = iter_species_pages(supabase, 'id, sample_points', page_size=page_size,
+                               filters=lambda q: q.not_.is_('sample_points', 'null'))
+    for page in pages:
+        for row in page:
+            points = point_coordinates(row['sample_points'])
+            if not points:
+                continue
+            owner.extend([len(species_ids)] * len(points))
+            coords.extend(points)
+            species_ids.append(row['id'])
+        print(f"  ↳ Loaded {len(species_ids):,} species, {len(coords):,} points...", end='\r')
+    print()
+
+    xy = np.array(coords, dtype=float).reshape(-1, 2)
+    return SamplePoints(species_ids, np.array(owner, dtype=np.int64), xy[:, 0], xy[:, 1])
+
+
+def load_ecoregion_polygons(supabase: Client, tier: str = 'geometry') -> Tuple[List[Dict], List[BaseGeometry]]:
+    """Ecoregions with geometry (repaired if invalid), fetched one ecoregion at a time"""
+    rows = list(iter_rows(supabase, 'ecoregions', 'id, name', filters=lambda q: q.not_.is_(tier, 'null'),
+                          page_size=PAGE_SIZE))
+
+    ecoregions, polygons = [], []
+    for i, eco in enumerate(rows, 1):
+        print(f"  ↳ Loaded {i}/{len(rows)} ecoregion geometries...", end='\r')
+        response = supabase.table('ecoregions').select(tier).eq('id', eco['id']).execute()
+        geom = parse_geography(response.data[0][tier]) if response.data else None
+        if geom is None or geom.is_empty:
+            continue
+        ecoregions.append(eco)
+        polygons.append(geom if geom.is_valid else shapely.make_valid(geom))
+    print()
+    return ecoregions, polygons
+
+
+def link_points(lng: np.ndarray, lat: np.ndarray, polygons: List[BaseGeometry],
+                tree: Optional[shapely.STRtree] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(point index, polygon index) of every point strictly inside a polygon"""
+    tree = tree if tree is not None else shapely.STRtree(polygons)
+    # Bounding-box candidates from the tree, then one vectorized contains_xy per
+    # candidate polygon (prepared on first use, and kept prepared)
+    point_idx, eco_idx = tree.query(shapely.points(lng, lat))
+    order = np.argsort(eco_idx, kind='stable')
+    point_idx, eco_idx = point_idx[order], eco_idx[order]
+    hits = np.zeros(len(point_idx), dtype=bool)
+    bounds = np.flatnonzero(np.diff(eco_idx)) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(eco_idx)]):
+        if start == end:
+            continue
+        polygon = polygons[eco_idx[start]]
+        shapely.prepare(polygon)
+        candidates = point_idx[start:end]
+        hits[start:end] = shapely.contains_xy(polygon, lng[candidates], lat[candidates])
+    return point_idx[hits], eco_idx[hits]
+
+
+_polygons: List[BaseGeometry] = []
+_tree: Optional[shapely.STRtree] = None
+
+
+def init_worker(polygons: List[BaseGeometry]):
+    """Worker initializer: build the STRtree once per process"""
+    global _polygons, _tree
+    _polygons = polygons
+    _tree = shapely.STRtree(polygons)
+
+
+def link_chunk(task: Tuple[int, np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Worker entry point: hits of one chunk of points, as global point indices"""
+    start, lng, lat = task
+    point_idx, eco_idx = link_points(lng, lat, _polygons, _tree)
+    return point_idx + start, eco_idx
+
+
+def match_all(points: SamplePoints, polygons: List[BaseGeometry], workers: int = 1,
+              chunk_size: int = CHUNK_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """All (point, ecoregion) hits, chunked, optionally across a process pool"""
+    tasks = ((start, points.lng[start:start + chunk_size], points.lat[start:start + chunk_size])
+             for start in range(0, len(points), chunk_size))
+
+    init_worker(polygons)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(polygons,)) as pool:
+            results = list(pool.map(link_chunk, tasks))
+    else:
+        results = [link_chunk(task) for task in tasks]
+
+    if not results:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def overlap_rows(points: SamplePoints, ecoregion_ids: List[str],
+                 point_idx: np.ndarray, eco_idx: np.ndarray) -> List[Dict]:
+    """species_ecoregions rows: matched/total points per (species, ecoregion) as a percentage"""
+    if not len(point_idx):
+        return []
+    n_eco = len(ecoregion_ids)
+    pair_keys, matched = np.unique(points.owner[point_idx] * n_eco + eco_idx, return_counts=True)
+    species_idx, eco = np.divmod(pair_keys, n_eco)
+    percentages = np.round(matched / points.totals[species_idx] * 100, 2)
+
+    return [{
+        'species_id': points.species_ids[s],
+        'ecoregion_id': ecoregion_ids[e],
+        'overlap_percentage': float(pct),
+        'is_primary_habitat': bool(pct > PRIMARY_HABITAT_PERCENT),
+    } for s, e, pct in zip(species_idx.tolist(), eco.tolist(), percentages)]
+
+
+def replace_links(writer, kept: int, rows: List[Dict]):
+    """Stage the new links of the linked ecoregions next to the kept links of every other ecoregion"""
+    print(f"  ↳ Kept {kept:,} links of other ecoregions")
+    for i in range(0, len(rows), writer.batch_size):
+        writer.write(rows[i:i + writer.batch_size])
+        print(f"  ↳ Staged {min(i + writer.batch_size, len(rows)):,}/{len(rows):,} links...", end='\r')
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link species to ecoregion polygons by their sample points")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to match point chunks (default: 1, serial)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_POINTS,
+                        help=f"Sample points per matching task (default: {CHUNK_POINTS:,})")
+    parser.add_argument("--tier", choices=TIERS, default='geometry',
+                        help="Ecoregion geometry column to match against (default: geometry, full resolution)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Match and report, but leave species_ecoregions untouched")
+    add_writer_arguments(parser)
+    add_staging_arguments(parser)
+    args = parser.parse_args()
+
+    print('🔗 Linking Species to Ecoregions (vectorized)\n')
+    print('=' * 60)
+
+    supabase = init_supabase()
+    start_time = time.time()
+
+    print(f"\n📍 Loading ecoregions ({args.tier})")
+    ecoregions, polygons = load_ecoregion_polygons(supabase, args.tier)
+    print(f"   ✓ {len(ecoregions)} ecoregions with geometry")
+    if not ecoregions:
+        print('\n❌ No ecoregion geometry to link against')
+        sys.exit(1)
+
+    print('\n🦎 Loading sample points')
+    points = load_sample_points(supabase)
+    print(f"   ✓ {len(points.species_ids):,} species, {len(points):,} points")
+
+    print(f"\n🔄 Matching{f' with {args.workers} workers' if args.workers > 1 else ''}")
+    match_start = time.time()
+    point_idx, eco_idx = match_all(points, polygons, args.workers, args.chunk_size)
+    match_time = time.time() - match_start
+    ecoregion_ids = [eco['id'] for eco in ecoregions]
+    rows = overlap_rows(points, ecoregion_ids, point_idx, eco_idx)
+    rate = len(points) / match_time if match_time > 0 else 0
+    print(f"   ✓ {len(point_idx):,} point hits → {len(rows):,} links in {match_time:.1f}s ({rate:,.0f} points/s)")
+
+    if not args.dry_run:
+        print('\n💾 Replacing links')
+        # The staging table must exist before the writer (COPY reads its columns)
+        kept = prepare_staging(supabase, keep_except=ecoregion_ids)
+        writer = create_writer(args.writer, STAGING_TABLE, supabase=supabase, dsn=args.db_url)
+        try:
+            replace_links(writer, kept, rows)
+        finally:
+            writer.close()
+        try:
+            # Only full-resolution polygons agree with the other linkers' polygon links
+            swap_staging(supabase, args.min_live_links, args.max_drop,
+                         rule=RULE_POLYGON if args.tier == 'geometry' else None, partial=True)
+        except RuntimeError as e:
+            print(f"\n❌ {e}")
+            sys.exit(1)
+
+    print('\n📊 Species per Ecoregion:\n')
+    per_ecoregion = Counter(row['ecoregion_id'] for row in rows)
+    for eco in sorted(ecoregions, key=lambda e: -per_ecoregion[e['id']]):
+        print(f"   {eco['name']}: {per_ecoregion[eco['id']]:,} species")
+
+    print('\n' + '=' * 60)
+    print(f"🎉 Linking complete in {time.time() - start_time:.1f}s")
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Synthetic Shapefile Generator
+
+Writes IUCN-, WDPA- and WWF-shaped shapefiles with the same attribute schemas
+the importers read, so the pipeline can be run and benchmarked without the
+real downloads (13 GB of IUCN ranges, the WDPA release, WWF Global 200).
+
+Geometries are noisy circular blobs; feature counts and vertices per ring are
+configurable, so the same generator covers quick smoke tests and sizing runs.
+
+Output layout (mirrors the real download locations):
+    <out>/iucn-spatial/MAMMALS.zip                              (MAMMALS/MAMMALS.shp inside)
+    <out>/protected-regions/WDPA_Synthetic_shp-polygons.shp
+    <out>/protected-regions/WWF_Priority_Ecoregions.shp
+
+Requirements:
+    pip install fiona "shapely>=2" numpy
+
+Usage:
+    python3 scripts/synthetic_shapefiles.py --out /tmp/synthetic
+    python3 scripts/synthetic_shapefiles.py --out /tmp/synthetic --iucn-features 50000 --vertices 1000
+"""
+
+import os
+import shutil
+import zipfile
+import argparse
+from pathlib import Path
+from typing import Dict
+import fiona
+import numpy as np
+from shapely.geometry import Polygon, MultiPolygon, mapping
+
+# Attribute schemas (only the fields the importers read, plus a few they print)
+IUCN_SCHEMA = {
+    'geometry': 'MultiPolygon',
+    'properties': {
+        'id_no': 'int', 'sci_name': 'str:80', 'category': 'str:2',
+        'kingdom': 'str:20', 'phylum': 'str:20', 'class': 'str:20', 'order_': 'str:40',
+        'family': 'str:40', 'genus': 'str:40',
+        'marine': 'str:5', 'terrestria': 'str:5', 'freshwater': 'str:5',
+        'subspecies': 'str:40', 'subpop': 'str:40', 'presence': 'int', 'seasonal': 'int',
+        'source': 'str:80', 'dist_comm': 'str:254', 'citation': 'str:254',
+        'compiler': 'str:80', 'yrcompiled': 'int',
+    }
+}
+
+WDPA_SCHEMA = {
+    'geometry': 'MultiPolygon',
+    'properties': {
+        'WDPAID': 'int', 'WDPA_PID': 'str:52', 'NAME': 'str:254', 'DESIG': 'str:254',
+        'DESIG_ENG': 'str:254', 'IUCN_CAT': 'str:20', 'STATUS': 'str:100', 'STATUS_YR': 'int',
+        'GIS_AREA': 'float', 'REP_AREA': 'float', 'GIS_M_AREA': 'float',
+        'ISO3': 'str:50', 'PARENT_ISO': 'str:50', 'GOV_TYPE': 'str:254', 'OWN_TYPE': 'str:254',
+        'MANG_AUTH': 'str:254', 'VERIF': 'str:20', 'METADATAID': 'int', 'SUB_LOC': 'str:100',
+    }
+}
+
+WWF_SCHEMA = {
+    'geometry': 'MultiPolygon',
+    'properties': {
+        'ECO_ID': 'int', 'ECO_NAME': 'str:100', 'BIOME': 'int', 'REALM': 'str:4',
+        'G200_REGIO': 'str:100',
+    }
+}
+
+CATEGORIES = ['LC', 'NT', 'VU', 'EN', 'CR', 'DD']
+IUCN_CATS = ['Ia', 'Ib', 'II', 'III', 'IV', 'V', 'VI', 'Not Reported']
+REALMS = ['AA', 'AN', 'AT', 'IM', 'NA', 'NT', 'OC', 'PA']
+COUNTRIES = ['BRA', 'PER', 'ECU', 'USA', 'CAN', 'IDN', 'MYS', 'KEN', 'TZA', 'AUS']
+
+
+def random_blob(rng: np.random.Generator, lng: float, lat: float, radius: float, vertices: int) -> Polygon:
+    """Noisy circle of `vertices` points around (lng, lat), radius in degrees"""
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radii = radius * (0.7 + 0.6 * rng.random(vertices))
+    lngs = lng + radii * np.cos(angles)
+    lats = np.clip(lat + radii * np.sin(angles), -89.9, 89.9)
+    return Polygon(np.column_stack([lngs, lats]))
+
+
+def random_range(rng: np.random.Generator, vertices: int, max_parts: int, radius: tuple) -> MultiPolygon:
+    """1..max_parts nearby blobs; ring sizes vary around the requested vertex count"""
+    lng, lat = rng.uniform(-170, 170), rng.uniform(-75, 75)
+    parts = []
+    for k in range(rng.integers(1, max_parts + 1)):
+        n = max(4, int(vertices * rng.uniform(0.5, 1.5)))
+        r = rng.uniform(*radius)
+        parts.append(random_blob(rng, lng + k * 2.5 * r, lat + rng.uniform(-r, r), r, n))
+    return MultiPolygon(parts)
+
+
+def write_shapefile(path: Path, schema: Dict, features) -> int:
+    """Write (properties, geometry) pairs to a new shapefile"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with fiona.open(path, 'w', driver='ESRI Shapefile', schema=schema, crs='EPSG:4326') as dst:
+        for props, geom in features:
+            dst.write({'geometry': mapping(geom), 'properties': props})
+            count += 1
+    return count
+
+
+def write_iucn_archive(out_dir: Path, features: int, vertices: int, seed: int = 0) -> Path:
+    """IUCN-style zip: ~3 polygons per species, presence/seasonal variants, subspecies now and then"""
+    rng = np.random.default_rng(seed)
+
+    def generate():
+        for i in range(features):
+            species = i // 3
+            props = {
+                'id_no': 100000 + species,
+                'sci_name': f'Synthetica species{species}',
+                'category': CATEGORIES[rng.integers(len(CATEGORIES))],
+                'kingdom': 'ANIMALIA', 'phylum': 'CHORDATA', 'class': 'MAMMALIA',
+                'order_': 'SYNTHETICA', 'family': f'Family{species % 50}', 'genus': 'Synthetica',
+                'marine': 'false', 'terrestria': 'true', 'freshwater': str(species % 7 == 0).lower(),
+                'subspecies': f'sub{species % 3}' if species % 11 == 0 else None,
+                'subpop': None,
+                'presence': 1, 'seasonal': 1 + i % 2,
+                'source': 'Synthetic', 'dist_comm': None,
+                'citation': 'Synthetic data', 'compiler': 'synthetic_shapefiles.py', 'yrcompiled': 2025,
+            }
+            yield props, random_range(rng, vertices, 3, (0.5, 5.0))
+
+    staging = out_dir / 'iucn-spatial' / '_MAMMALS'
+    write_shapefile(staging / 'MAMMALS.shp', IUCN_SCHEMA, generate())
+
+    zip_path = out_dir / 'iucn-spatial' / 'MAMMALS.zip'
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for member in sorted(staging.iterdir()):
+            archive.write(member, f'MAMMALS/{member.name}')
+    shutil.rmtree(staging)
+    return zip_path
+
+
+def write_wdpa_shapefile(out_dir: Path, features: int, vertices: int, seed: int = 0) -> Path:
+    """WDPA-style polygons: many small parks"""
+    rng = np.random.default_rng(seed + 1)
+
+    def generate():
+        for i in range(features):
+            geom = random_range(rng, vertices, 2, (0.02, 0.8))
+            area = geom.area * 111 * 111
+            yield {
+                'WDPAID': 1000 + i, 'WDPA_PID': str(1000 + i),
+                'NAME': f'Synthetic Park {i}', 'DESIG': 'Parque Nacional', 'DESIG_ENG': 'National Park',
+                'IUCN_CAT': IUCN_CATS[rng.integers(len(IUCN_CATS))], 'STATUS': 'Designated',
+                'STATUS_YR': int(rng.integers(1950, 2025)),
+                'GIS_AREA': area, 'REP_AREA': area, 'GIS_M_AREA': 0.0,
+                'ISO3': COUNTRIES[i % len(COUNTRIES)], 'PARENT_ISO': COUNTRIES[i % len(COUNTRIES)],
+                'GOV_TYPE': 'Federal or national ministry or agency', 'OWN_TYPE': 'State',
+                'MANG_AUTH': 'Synthetic Parks Service', 'VERIF': 'State Verified',
+                'METADATAID': 1, 'SUB_LOC': 'Not Reported',
+            }, geom
+
+    path = out_dir / 'protected-regions' / 'WDPA_Synthetic_shp-polygons.shp'
+    write_shapefile(path, WDPA_SCHEMA, generate())
+    return path
+
+
+def write_wwf_shapefile(out_dir: Path, features: int, vertices: int, seed: int = 0) -> Path:
+    """WWF-style ecoregions: few, large, detailed polygons"""
+    rng = np.random.default_rng(seed + 2)
+
+    def generate():
+        for i in range(features):
+            yield {
+                'ECO_ID': 10000 + i, 'ECO_NAME': f'Synthetic Ecoregion {i}',
+                'BIOME': int(1 + i % 14), 'REALM': REALMS[i % len(REALMS)],
+                'G200_REGIO': f'Synthetic Region {i // 3}',
+            }, random_range(rng, vertices * 10, 4, (3.0, 12.0))
+
+    path = out_dir / 'protected-regions' / 'WWF_Priority_Ecoregions.shp'
+    write_shapefile(path, WWF_SCHEMA, generate())
+    return path
+
+
+def generate_all(out_dir: Path, iucn_features: int, wdpa_features: int, wwf_features: int,
+                 vertices: int, seed: int = 0) -> Dict[str, Path]:
+    """Write all three synthetic sources; returns their paths by source name"""
+    return {
+        'iucn': write_iucn_archive(out_dir, iucn_features, vertices, seed),
+        'wdpa': write_wdpa_shapefile(out_dir, wdpa_features, vertices, seed),
+        'wwf': write_wwf_shapefile(out_dir, wwf_features, vertices, seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic IUCN/WDPA/WWF shapefiles")
+    parser.add_argument("--out", type=Path, required=True, help="Output directory")
+    parser.add_argument("--iucn-features", type=int, default=3000, help="IUCN range polygons (default: 3000)")
+    parser.add_argument("--wdpa-features", type=int, default=5000, help="WDPA parks (default: 5000)")
+    parser.add_argument("--wwf-features", type=int, default=200, help="WWF ecoregions (default: 200)")
+    parser.add_argument("--vertices", type=int, default=200,
+                        help="Mean vertices per ring (WWF rings get 10x) (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    print('🧪 Synthetic Shapefile Generator\n')
+    print('=' * 60)
+
+    paths = generate_all(args.out, args.iucn_features, args.wdpa_features, args.wwf_features,
+                         args.vertices, args.seed)
+
+    for name, path in paths.items():
+        print(f"  ✓ {name.upper():5} {path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
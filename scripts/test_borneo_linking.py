@@ -5,10 +5,14 @@ Debug why the full linking script found 0 species
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 from supabase import create_client
 import math
 
+sys.path.append(os.path.dirname(__file__))
+from keyset_reader import iter_species_pages
+
 load_dotenv(override=True)
 
 url = os.getenv('VITE_SUPABASE_URL')
@@ -113,34 +117,33 @@ for name in test_species_names:
 
 # Now run the linking logic on a small batch
 print('\n' + '=' * 70)
-print('Running linking logic on first 1000 species with sample points:\n')
-
-species_batch = supabase.table('species')\
-    .select('id, scientific_name, sample_points')\
-    .not_.is_('sample_points', 'null')\
-    .range(0, 999)\
-    .execute()
+print('Running linking logic on every species with sample points:\n')
 
-print(f'Fetched {len(species_batch.data)} species')
+species_pages = iter_species_pages(supabase, 'id, scientific_name, sample_points',
+                                   filters=lambda q: q.not_.is_('sample_points', 'null'))
 
+fetched_count = 0
 matched_count = 0
-for species in species_batch.data:
-    sample_points = species.get('sample_points', [])
-    if not sample_points or not isinstance(sample_points, list):
-        continue
-
-    for point in sample_points:
-        lat = point.get('lat')
-        lng = point.get('lng')
-        if lat is None or lng is None:
+for page in species_pages:
+    fetched_count += len(page)
+    for species in page:
+        sample_points = species.get('sample_points', [])
+        if not sample_points or not isinstance(sample_points, list):
             continue
 
-        distance = haversine_distance(lat, lng, b['center_lat'], b['center_lng'])
-        if distance <= b['radius_km']:
-            matched_count += 1
-            break  # One match per species
+        for point in sample_points:
+            lat = point.get('lat')
+            lng = point.get('lng')
+            if lat is None or lng is None:
+                continue
+
+            distance = haversine_distance(lat, lng, b['center_lat'], b['center_lng'])
+            if distance <= b['radius_km']:
+                matched_count += 1
+                break  # One match per species
 
-print(f'Found {matched_count} species within Borneo radius in first 1000\n')
+print(f'Fetched {fetched_count} species')
+print(f'Found {matched_count} species within Borneo radius\n')
 
 # Check current links for Borneo
 print('=' * 70)
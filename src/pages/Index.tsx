@@ -439,6 +439,7 @@ const Index = () => {
           .lte('center_lng', point.lng + boundsRadius)
           .not('center_lat', 'is', null)
           .not('center_lng', 'is', null)
+          .is('retired_at', null)
           .order('size_km2', { ascending: false });
 
         // Determine ecoregion type from name for fallback
@@ -635,6 +636,7 @@ const Index = () => {
         .eq('ecoregion_id', ecoregionData.id)
         .not('center_lat', 'is', null)
         .not('center_lng', 'is', null)
+        .is('retired_at', null)
         .order('size_km2', { ascending: false });
 
       if (parksError) {
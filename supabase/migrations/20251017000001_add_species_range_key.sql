@@ -0,0 +1,14 @@
+-- Add deterministic range_key to species for idempotent IUCN imports
+-- Each IUCN polygon gets its own species row, so no existing column identifies a row.
+-- range_key = sha1(iucn_id | subspecies | subpopulation | presence | seasonal | polygon WKB)
+-- lets processIUCNShapefiles.py upsert, so a resumed import never double-inserts.
+
+-- Add range_key column to species table
+ALTER TABLE species
+ADD COLUMN IF NOT EXISTS range_key TEXT;
+
+-- Unique index used as the upsert conflict target (NULLs allowed for curated/legacy rows)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_species_range_key ON species(range_key);
+
+-- Add comment for documentation
+COMMENT ON COLUMN species.range_key IS 'Deterministic key of one IUCN range polygon: sha1 of iucn_id, variant fields and polygon WKB. NULL for curated species.';
@@ -0,0 +1,20 @@
+-- Add range bounding box and polygon count to species
+-- processIUCNShapefiles.py fills the bbox of every range row. With --consolidate,
+-- all polygons of one variant (iucn_id, subspecies, subpopulation, presence, seasonal)
+-- are merged into a single row: the union of their sample points, the combined bbox
+-- and the number of polygons merged.
+
+-- Add range bbox columns to species table
+ALTER TABLE species
+ADD COLUMN IF NOT EXISTS range_min_lat DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS range_min_lng DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS range_max_lat DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS range_max_lng DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS range_polygon_count INTEGER;
+
+-- Add comments for documentation
+COMMENT ON COLUMN species.range_min_lat IS 'Southern edge of the IUCN range bbox (combined bbox for consolidated rows)';
+COMMENT ON COLUMN species.range_min_lng IS 'Western edge of the IUCN range bbox (combined bbox for consolidated rows)';
+COMMENT ON COLUMN species.range_max_lat IS 'Northern edge of the IUCN range bbox (combined bbox for consolidated rows)';
+COMMENT ON COLUMN species.range_max_lng IS 'Eastern edge of the IUCN range bbox (combined bbox for consolidated rows)';
+COMMENT ON COLUMN species.range_polygon_count IS 'Number of IUCN polygons merged into this row (--consolidate); NULL for one-row-per-polygon imports';
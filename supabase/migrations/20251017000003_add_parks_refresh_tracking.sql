@@ -0,0 +1,103 @@
+-- Track WDPA source hashes and retirement on parks
+-- processWDPAShapefiles.py --refresh compares source_hash (sha1 of the mapped
+-- attributes + geometry WKB) with each new monthly release by wdpa_id, upserts
+-- only new/changed parks and sets retired_at on parks dropped from the release.
+
+-- ============================================================================
+-- PART 1: Make wdpa_id a real unique key (the upsert's on_conflict target)
+-- ============================================================================
+-- parks.wdpa_id was created as TEXT without a constraint, so the
+-- "ADD COLUMN IF NOT EXISTS wdpa_id INTEGER UNIQUE" in
+-- 20251012000001_update_parks_for_wdpa.sql never applied, and repeated
+-- imports could store one protected area several times.
+
+-- Cast to INTEGER first so '555' and '555.0' count as the same park.
+-- Values that are not whole numbers are not WDPA ids and become NULL
+DO $$
+BEGIN
+  IF (SELECT data_type FROM information_schema.columns
+      WHERE table_schema = current_schema() AND table_name = 'parks' AND column_name = 'wdpa_id') <> 'integer' THEN
+    ALTER TABLE parks
+    ALTER COLUMN wdpa_id TYPE INTEGER
+    USING CASE WHEN btrim(wdpa_id::TEXT) ~ '^[0-9]+(\.0*)?$' THEN btrim(wdpa_id::TEXT)::NUMERIC::INTEGER END;
+  END IF;
+END $$;
+
+-- Keep the newest row of each wdpa_id; the others are merged into it
+CREATE TEMP TABLE park_duplicates AS
+SELECT id AS duplicate_id, keep_id
+FROM (
+  SELECT
+    id,
+    first_value(id) OVER w AS keep_id,
+    row_number() OVER w AS rn
+  FROM parks
+  WHERE wdpa_id IS NOT NULL
+  WINDOW w AS (PARTITION BY wdpa_id ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, id)
+) ranked
+WHERE rn > 1;
+
+-- Species links: drop a duplicate's link when the kept park (or another
+-- duplicate) already links that species, then repoint the rest
+DELETE FROM species_parks sp
+USING (
+  SELECT
+    l.ctid AS link_ctid,
+    row_number() OVER (
+      PARTITION BY l.species_id, COALESCE(d.keep_id, l.park_id)
+      ORDER BY d.duplicate_id IS NOT NULL, l.park_id
+    ) AS rn
+  FROM species_parks l
+  LEFT JOIN park_duplicates d ON d.duplicate_id = l.park_id
+  WHERE l.park_id IN (SELECT duplicate_id FROM park_duplicates UNION SELECT keep_id FROM park_duplicates)
+) ranked
+WHERE sp.ctid = ranked.link_ctid
+AND ranked.rn > 1;
+
+UPDATE species_parks sp
+SET park_id = d.keep_id
+FROM park_duplicates d
+WHERE sp.park_id = d.duplicate_id;
+
+-- User sessions follow the kept park; cached enrichment is simply refetched
+UPDATE user_park_sessions s
+SET park_id = d.keep_id
+FROM park_duplicates d
+WHERE s.park_id = d.duplicate_id;
+
+DELETE FROM enrichment_cache c
+USING park_duplicates d
+WHERE c.park_id = d.duplicate_id;
+
+DELETE FROM parks p
+USING park_duplicates d
+WHERE p.id = d.duplicate_id;
+
+DROP TABLE park_duplicates;
+
+-- The unique constraint's index replaces the plain one
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'parks'::regclass AND conname = 'parks_wdpa_id_key') THEN
+    ALTER TABLE parks ADD CONSTRAINT parks_wdpa_id_key UNIQUE (wdpa_id);
+  END IF;
+END $$;
+
+DROP INDEX IF EXISTS idx_parks_wdpa_id;
+
+-- ============================================================================
+-- PART 2: Refresh tracking
+-- ============================================================================
+
+-- Add refresh tracking columns to parks table
+ALTER TABLE parks
+ADD COLUMN IF NOT EXISTS source_hash TEXT,
+ADD COLUMN IF NOT EXISTS retired_at TIMESTAMPTZ;
+
+-- Active parks are what the app queries
+CREATE INDEX IF NOT EXISTS idx_parks_active ON parks(wdpa_id) WHERE retired_at IS NULL;
+
+-- Add comments for documentation
+COMMENT ON COLUMN parks.wdpa_id IS 'World Database on Protected Areas unique identifier (one row per WDPA id)';
+COMMENT ON COLUMN parks.source_hash IS 'sha1 of the mapped WDPA attributes and geometry WKB, used by --refresh to detect changes';
+COMMENT ON COLUMN parks.retired_at IS 'Set when the park is no longer in the latest WDPA release (rows are kept so links survive)';
@@ -0,0 +1,116 @@
+-- Store simplified WDPA park boundaries in parks.bounds
+-- processWDPAShapefiles.py now uploads each polygon park's boundary, simplified
+-- with topology preserved (--simplify-tolerance), as hex EWKB. WDPA parks are
+-- often multi-part, so the column becomes a MultiPolygon; idx_parks_bounds is
+-- rebuilt by the type change.
+
+ALTER TABLE parks
+ALTER COLUMN bounds TYPE GEOGRAPHY(MULTIPOLYGON, 4326)
+USING ST_Multi(bounds::geometry)::geography;
+
+-- Parks in an ecoregion: assigned ecoregion_id, or boundary intersecting the
+-- ecoregion geometry. The two conditions are separate lookups (idx_parks_ecoregion
+-- and idx_parks_bounds) combined with UNION, since an OR across them leaves the
+-- planner no index to use and it scans every park.
+CREATE OR REPLACE FUNCTION get_parks_in_ecoregion(ecoregion_uuid UUID)
+RETURNS TABLE (
+  id UUID,
+  name TEXT,
+  wdpa_id INTEGER,
+  designation_eng TEXT,
+  iucn_category TEXT,
+  park_type TEXT,
+  gis_area_km2 DECIMAL,
+  center_lat DECIMAL,
+  center_lng DECIMAL,
+  species_count BIGINT
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    p.id,
+    p.name,
+    p.wdpa_id,
+    p.designation_eng,
+    p.iucn_category,
+    p.park_type,
+    p.gis_area_km2,
+    p.center_lat,
+    p.center_lng,
+    COUNT(DISTINCT sp.species_id) AS species_count
+  FROM (
+    SELECT a.id FROM parks a
+    WHERE a.ecoregion_id = ecoregion_uuid
+      AND a.retired_at IS NULL  -- Dropped from the latest WDPA release
+    UNION
+    SELECT b.id FROM parks b
+    JOIN ecoregions e ON e.id = ecoregion_uuid
+    WHERE ST_Intersects(b.bounds, e.geometry)
+      AND b.retired_at IS NULL
+  ) matched
+  JOIN parks p ON p.id = matched.id
+  LEFT JOIN species_parks sp ON sp.park_id = p.id
+  GROUP BY p.id, p.name, p.wdpa_id, p.designation_eng, p.iucn_category, p.park_type, p.gis_area_km2, p.center_lat, p.center_lng
+  ORDER BY p.name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Match species to a park by geometry (point-in-polygon)
+-- Checks if any sample_points fall within the park's boundary
+CREATE OR REPLACE FUNCTION match_species_to_park_by_points(
+    target_park_id UUID
+)
+RETURNS TABLE (
+    species_id UUID,
+    overlap_percentage DECIMAL
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH sample_point_matches AS (
+        SELECT
+            s.id as species_id,
+            jsonb_array_elements(s.sample_points) AS point,
+            COUNT(*) OVER (PARTITION BY s.id) as total_points
+        FROM species s
+        JOIN parks p ON p.id = target_park_id
+        WHERE s.sample_points IS NOT NULL
+        AND p.bounds IS NOT NULL
+        -- Range bbox prefilter keeps the point expansion to nearby species
+        AND (s.range_min_lat IS NULL OR (
+            s.range_min_lat <= ST_YMax(p.bounds::geometry)
+            AND s.range_max_lat >= ST_YMin(p.bounds::geometry)
+            AND s.range_min_lng <= ST_XMax(p.bounds::geometry)
+            AND s.range_max_lng >= ST_XMin(p.bounds::geometry)
+        ))
+    ),
+    point_intersections AS (
+        SELECT
+            spm.species_id,
+            spm.total_points,
+            COUNT(*) as matching_points
+        FROM sample_point_matches spm
+        JOIN parks p ON p.id = target_park_id
+        WHERE ST_Contains(
+            p.bounds::geometry,
+            ST_SetSRID(
+                ST_MakePoint(
+                    (spm.point->>'lng')::NUMERIC,
+                    (spm.point->>'lat')::NUMERIC
+                ),
+                4326
+            )
+        )
+        GROUP BY spm.species_id, spm.total_points
+    )
+    SELECT
+        pi.species_id,
+        ROUND((pi.matching_points::DECIMAL / pi.total_points * 100), 2) as overlap_percentage
+    FROM point_intersections pi
+    WHERE pi.matching_points > 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments for documentation
+COMMENT ON COLUMN parks.bounds IS 'WDPA boundary simplified with topology preserved (processWDPAShapefiles.py --simplify-tolerance); NULL for point-only parks';
+COMMENT ON FUNCTION get_parks_in_ecoregion IS 'Active parks assigned to an ecoregion or whose bounds intersect its geometry, with linked species counts';
+COMMENT ON FUNCTION match_species_to_park_by_points IS 'Finds species whose sample points fall within a park boundary. Returns species_id and overlap percentage.';
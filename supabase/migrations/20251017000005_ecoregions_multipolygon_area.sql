@@ -0,0 +1,17 @@
+-- Ecoregion geometry as MultiPolygon EWKB, plus geodesic area
+-- processWWFEcoregions.py now derives centroid, radius, area and geometry from
+-- one parse (scripts/geometry_derivation.py) and uploads hex EWKB instead of
+-- WKT. WWF ecoregions are mostly multi-part, so the column becomes a
+-- MultiPolygon; idx_ecoregions_geometry is rebuilt by the type change.
+
+ALTER TABLE ecoregions
+ALTER COLUMN geometry TYPE GEOGRAPHY(MULTIPOLYGON, 4326)
+USING ST_Multi(geometry::geometry)::geography;
+
+-- Add area column to ecoregions table
+ALTER TABLE ecoregions
+ADD COLUMN IF NOT EXISTS area_km2 DECIMAL;
+
+-- Add comments for documentation
+COMMENT ON COLUMN ecoregions.geometry IS 'Ecoregion boundary in WGS84 (processWWFEcoregions.py, optionally simplified with --simplify-tolerance)';
+COMMENT ON COLUMN ecoregions.area_km2 IS 'Geodesic area on the WGS84 ellipsoid in km², computed at import';
@@ -0,0 +1,87 @@
+-- Multi-resolution (level-of-detail) ecoregion geometry
+-- scripts/ecoregion_lod.py writes three simplified tiers of ecoregions.geometry
+-- (~1 km, ~10 km and ~50 km tolerance) and the geometry's bounding box. Coarse
+-- tiers serve globe rendering and candidate filtering; the full-resolution
+-- geometry is kept for exact boundary tests.
+
+-- Add LOD tier and bbox columns to ecoregions table
+ALTER TABLE ecoregions
+ADD COLUMN IF NOT EXISTS geometry_1km GEOGRAPHY(MULTIPOLYGON, 4326),
+ADD COLUMN IF NOT EXISTS geometry_10km GEOGRAPHY(MULTIPOLYGON, 4326),
+ADD COLUMN IF NOT EXISTS geometry_50km GEOGRAPHY(MULTIPOLYGON, 4326),
+ADD COLUMN IF NOT EXISTS bbox_min_lat DECIMAL,
+ADD COLUMN IF NOT EXISTS bbox_min_lng DECIMAL,
+ADD COLUMN IF NOT EXISTS bbox_max_lat DECIMAL,
+ADD COLUMN IF NOT EXISTS bbox_max_lng DECIMAL,
+ADD COLUMN IF NOT EXISTS geometry_vertices INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_ecoregions_geometry_10km ON ecoregions USING GIST(geometry_10km);
+
+-- Point-in-polygon matching, now skipping species and points outside the
+-- ecoregion bbox before the full-resolution ST_Contains test
+CREATE OR REPLACE FUNCTION match_species_to_ecoregion_by_points(
+    target_ecoregion_id UUID
+)
+RETURNS TABLE (
+    species_id UUID,
+    overlap_percentage DECIMAL
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH target AS (
+        SELECT e.geometry, e.bbox_min_lat, e.bbox_min_lng, e.bbox_max_lat, e.bbox_max_lng
+        FROM ecoregions e
+        WHERE e.id = target_ecoregion_id
+        AND e.geometry IS NOT NULL
+    ),
+    sample_point_matches AS (
+        SELECT
+            s.id as species_id,
+            jsonb_array_elements(s.sample_points) AS point,
+            COUNT(*) OVER (PARTITION BY s.id) as total_points
+        FROM species s, target t
+        WHERE s.sample_points IS NOT NULL
+        -- Species whose range bbox misses the ecoregion bbox cannot match
+        AND (t.bbox_min_lat IS NULL OR s.range_min_lat IS NULL OR (
+            s.range_min_lat <= t.bbox_max_lat
+            AND s.range_max_lat >= t.bbox_min_lat
+            AND s.range_min_lng <= t.bbox_max_lng
+            AND s.range_max_lng >= t.bbox_min_lng
+        ))
+    ),
+    point_intersections AS (
+        SELECT
+            spm.species_id,
+            spm.total_points,
+            COUNT(*) as matching_points
+        FROM sample_point_matches spm, target t
+        WHERE (t.bbox_min_lat IS NULL OR (
+            (spm.point->>'lat')::NUMERIC BETWEEN t.bbox_min_lat AND t.bbox_max_lat
+            AND (spm.point->>'lng')::NUMERIC BETWEEN t.bbox_min_lng AND t.bbox_max_lng
+        ))
+        AND ST_Contains(
+            t.geometry::geometry,
+            ST_SetSRID(
+                ST_MakePoint(
+                    (spm.point->>'lng')::NUMERIC,
+                    (spm.point->>'lat')::NUMERIC
+                ),
+                4326
+            )
+        )
+        GROUP BY spm.species_id, spm.total_points
+    )
+    SELECT
+        pi.species_id,
+        ROUND((pi.matching_points::DECIMAL / pi.total_points * 100), 2) as overlap_percentage
+    FROM point_intersections pi
+    WHERE pi.matching_points > 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add comments for documentation
+COMMENT ON COLUMN ecoregions.geometry_1km IS 'geometry simplified at ~1 km tolerance (scripts/ecoregion_lod.py)';
+COMMENT ON COLUMN ecoregions.geometry_10km IS 'geometry simplified at ~10 km tolerance, for candidate filtering and regional rendering';
+COMMENT ON COLUMN ecoregions.geometry_50km IS 'geometry simplified at ~50 km tolerance, for globe rendering';
+COMMENT ON COLUMN ecoregions.geometry_vertices IS 'Vertex count of the full-resolution geometry';
+COMMENT ON FUNCTION match_species_to_ecoregion_by_points IS 'Finds species whose sample points fall within an ecoregion geometry (bbox-prefiltered). Returns species_id and overlap percentage.';
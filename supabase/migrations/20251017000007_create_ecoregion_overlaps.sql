@@ -0,0 +1,48 @@
+-- Precomputed ecoregion overlap / adjacency graph
+-- scripts/ecoregion_overlaps.py fills this once per ecoregion import, so linkers
+-- and the UI can look up how two ecoregions relate instead of recomputing
+-- center distances and radius overlaps ad hoc.
+--
+-- One row per direction: (A, B) holds the fractions of A covered by B and
+-- (B, A) the fractions of B covered by A, so "what overlaps X" is a single
+-- primary-key range scan.
+
+CREATE TABLE IF NOT EXISTS ecoregion_overlaps (
+  ecoregion_id UUID NOT NULL REFERENCES ecoregions(id) ON DELETE CASCADE,
+  other_ecoregion_id UUID NOT NULL REFERENCES ecoregions(id) ON DELETE CASCADE,
+
+  -- Center + radius circles (used by the radius-based linker)
+  center_distance_km DECIMAL,
+  circle_overlap_km2 DECIMAL,
+  circle_overlap_fraction DECIMAL, -- Share of this ecoregion's circle inside the other's
+  contains_other_center BOOLEAN, -- This ecoregion's radius reaches the other's center
+
+  -- Polygons (NULL when either ecoregion has no geometry)
+  intersection_area_km2 DECIMAL,
+  intersection_fraction DECIMAL, -- Share of this ecoregion's area inside the other
+  shared_border_km DECIMAL,
+
+  computed_at TIMESTAMP DEFAULT NOW(),
+
+  PRIMARY KEY (ecoregion_id, other_ecoregion_id),
+  CHECK (ecoregion_id <> other_ecoregion_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ecoregion_overlaps_other ON ecoregion_overlaps(other_ecoregion_id);
+
+ALTER TABLE ecoregion_overlaps ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policy: Anyone can read ecoregion overlaps
+CREATE POLICY "Ecoregion overlaps are viewable by everyone"
+  ON ecoregion_overlaps FOR SELECT
+  USING (true);
+
+-- RLS Policy: Only service role can modify
+CREATE POLICY "Service role can manage ecoregion overlaps"
+  ON ecoregion_overlaps FOR ALL
+  USING (auth.role() = 'service_role');
+
+COMMENT ON TABLE ecoregion_overlaps IS 'Pairwise ecoregion overlap and adjacency, one row per direction (scripts/ecoregion_overlaps.py)';
+COMMENT ON COLUMN ecoregion_overlaps.circle_overlap_fraction IS 'Fraction of this ecoregion''s center/radius circle inside the other''s circle';
+COMMENT ON COLUMN ecoregion_overlaps.intersection_fraction IS 'Fraction of this ecoregion''s polygon area inside the other''s polygon';
+COMMENT ON COLUMN ecoregion_overlaps.shared_border_km IS 'Length of boundary the two polygons share (within ~100 m)';
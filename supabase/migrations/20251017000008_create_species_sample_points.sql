@@ -0,0 +1,142 @@
+-- Normalized species sample points with a set-based ecoregion linker
+-- scripts/backfill_sample_points.py writes one row per species.sample_points
+-- element, so spatial joins read indexed points instead of re-expanding
+-- jsonb_array_elements(sample_points) and casting ->>'lng'/'lat' on every call.
+--
+-- link_all_species_ecoregions() then links every species to every ecoregion in
+-- one statement: one GIST-indexed join against all ecoregion polygons
+-- (ST_Contains) plus one against the center + radius of ecoregions without
+-- geometry (ST_DWithin), replacing populate_all_species_ecoregion_links()'s
+-- full species scan per ecoregion. It is authoritative: links it did not
+-- produce are deleted in the same statement, so species_ecoregions ends up
+-- exactly the hybrid rule's output (see species_ecoregions_link_rule).
+
+CREATE TABLE IF NOT EXISTS species_sample_points (
+  species_id UUID NOT NULL REFERENCES species(id) ON DELETE CASCADE,
+  ord SMALLINT NOT NULL, -- Position in species.sample_points
+  geom GEOGRAPHY(POINT, 4326) NOT NULL,
+
+  PRIMARY KEY (species_id, ord)
+);
+
+-- Geography index for ST_DWithin, geometry index for ST_Contains against ecoregions.geometry::geometry
+CREATE INDEX IF NOT EXISTS idx_species_sample_points_geom ON species_sample_points USING GIST(geom);
+CREATE INDEX IF NOT EXISTS idx_species_sample_points_geom_planar ON species_sample_points USING GIST((geom::geometry));
+
+ALTER TABLE species_sample_points ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policy: Anyone can read species sample points
+CREATE POLICY "Species sample points are viewable by everyone"
+  ON species_sample_points FOR SELECT
+  USING (true);
+
+-- RLS Policy: Only service role can modify
+CREATE POLICY "Service role can manage species sample points"
+  ON species_sample_points FOR ALL
+  USING (auth.role() = 'service_role');
+
+-- Drop points past each species' current count
+-- The backfill upserts on (species_id, ord) instead of clearing the table, so
+-- readers never see it empty; a species that now has fewer points (or none)
+-- leaves rows at ord >= its new count, which this removes a page at a time
+CREATE OR REPLACE FUNCTION prune_species_sample_points(
+    species_ids UUID[],
+    point_counts INTEGER[]  -- Current number of points of each species in species_ids
+)
+RETURNS INTEGER AS $$
+DECLARE
+    pruned INTEGER;
+BEGIN
+    DELETE FROM species_sample_points p
+    USING unnest(species_ids, point_counts) AS c(species_id, point_count)
+    WHERE p.species_id = c.species_id
+    AND p.ord >= c.point_count;
+    GET DIAGNOSTICS pruned = ROW_COUNT;
+    RETURN pruned;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Link every species to every ecoregion in a single statement
+-- Same rules as populate_all_species_ecoregion_links(): point-in-polygon for
+-- ecoregions with geometry, center + radius (default 100 km) for the rest;
+-- overlap_percentage is the share of a species' points that match.
+-- The upsert and the delete of every link not in `matches` run in one
+-- statement, so readers see either the old links or the new ones, never
+-- stale links from another rule (or from points that have since moved)
+-- mixed in with the result.
+CREATE OR REPLACE FUNCTION link_all_species_ecoregions()
+RETURNS TABLE (
+    ecoregion_name TEXT,
+    species_matched INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH totals AS (
+        SELECT p.species_id, COUNT(*) AS total_points
+        FROM species_sample_points p
+        GROUP BY p.species_id
+    ),
+    polygon_matches AS (
+        SELECT p.species_id, e.id AS ecoregion_id, COUNT(*) AS matching_points
+        FROM ecoregions e
+        JOIN species_sample_points p ON ST_Contains(e.geometry::geometry, p.geom::geometry)
+        WHERE e.geometry IS NOT NULL
+        GROUP BY p.species_id, e.id
+    ),
+    radius_matches AS (
+        SELECT p.species_id, e.id AS ecoregion_id, COUNT(*) AS matching_points
+        FROM ecoregions e
+        JOIN species_sample_points p ON ST_DWithin(
+            p.geom,
+            ST_MakePoint(e.center_lng, e.center_lat)::geography,
+            COALESCE(e.radius_km, 100) * 1000  -- Convert km to meters
+        )
+        WHERE e.geometry IS NULL
+        AND e.center_lat IS NOT NULL
+        AND e.center_lng IS NOT NULL
+        GROUP BY p.species_id, e.id
+    ),
+    matches AS (
+        SELECT
+            m.species_id,
+            m.ecoregion_id,
+            ROUND((m.matching_points::DECIMAL / t.total_points * 100), 2) AS overlap_percentage
+        FROM (SELECT * FROM polygon_matches UNION ALL SELECT * FROM radius_matches) m
+        JOIN totals t ON t.species_id = m.species_id
+    ),
+    linked AS (
+        INSERT INTO species_ecoregions (species_id, ecoregion_id, overlap_percentage, is_primary_habitat)
+        SELECT m.species_id, m.ecoregion_id, m.overlap_percentage, m.overlap_percentage > 50.0
+        FROM matches m
+        ON CONFLICT (species_id, ecoregion_id) DO UPDATE
+        SET overlap_percentage = EXCLUDED.overlap_percentage,
+            is_primary_habitat = EXCLUDED.is_primary_habitat
+        WHERE (species_ecoregions.overlap_percentage, species_ecoregions.is_primary_habitat)
+            IS DISTINCT FROM (EXCLUDED.overlap_percentage, EXCLUDED.is_primary_habitat)
+    ),
+    unlinked AS (
+        DELETE FROM species_ecoregions se
+        WHERE NOT EXISTS (
+            SELECT 1 FROM matches m
+            WHERE m.species_id = se.species_id
+            AND m.ecoregion_id = se.ecoregion_id
+        )
+    )
+    SELECT e.name, COUNT(*)::INTEGER
+    FROM matches m
+    JOIN ecoregions e ON e.id = m.ecoregion_id
+    GROUP BY e.name;
+
+    -- The links are now exactly the hybrid rule's (scripts/link_staging.py RULE_HYBRID)
+    INSERT INTO species_ecoregions_link_rule (singleton, rule, updated_at)
+    VALUES (true, 'hybrid', NOW())
+    ON CONFLICT (singleton) DO UPDATE
+    SET rule = EXCLUDED.rule,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE species_sample_points IS 'One row per species.sample_points element as indexed geography (scripts/backfill_sample_points.py)';
+COMMENT ON COLUMN species_sample_points.ord IS 'Index of the point in species.sample_points';
+COMMENT ON FUNCTION prune_species_sample_points IS 'Deletes sample points at or past each given species'' current point count. Returns rows deleted.';
+COMMENT ON FUNCTION link_all_species_ecoregions IS 'Rebuilds species_ecoregions from one indexed spatial join over species_sample_points, deleting links it does not produce. Returns species matched per ecoregion.';
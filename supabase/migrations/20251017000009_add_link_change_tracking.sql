@@ -0,0 +1,103 @@
+-- Change tracking for incremental species <-> ecoregion relinking
+-- scripts/relink_species_ecoregions.py records, per species and per ecoregion,
+-- the hash of the inputs the current species_ecoregions rows were computed
+-- from. The next run recomputes only species whose sample_points hash and
+-- ecoregions whose geometry hash changed, and applies a minimal
+-- insert/update/delete diff instead of clearing the table.
+--
+-- A hash is written only after that species'/ecoregion's links are applied,
+-- so an interrupted run simply redoes the remaining work next time.
+--
+-- The linkers do not all link by the same rule (the radius linker links every
+-- ecoregion by center + radius, the relinker uses polygons where they exist),
+-- so species_ecoregions_link_rule records which rule built the current links.
+-- The relinker refuses to diff against links built by another rule, which it
+-- would otherwise delete as stale.
+
+CREATE TABLE IF NOT EXISTS species_link_state (
+  species_id UUID PRIMARY KEY REFERENCES species(id) ON DELETE CASCADE,
+  points_hash TEXT NOT NULL, -- sha1 of the species' sample point coordinates
+  linked_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS ecoregion_link_state (
+  ecoregion_id UUID PRIMARY KEY REFERENCES ecoregions(id) ON DELETE CASCADE,
+  geometry_hash TEXT NOT NULL, -- ecoregions.geometry_hash when last linked
+  linked_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS species_ecoregions_link_rule (
+  singleton BOOLEAN PRIMARY KEY DEFAULT true CHECK (singleton), -- One row
+  rule TEXT NOT NULL, -- 'hybrid', 'polygon', 'radius', ... or 'mixed' (see scripts/link_staging.py)
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE species_link_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ecoregion_link_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE species_ecoregions_link_rule ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policy: Anyone can read link state
+CREATE POLICY "Species link state is viewable by everyone"
+  ON species_link_state FOR SELECT
+  USING (true);
+
+CREATE POLICY "Ecoregion link state is viewable by everyone"
+  ON ecoregion_link_state FOR SELECT
+  USING (true);
+
+CREATE POLICY "Species ecoregions link rule is viewable by everyone"
+  ON species_ecoregions_link_rule FOR SELECT
+  USING (true);
+
+-- RLS Policy: Only service role can modify
+CREATE POLICY "Service role can manage species link state"
+  ON species_link_state FOR ALL
+  USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage ecoregion link state"
+  ON ecoregion_link_state FOR ALL
+  USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage species ecoregions link rule"
+  ON species_ecoregions_link_rule FOR ALL
+  USING (auth.role() = 'service_role');
+
+-- Hash of everything that decides an ecoregion's links: its geometry, or the
+-- center + radius used when it has none. Kept in a column that is updated
+-- whenever those inputs are written, so the relinker pages through plain
+-- hashes instead of the database re-hashing every geometry on each run.
+ALTER TABLE ecoregions
+ADD COLUMN IF NOT EXISTS geometry_hash TEXT;
+
+CREATE OR REPLACE FUNCTION ecoregion_link_hash(e ecoregions)
+RETURNS TEXT AS $$
+    SELECT md5(concat_ws('|',
+        COALESCE(encode(ST_AsEWKB(e.geometry::geometry), 'hex'), ''),
+        e.center_lat::TEXT,
+        e.center_lng::TEXT,
+        e.radius_km::TEXT
+    ));
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION update_ecoregion_geometry_hash()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.geometry_hash := ecoregion_link_hash(NEW);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_ecoregion_geometry_hash ON ecoregions;
+CREATE TRIGGER trigger_update_ecoregion_geometry_hash
+    BEFORE INSERT OR UPDATE OF geometry, center_lat, center_lng, radius_km ON ecoregions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_ecoregion_geometry_hash();
+
+-- Backfill existing ecoregions (the only full re-hash)
+UPDATE ecoregions e
+SET geometry_hash = ecoregion_link_hash(e);
+
+COMMENT ON TABLE species_link_state IS 'sample_points hash each species was last linked with (scripts/relink_species_ecoregions.py)';
+COMMENT ON TABLE ecoregion_link_state IS 'Geometry hash each ecoregion was last linked with (scripts/relink_species_ecoregions.py)';
+COMMENT ON TABLE species_ecoregions_link_rule IS 'Linker rule that built the current species_ecoregions rows (scripts/link_staging.py)';
+COMMENT ON COLUMN ecoregions.geometry_hash IS 'md5 of the link inputs (geometry, or center + radius), maintained by trigger_update_ecoregion_geometry_hash';
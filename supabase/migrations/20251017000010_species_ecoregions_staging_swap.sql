@@ -0,0 +1,243 @@
+-- Zero-downtime rebuilds of species_ecoregions via a staging table and atomic swap
+-- Full-rebuild linkers used to delete every link and re-insert batch by batch,
+-- so the app saw ecoregions with zero species until the run finished (the
+-- "Borneo shows nothing" failure in BORNEO_FIX_AND_IMPROVEMENTS.md). Now:
+--
+--   1. prepare_species_ecoregions_staging() creates species_ecoregions_staging
+--      without indexes or constraints, so bulk loads skip index maintenance
+--      (optionally pre-filled with the live links of ecoregions the linker
+--      does not rebuild)
+--   2. the linker writes its links into the staging table
+--   3. swap_species_ecoregions_staging() checks per-ecoregion counts against
+--      the live table, builds the live table's constraints and indexes on the
+--      staging table once, copies its policies, grants, triggers and comment
+--      (read from the catalog, so later additions carry over too), then
+--      renames staging into place in one transaction
+--
+-- Readers keep using the old links while the indexes build; they wait only
+-- for the renames at the end, then see the new table - never a partial one.
+--
+-- Both functions are SECURITY DEFINER: renaming the live table needs its owner.
+
+CREATE OR REPLACE FUNCTION prepare_species_ecoregions_staging(
+    keep_except_ecoregions UUID[] DEFAULT NULL  -- Copy live links of every ecoregion NOT in this list
+)
+RETURNS INTEGER AS $$
+DECLARE
+    kept INTEGER := 0;
+BEGIN
+    DROP TABLE IF EXISTS species_ecoregions_staging;
+    CREATE TABLE species_ecoregions_staging (LIKE species_ecoregions INCLUDING DEFAULTS);
+    -- Writable by the linkers, invisible to the app until swapped in
+    REVOKE ALL ON species_ecoregions_staging FROM anon, authenticated;
+    GRANT ALL ON species_ecoregions_staging TO service_role;
+
+    IF keep_except_ecoregions IS NOT NULL THEN
+        INSERT INTO species_ecoregions_staging
+        SELECT * FROM species_ecoregions
+        WHERE NOT (ecoregion_id = ANY(keep_except_ecoregions));
+        GET DIAGNOSTICS kept = ROW_COUNT;
+    END IF;
+
+    -- Let PostgREST see the new table
+    NOTIFY pgrst, 'reload schema';
+    RETURN kept;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION swap_species_ecoregions_staging(
+    min_live_links INTEGER DEFAULT 10,  -- Only check ecoregions with at least this many live links
+    max_drop_fraction DECIMAL DEFAULT 0.5,  -- Fail if such an ecoregion loses more than this share
+    dry_run BOOLEAN DEFAULT false,  -- Validate and report, but keep the live table
+    link_rule TEXT DEFAULT NULL,  -- Rule the staged links were built by (NULL: unknown)
+    partial_rebuild BOOLEAN DEFAULT false  -- Staging kept the live links of the ecoregions not rebuilt
+)
+RETURNS TABLE (
+    ecoregion_name TEXT,
+    live_links INTEGER,
+    staged_links INTEGER
+) AS $$
+DECLARE
+    failures TEXT;
+    duplicates INTEGER;
+    obj RECORD;
+BEGIN
+    IF to_regclass('species_ecoregions_staging') IS NULL THEN
+        RAISE EXCEPTION 'species_ecoregions_staging does not exist; call prepare_species_ecoregions_staging() first';
+    END IF;
+
+    -- Drop links to species/ecoregions deleted since staging began; the
+    -- foreign keys built below would reject them
+    DELETE FROM species_ecoregions_staging st
+    WHERE NOT EXISTS (SELECT 1 FROM species s WHERE s.id = st.species_id)
+    OR NOT EXISTS (SELECT 1 FROM ecoregions e WHERE e.id = st.ecoregion_id);
+
+    -- A linker that wrote the same link twice would otherwise fail the primary
+    -- key build; keep one copy and say so
+    DELETE FROM species_ecoregions_staging a
+    USING species_ecoregions_staging b
+    WHERE a.species_id = b.species_id
+    AND a.ecoregion_id = b.ecoregion_id
+    AND a.ctid < b.ctid;
+    GET DIAGNOSTICS duplicates = ROW_COUNT;
+    IF duplicates > 0 THEN
+        RAISE NOTICE 'Removed % duplicate staged links', duplicates;
+    END IF;
+
+    -- Per-ecoregion counts, live vs staged
+    CREATE TEMP TABLE link_counts ON COMMIT DROP AS
+    SELECT
+        e.name AS ecoregion_name,
+        COALESCE(l.n, 0)::INTEGER AS live_links,
+        COALESCE(s.n, 0)::INTEGER AS staged_links
+    FROM ecoregions e
+    LEFT JOIN (SELECT ecoregion_id, COUNT(*) AS n FROM species_ecoregions GROUP BY ecoregion_id) l ON l.ecoregion_id = e.id
+    LEFT JOIN (SELECT ecoregion_id, COUNT(*) AS n FROM species_ecoregions_staging GROUP BY ecoregion_id) s ON s.ecoregion_id = e.id
+    WHERE l.n IS NOT NULL OR s.n IS NOT NULL;
+
+    SELECT string_agg(format('%s (%s -> %s)', c.ecoregion_name, c.live_links, c.staged_links), ', ')
+    INTO failures
+    FROM link_counts c
+    WHERE c.live_links >= min_live_links
+    AND c.staged_links < c.live_links * (1 - max_drop_fraction);
+
+    IF failures IS NOT NULL THEN
+        RAISE EXCEPTION 'Staged links failed validation, live table kept: %', failures;
+    END IF;
+
+    IF NOT dry_run THEN
+        -- Constraints and indexes of the live table, built once over the loaded
+        -- rows under a _staged suffix (index names are unique per schema)
+        FOR obj IN
+            SELECT c.conname, pg_get_constraintdef(c.oid) AS def
+            FROM pg_constraint c
+            WHERE c.conrelid = 'species_ecoregions'::regclass
+            AND c.contype IN ('p', 'u', 'f', 'c', 'x')
+            ORDER BY c.contype <> 'p'
+        LOOP
+            EXECUTE format('ALTER TABLE species_ecoregions_staging ADD CONSTRAINT %I %s',
+                           obj.conname || '_staged', obj.def);
+        END LOOP;
+
+        FOR obj IN
+            SELECT ic.relname, i.indisunique, substring(pg_get_indexdef(i.indexrelid) FROM ' USING .*$') AS def
+            FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            WHERE i.indrelid = 'species_ecoregions'::regclass
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid)
+        LOOP
+            EXECUTE format('CREATE %sINDEX %I ON species_ecoregions_staging %s',
+                           CASE WHEN obj.indisunique THEN 'UNIQUE ' ELSE '' END, obj.relname || '_staged', obj.def);
+        END LOOP;
+        ANALYZE species_ecoregions_staging;
+
+        -- Triggers, created only now so they did not fire during the bulk load
+        FOR obj IN
+            SELECT pg_get_triggerdef(t.oid) AS def
+            FROM pg_trigger t
+            WHERE t.tgrelid = 'species_ecoregions'::regclass
+            AND NOT t.tgisinternal
+        LOOP
+            EXECUTE regexp_replace(obj.def, ' ON \S+ ', ' ON species_ecoregions_staging ');
+        END LOOP;
+
+        -- Same access rules as the table it replaces
+        IF (SELECT c.relrowsecurity FROM pg_class c WHERE c.oid = 'species_ecoregions'::regclass) THEN
+            ALTER TABLE species_ecoregions_staging ENABLE ROW LEVEL SECURITY;
+        END IF;
+        FOR obj IN
+            SELECT p.*
+            FROM pg_policies p
+            WHERE p.schemaname = 'public'
+            AND p.tablename = 'species_ecoregions'
+        LOOP
+            EXECUTE format('CREATE POLICY %I ON species_ecoregions_staging AS %s FOR %s TO %s%s%s',
+                           obj.policyname, obj.permissive, obj.cmd,
+                           (SELECT string_agg(CASE WHEN r = 'public' THEN 'PUBLIC' ELSE quote_ident(r) END, ', ')
+                            FROM unnest(obj.roles) r),
+                           COALESCE(' USING (' || obj.qual || ')', ''),
+                           COALESCE(' WITH CHECK (' || obj.with_check || ')', ''));
+        END LOOP;
+
+        REVOKE ALL ON species_ecoregions_staging FROM PUBLIC, anon, authenticated, service_role;
+        FOR obj IN
+            SELECT a.privilege_type,
+                   CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END AS grantee
+            FROM pg_class c, aclexplode(c.relacl) a
+            WHERE c.oid = 'species_ecoregions'::regclass
+            AND a.grantee <> c.relowner
+        LOOP
+            EXECUTE format('GRANT %s ON species_ecoregions_staging TO %s', obj.privilege_type, obj.grantee);
+        END LOOP;
+
+        EXECUTE format('COMMENT ON TABLE species_ecoregions_staging IS %L',
+                       obj_description('species_ecoregions'::regclass, 'pg_class'));
+
+        -- Swap: readers block for the duration of the renames only
+        LOCK TABLE species_ecoregions IN ACCESS EXCLUSIVE MODE;
+        ALTER TABLE species_ecoregions RENAME TO species_ecoregions_old;
+        ALTER TABLE species_ecoregions_staging RENAME TO species_ecoregions;
+        BEGIN
+            DROP TABLE species_ecoregions_old;
+        EXCEPTION WHEN dependent_objects_still_exist THEN
+            -- A view (or other object) bound to the old table would silently keep
+            -- reading it; refuse instead, which rolls the swap back
+            RAISE EXCEPTION 'Other objects depend on species_ecoregions, live table kept: %', SQLERRM;
+        END;
+
+        -- Give the constraints and indexes their live names back
+        FOR obj IN
+            SELECT c.conname
+            FROM pg_constraint c
+            WHERE c.conrelid = 'species_ecoregions'::regclass
+            AND c.conname LIKE '%\_staged'
+        LOOP
+            EXECUTE format('ALTER TABLE species_ecoregions RENAME CONSTRAINT %I TO %I',
+                           obj.conname, left(obj.conname, -length('_staged')));
+        END LOOP;
+        FOR obj IN
+            SELECT ic.relname
+            FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            WHERE i.indrelid = 'species_ecoregions'::regclass
+            AND ic.relname LIKE '%\_staged'
+        LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', obj.relname, left(obj.relname, -length('_staged')));
+        END LOOP;
+
+        -- Record the rule behind the new links. A partial rebuild keeps the
+        -- current rule only if its links agree with it; 'polygon' links are the
+        -- polygon half of the 'hybrid' rule
+        INSERT INTO species_ecoregions_link_rule (singleton, rule, updated_at)
+        SELECT true,
+               CASE
+                   WHEN NOT partial_rebuild THEN COALESCE(link_rule, 'mixed')
+                   WHEN r.rule = link_rule OR (r.rule = 'hybrid' AND link_rule = 'polygon') THEN r.rule
+                   ELSE 'mixed'
+               END,
+               NOW()
+        FROM (SELECT (SELECT lr.rule FROM species_ecoregions_link_rule lr) AS rule) r
+        ON CONFLICT (singleton) DO UPDATE
+        SET rule = EXCLUDED.rule,
+            updated_at = EXCLUDED.updated_at;
+
+        -- species_link_state / ecoregion_link_state stay valid: each hash names
+        -- the inputs a species' or ecoregion's links were computed from, and the
+        -- swapped-in links were computed from the current inputs. A matching
+        -- hash is still right, a stale one only makes the incremental relinker
+        -- recompute that species or ecoregion
+
+        NOTIFY pgrst, 'reload schema';
+    END IF;
+
+    RETURN QUERY SELECT * FROM link_counts c ORDER BY c.staged_links - c.live_links;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION prepare_species_ecoregions_staging(UUID[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION swap_species_ecoregions_staging(INTEGER, DECIMAL, BOOLEAN, TEXT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION prepare_species_ecoregions_staging(UUID[]) TO service_role;
+GRANT EXECUTE ON FUNCTION swap_species_ecoregions_staging(INTEGER, DECIMAL, BOOLEAN, TEXT, BOOLEAN) TO service_role;
+
+COMMENT ON FUNCTION prepare_species_ecoregions_staging IS 'Creates an empty, index-free species_ecoregions_staging (optionally keeping live links of ecoregions not being rebuilt)';
+COMMENT ON FUNCTION swap_species_ecoregions_staging IS 'Validates and indexes species_ecoregions_staging, then atomically renames it into place as species_ecoregions';